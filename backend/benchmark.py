@@ -0,0 +1,257 @@
+"""
+------------------------------------------------------------
+File: benchmark.py
+Description:
+    Load test for the API. Drives /generate-summary-and-questions
+    and /query at a fixed concurrency and reports throughput and
+    latency percentiles. By default the app runs in-process on
+    fakes (see fakes.py), so results reflect our own overhead and
+    concurrency behavior at a chosen LLM latency, at no cost.
+    --imports instead measures how long the API's modules take to
+    import, which bounds how fast a new worker can start.
+
+Author: TutorAI backend maintainers
+Date: October 2026
+Version: 1.0
+
+Usage:
+    From local directory: python benchmark.py --requests 500 --concurrency 32 --latency 0.5
+    Against a running server: python benchmark.py --url http://localhost:8000
+    Machine-readable results: python benchmark.py --json > results.json
+    Import time: python benchmark.py --imports main terminal
+
+Future Updates:
+    None planned.
+------------------------------------------------------------
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from fakes import SAMPLE_SECTIONS
+
+SCENARIOS = ("summary", "query")
+SECTIONS = sorted({payload["section"] for payload in SAMPLE_SECTIONS})
+
+
+def percentile(values, pct):
+    # Nearest-rank percentile of an already sorted list
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+
+def make_request(scenario, i, rng):
+    # Returns (method, path, kwargs) for request i of a scenario
+    section = SECTIONS[i % len(SECTIONS)]
+    if scenario == "summary":
+        return "GET", "/generate-summary-and-questions", {"params": {"section": section}}
+    # A handful of questions with varied answers, so the evaluation cache sees both hits and misses
+    words = [word for payload in SAMPLE_SECTIONS if payload["section"] == section for word in payload["text"].split()]
+    return "POST", "/query", {"json": {
+        "question": f"What does section {section} say about {rng.choice(words)}?",
+        "user_answer": " ".join(rng.sample(words, min(len(words), 12))),
+        "summary": f"Summary of section {section}.",
+        "user_id": "benchmark",
+        "id": str(i),
+    }}
+
+
+async def run_scenario(client, scenario, requests, concurrency, seed=0):
+    """
+    Sends requests for one scenario, at most concurrency at a time.
+
+    Parameters:
+    ----------
+    client : httpx.AsyncClient
+        Client pointed at the API.
+    scenario : str
+        "summary" or "query".
+    requests : int
+        Total requests to send.
+    concurrency : int
+        Requests in flight at once.
+    seed : int
+        Seed for the generated answers.
+
+    Returns:
+    -------
+    dict
+        Request and error counts, elapsed seconds, throughput (requests/s)
+        and p50/p90/p99/max latency in milliseconds.
+
+    Raises:
+    ------
+    None
+
+    """
+    rng = random.Random(seed)
+    pending = iter([make_request(scenario, i, rng) for i in range(requests)])
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for method, path, kwargs in pending:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "scenario": scenario,
+        "requests": requests,
+        "errors": errors,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else 0.0,
+        **{f"p{pct}_ms": round(percentile(latencies, pct) * 1000, 2) for pct in (50, 90, 99)},
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+async def run_in_process(scenarios, requests, concurrency, latency=0.0, tokens_per_second=0.0, llm_concurrency=32, seed=0):
+    """
+    Runs the scenarios against the app in this process, backed by fakes.
+    The content cache is memory-only so the on-disk cache is left untouched.
+    """
+    import main
+    from cache import LRUCache, ResponseCache
+    from fakes import fake_pool
+
+    async def create_pool():
+        return await fake_pool(latency, tokens_per_second, llm_concurrency)
+
+    original = main.create_pool, main.content_cache
+    main.create_pool = create_pool
+    main.content_cache = ResponseCache(memory=LRUCache(max_entries=2 * len(SECTIONS))) # Section payload and generated content
+
+    results = []
+    try:
+        async with main.app.router.lifespan_context(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+                for scenario in scenarios:
+                    results.append(await run_scenario(client, scenario, requests, concurrency, seed))
+            results[-1]["llm_calls"] = main.pool.llm.calls
+    finally:
+        main.create_pool, main.content_cache = original
+    return results
+
+
+def measure_imports(module, repeat=3, slowest=5):
+    """
+    Measures how long a module takes to import in a fresh interpreter, using python -X importtime.
+
+    Parameters:
+    ----------
+    module : str
+        Module to import, e.g. "main".
+    repeat : int
+        Fresh interpreters to time; the median is reported.
+    slowest : int
+        Direct imports of the module to report, slowest first.
+
+    Returns:
+    -------
+    dict
+        module, import_ms (median) and slowest: [name, ms] pairs from the median run.
+    """
+    backend = os.path.dirname(os.path.abspath(__file__))
+    runs = []
+    for _ in range(repeat):
+        stderr = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True, cwd=backend, check=True,
+        ).stderr
+        total, children, pending = 0, [], []
+        for line in stderr.splitlines():
+            # "import time: <self us> | <cumulative us> | <indented name>", children listed before their parent
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line.split("|")
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            if depth == 0:
+                if name.strip() == module:
+                    total, children = int(cumulative), pending
+                pending = []
+            elif depth == 1:
+                pending.append((name.strip(), int(cumulative)))
+        runs.append((total, children))
+
+    total, children = sorted(runs)[len(runs) // 2]
+    return {
+        "module": module,
+        "import_ms": round(statistics.median(run[0] for run in runs) / 1000, 1),
+        "slowest": [[name, round(us / 1000, 1)] for name, us in sorted(children, key=lambda child: -child[1])[:slowest]],
+    }
+
+
+async def run_remote(url, scenarios, requests, concurrency, seed=0):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=None) as client:
+        return [await run_scenario(client, scenario, requests, concurrency, seed) for scenario in scenarios]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the TutorAI API.")
+    parser.add_argument("--url", help="benchmark a running server instead of an in-process app on fakes")
+    parser.add_argument("--scenario", choices=SCENARIOS + ("all",), default="all")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight at once")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake LLM seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=100.0, help="fake LLM generation speed")
+    parser.add_argument("--llm-concurrency", type=int, default=32, help="scheduler concurrency for the fake LLM")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--imports", nargs="*", metavar="MODULE", help="measure import time of these modules (default: main) instead of load testing")
+    args = parser.parse_args()
+
+    if args.imports is not None:
+        results = [measure_imports(module) for module in args.imports or ["main"]]
+        if args.json:
+            print(json.dumps(results, indent=2))
+        else:
+            for result in results:
+                slowest = ", ".join(f"{name} {ms} ms" for name, ms in result["slowest"])
+                print(f"{result['module']:>12}: {result['import_ms']} ms (slowest imports: {slowest})")
+        return 0
+
+    scenarios = SCENARIOS if args.scenario == "all" else (args.scenario,)
+    if args.url:
+        results = asyncio.run(run_remote(args.url, scenarios, args.requests, args.concurrency, args.seed))
+    else:
+        results = asyncio.run(run_in_process(scenarios, args.requests, args.concurrency, args.latency, args.tokens_per_second, args.llm_concurrency, args.seed))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print(
+                f"{result['scenario']:>8}: {result['requests']} requests, {result['errors']} errors, "
+                f"{result['throughput_rps']} req/s, p50 {result['p50_ms']} ms, p90 {result['p90_ms']} ms, "
+                f"p99 {result['p99_ms']} ms, max {result['max_ms']} ms"
+            )
+    return 1 if any(result["errors"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""
+------------------------------------------------------------
+File: cache.py
+Description:
+    Two-tier cache for generated content (summaries, question
+    sets). An in-process LRU sits in front of a SQLite file so
+    repeat requests skip the LLM and survive restarts.
+
+Author: TutorAI backend maintainers
+Date: October 2026
+Version: 1.0
+
+Usage:
+    cache = ResponseCache(LRUCache(), SQLiteCache("cache.db"))
+    key = make_key("Psychology2e", "1.1", my_tutor.fingerprint())
+    value = cache.get(key)
+    if value is None:
+        value = generate()
+        cache.set(key, value)
+    value = await cache.aget(key)  # From async code: SQLite is read in a thread, not on the event loop
+
+Future Updates:
+    None planned.
+------------------------------------------------------------
+"""
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+ACCESS_RESOLUTION = 60 # Seconds; reads refresh an entry's LRU timestamp at most this often
+EVICT_INTERVAL = 64 # Writes between eviction passes of the SQLite tier (fewer for small caches)
+
+
+def make_key(*parts):
+    """
+    Builds a stable cache key out of any JSON-serializable parts.
+
+    Parameters:
+    ----------
+    *parts : any
+        Values identifying the cached item (collection, section, prompt hash, ...).
+
+    Returns:
+    -------
+    str
+        Hex digest that is identical for identical parts.
+    """
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """
+    Description: In-process least-recently-used cache with a per-entry TTL.
+
+    Attributes:
+    ----------
+    max_entries : int
+        Entries kept before the least recently used one is evicted.
+    ttl : float
+        Default lifetime of an entry in seconds. 0 or None means no expiry;
+        set() can override it per entry (ttl=0 stores an entry forever).
+    """
+
+    def __init__(self, max_entries=256, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict() # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    Description: On-disk cache tier stored in a single SQLite file.
+
+    Values are stored as JSON, so anything the API returns can be cached.
+    Expired rows are ignored on read and purged on write; once the table
+    grows past max_entries the least recently accessed rows are dropped.
+    Eviction runs once every evict_interval writes rather than on each one,
+    so the table can briefly exceed max_entries by that many rows; both
+    of its queries use an index.
+    Pinned rows (set with pin=True, e.g. by precompute.py) never expire,
+    are never evicted and do not count towards max_entries.
+
+    The file can be shared by several worker processes: it runs in WAL
+    mode so readers never block on a writer, writers wait up to timeout
+    seconds for each other, and reads only write back their access time
+    when it is more than ACCESS_RESOLUTION seconds old.
+
+    Attributes:
+    ----------
+    path : str
+        Location of the SQLite database file.
+    max_entries : int
+        Unpinned rows kept before the least recently accessed ones are evicted.
+    ttl : float
+        Default lifetime of an entry in seconds. 0 or None means no expiry;
+        set() can override it per entry (ttl=0: no expiry, but still evictable; pin=True: kept for good).
+    timeout : float
+        Seconds to wait for another process's write to finish.
+    evict_interval : int
+        Writes (by this instance) between eviction passes. Defaults to
+        EVICT_INTERVAL, or a tenth of max_entries if that is smaller.
+    """
+
+    def __init__(self, path="cache.db", max_entries=10000, ttl=7 * 24 * 3600, timeout=30, evict_interval=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evict_interval = evict_interval or max(1, min(EVICT_INTERVAL, max_entries // 10))
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL,"
+            " accessed_at REAL NOT NULL,"
+            " pinned INTEGER NOT NULL DEFAULT 0)"
+        )
+        # Files created before pinning existed lack the column
+        if "pinned" not in [row[1] for row in self._conn.execute("PRAGMA table_info(entries)")]:
+            self._conn.execute("ALTER TABLE entries ADD COLUMN pinned INTEGER NOT NULL DEFAULT 0")
+        # Eviction finds expired rows by expires_at and the oldest unpinned rows by (pinned, accessed_at)
+        self._conn.execute("DROP INDEX IF EXISTS entries_accessed")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires_at) WHERE expires_at IS NOT NULL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (pinned, accessed_at)")
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, accessed_at FROM entries WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, now),
+            ).fetchone()
+            if row is None:
+                return None
+            # Skip the write (and the file lock it takes) for entries touched recently
+            if row[1] <= now - ACCESS_RESOLUTION:
+                self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None, pin=False):
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = now + ttl if ttl and not pin else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at, accessed_at, pinned) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now, int(pin)),
+            )
+            self._writes += 1
+            if self._writes % self.evict_interval == 0:
+                self._evict(now)
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _evict(self, now):
+        # Expired rows go first, then the least recently used ones; pinned rows are left alone
+        self._conn.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM entries WHERE pinned = 0").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries WHERE pinned = 0 ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        return count
+
+
+class ResponseCache:
+    """
+    Description: Memory tier in front of an optional disk tier.
+
+    Reads check memory first, then disk; a disk hit is promoted back into
+    memory. Writes go to both tiers. From async code use aget() and aset(),
+    which run the disk tier in a thread so a busy SQLite file never blocks
+    the event loop; memory hits are still answered without a thread.
+
+    Attributes:
+    ----------
+    memory : LRUCache
+        Fast in-process tier.
+    disk : SQLiteCache or None
+        Persistent tier. Skipped entirely when None.
+    hits : int
+        Lookups answered from either tier.
+    misses : int
+        Lookups that found nothing.
+    """
+
+    def __init__(self, memory=None, disk=None):
+        self.memory = memory if memory is not None else LRUCache()
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return self._count(value)
+
+    async def aget(self, key):
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = await asyncio.to_thread(self.disk.get, key)
+            if value is not None:
+                self.memory.set(key, value)
+        return self._count(value)
+
+    def set(self, key, value, ttl=None):
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, ttl)
+
+    async def aset(self, key, value, ttl=None):
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value, ttl)
+
+    def delete(self, key):
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def _count(self, value):
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
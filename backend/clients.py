@@ -0,0 +1,94 @@
+"""
+------------------------------------------------------------
+File: clients.py
+Description:
+    Long-lived clients shared by every request: one httpx
+    connection pool (kept alive between calls) behind the
+    OpenAI LLM and embeddings clients, one TutorAI with its
+    chains prebuilt, and one Qdrant connection.
+
+Author: TutorAI backend maintainers
+Date: October 2026
+Version: 1.0
+
+Usage:
+    pool = ClientPool(openai_api_key, qdrant_url, qdrant_api_key)
+    summary = await pool.tutor.asummarize_text(text)
+    ...
+    await pool.aclose()  # On shutdown
+
+Future Updates:
+    None planned.
+------------------------------------------------------------
+"""
+import httpx
+from langchain_openai import OpenAIEmbeddings
+
+from qdrant import QdrantConnect
+from retrieval import DEFAULT_EMBEDDING_MODEL
+from scheduler import LLMScheduler
+from tutorai import TutorAI
+
+TUTOR_TEMPERATURE = 0.3 # Shared by the API and the batch jobs, so their cache fingerprints match
+
+
+class ClientPool:
+    """
+    Description: Builds and owns the API's upstream clients.
+
+    Attributes:
+    ----------
+    limits : httpx.Limits
+        Connection pool limits shared by the OpenAI and Qdrant clients.
+    http_client : httpx.Client
+        Sync HTTP client for OpenAI calls.
+    http_async_client : httpx.AsyncClient
+        Async HTTP client for OpenAI calls.
+    scheduler : LLMScheduler
+        Shared rate limiter / priority queue for every LLM call the tutor makes.
+    tutor : TutorAI
+        Shared tutor; its chains are built once and reused by every request.
+        With fast_model, grading and free-form answers go to that model first.
+    embeddings : OpenAIEmbeddings
+        Shared embeddings client.
+    embedding_model : str
+        Model the embeddings client uses; must be the one the Qdrant collection was built with.
+    db : QdrantConnect
+        Shared Qdrant connection.
+    """
+
+    def __init__(self, openai_api_key, qdrant_url, qdrant_api_key, max_connections=100, max_keepalive_connections=20, keepalive_expiry=60.0, timeout=60.0, requests_per_minute=3500, tokens_per_minute=90000, llm_concurrency=32, fast_model=None, embedding_model=DEFAULT_EMBEDDING_MODEL):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry, # Seconds an idle connection (and its TLS session) is kept open
+        )
+        self.http_client = httpx.Client(limits=self.limits, timeout=timeout)
+        self.http_async_client = httpx.AsyncClient(limits=self.limits, timeout=timeout)
+
+        self.scheduler = LLMScheduler(
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            max_concurrency=llm_concurrency,
+        )
+        self.tutor = TutorAI(
+            openai_api_key=openai_api_key,
+            temp=TUTOR_TEMPERATURE,
+            http_client=self.http_client,
+            http_async_client=self.http_async_client,
+            scheduler=self.scheduler,
+            fast_model=fast_model,
+        )
+        self.embedding_model = embedding_model
+        self.embeddings = OpenAIEmbeddings(
+            api_key=openai_api_key,
+            model=embedding_model,
+            http_client=self.http_client,
+            http_async_client=self.http_async_client,
+        )
+        self.db = QdrantConnect(host=qdrant_url, api_key=qdrant_api_key, limits=self.limits)
+
+    async def aclose(self):
+        self.http_client.close()
+        await self.http_async_client.aclose()
+        await self.db.aclose()
@@ -0,0 +1,34 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+import pytest
+
+
+# main.py and logger.py open their SQLite files and the log on import; keep them out of the source tree
+scratch = tempfile.mkdtemp(prefix="tutorai-tests-")
+atexit.register(shutil.rmtree, scratch, ignore_errors=True)
+for name, file in (
+    ("CACHE_PATH", "cache.db"),
+    ("SESSION_PATH", "sessions.db"),
+    ("EVENT_LOG_PATH", "events.db"),
+    ("QUESTION_BANK_PATH", "questions.db"),
+    ("QUIZ_PATH", "quizzes.db"),
+    ("LOG_PATH", "app.log"),
+):
+    os.environ[name] = os.path.join(scratch, file)
+
+from fakes import FakeLLM, fake_db as make_fake_db  # noqa: E402 (imports logger, which reads LOG_PATH)
+
+
+@pytest.fixture
+def fake_llm():
+    """Deterministic LLM with no latency."""
+    return FakeLLM()
+
+
+@pytest.fixture
+def fake_db():
+    """QdrantConnect over an in-memory Qdrant seeded with sample Psychology2e sections."""
+    return make_fake_db()
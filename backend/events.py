@@ -0,0 +1,328 @@
+"""
+------------------------------------------------------------
+File: events.py
+Description:
+    Append-only log of short-answer evaluations (who answered
+    which question of which section, the score, how long grading
+    took and how many tokens it cost). Requests only append to an
+    in-memory buffer; a background task writes the buffer to
+    SQLite in one transaction at a time (group commit). The same
+    transaction keeps a small rollup per day, section, score and
+    latency bucket, so score distributions and latency percentiles
+    are read from the rollup instead of scanning millions of rows.
+
+Author: TutorAI backend maintainers
+Date: October 2026
+Version: 1.0
+
+Usage:
+    events = EventLog("events.db")
+    events.start()  # From inside the event loop, e.g. the app's lifespan
+    events.record(user_id="student", section="1.1", question="...", score="4", latency=0.8, tokens=950)
+    events.scores(section="1.1")  # {"1.1": {"4": 1}}
+    events.latency(section="1.1")  # {"1.1": {"count": 1, "mean": 0.8, "p50": ..., "p90": ..., "p99": ...}}
+    await events.stop()  # Writes whatever is still buffered
+
+Future Updates:
+    None planned.
+------------------------------------------------------------
+"""
+import asyncio
+import math
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+from logger import logger
+from metrics import EVALUATION_EVENTS
+
+DAY = 86400
+LATENCY_BASE = 0.01 # Upper bound (seconds) of the first latency bucket
+LATENCY_GROWTH = 1.1 # Each bucket is 10% wider than the last, so percentiles are within 10%
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+COLUMNS = ("ts", "user_id", "quiz_id", "section", "question_index", "question", "score", "latency", "tokens", "cached")
+
+
+def latency_bucket(latency):
+    # Index of the smallest bucket whose upper bound is at least latency
+    if latency <= LATENCY_BASE:
+        return 0
+    return math.ceil(math.log(latency / LATENCY_BASE) / math.log(LATENCY_GROWTH) - 1e-9)
+
+
+def bucket_bound(bucket):
+    return LATENCY_BASE * LATENCY_GROWTH ** bucket
+
+
+class EventLog:
+    """
+    Description: Buffered, append-only evaluation log in SQLite with rollups for analytics.
+
+    Several worker processes can append to the same file; each writes its
+    own batches and the queries see every worker's events. Writing happens
+    off the event loop, in a thread, once every flush_interval seconds or as
+    soon as batch_size events are waiting.
+
+    Attributes:
+    ----------
+    path : str
+        Location of the SQLite database file.
+    batch_size : int
+        Events waiting that trigger an early flush.
+    flush_interval : float
+        Most seconds an event waits in memory before it is written.
+    max_pending : int
+        Events buffered at most; beyond this (e.g. while the disk is stalled) new events are dropped.
+
+    Methods:
+    -------
+    start()
+        Starts the background writer.
+    record()
+        Appends an evaluation to the buffer.
+    flush()
+        Writes everything buffered, in one transaction.
+    stop()
+        Stops the background writer and flushes.
+    scores()
+        Score counts per section.
+    latency()
+        Event count, mean latency, mean tokens and latency percentiles per section.
+    """
+
+    def __init__(self, path="events.db", batch_size=500, flush_interval=1.0, max_pending=100000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock() # Guards the connection
+        self._pending_lock = threading.Lock() # Guards the buffer; record() may be called from sync routes' threads
+        self._pending = []
+        self._task = None
+        self._flushing = None # The writer's flush running in a thread, if any
+        self._loop = None
+        self._wake = None
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Raw events: appended only, no secondary indexes, so inserts stay cheap
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS evaluations ("
+            " id INTEGER PRIMARY KEY,"
+            " ts REAL NOT NULL,"
+            " user_id TEXT,"
+            " quiz_id TEXT,"
+            " section TEXT NOT NULL," # "" when the request did not name a quiz
+            " question_index INTEGER,"
+            " question TEXT,"
+            " score TEXT NOT NULL,"
+            " latency REAL NOT NULL,"
+            " tokens INTEGER NOT NULL,"
+            " cached INTEGER NOT NULL)" # 1 if the evaluation was reused from the evaluation cache
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS evaluation_rollup ("
+            " section TEXT NOT NULL,"
+            " day INTEGER NOT NULL,"
+            " score TEXT NOT NULL,"
+            " bucket INTEGER NOT NULL,"
+            " count INTEGER NOT NULL,"
+            " latency_sum REAL NOT NULL,"
+            " tokens_sum INTEGER NOT NULL,"
+            " PRIMARY KEY (section, day, score, bucket)) WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def start(self):
+        # Must be called from the running event loop
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def record(self, user_id, section, question, score, latency, tokens, quiz_id=None, question_index=None, cached=False):
+        """
+        Appends one evaluation to the buffer. Never blocks on the database.
+
+        Parameters:
+        ----------
+        user_id, quiz_id : str
+            Who answered, and the quiz ID the question came from (if any).
+        section : str
+            Section the question is about, or None if unknown.
+        question : str
+            The question asked.
+        question_index : int
+            The question's position in its quiz (if any).
+        score : str
+            Score as returned by the evaluation.
+        latency : float
+            Seconds spent grading.
+        tokens : int
+            LLM tokens used grading (0 if the evaluation was reused).
+        cached : bool
+            Whether the evaluation came from the evaluation cache.
+        """
+        event = (time.time(), user_id, quiz_id, section or "", question_index, question, str(score).strip(), latency, tokens, int(cached))
+        with self._pending_lock:
+            if len(self._pending) >= self.max_pending:
+                EVALUATION_EVENTS.labels(result="dropped").inc()
+                return
+            self._pending.append(event)
+            full = len(self._pending) >= self.batch_size
+        if full and self._wake is not None:
+            # Safe from any thread; the writer flushes now instead of waiting out the interval
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def flush(self):
+        """
+        Writes every buffered event in one transaction.
+
+        Returns:
+        -------
+        int
+            How many events were written.
+        """
+        with self._pending_lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+
+        # Pre-aggregate the batch so the rollup costs one upsert per distinct key, not per event
+        rollup = defaultdict(lambda: [0, 0.0, 0])
+        for ts, _, _, section, _, _, score, latency, tokens, _ in batch:
+            totals = rollup[(section, int(ts // DAY), score, latency_bucket(latency))]
+            totals[0] += 1
+            totals[1] += latency
+            totals[2] += tokens
+
+        try:
+            with self._lock:
+                with self._conn:
+                    self._conn.executemany(f"INSERT INTO evaluations ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", batch)
+                    self._conn.executemany(
+                        "INSERT INTO evaluation_rollup (section, day, score, bucket, count, latency_sum, tokens_sum) VALUES (?, ?, ?, ?, ?, ?, ?)"
+                        " ON CONFLICT (section, day, score, bucket) DO UPDATE SET"
+                        " count = count + excluded.count, latency_sum = latency_sum + excluded.latency_sum, tokens_sum = tokens_sum + excluded.tokens_sum",
+                        [key + tuple(totals) for key, totals in rollup.items()],
+                    )
+        except sqlite3.Error as e:
+            logger.error("Failed to write %d evaluation events: %s", len(batch), e)
+            EVALUATION_EVENTS.labels(result="dropped").inc(len(batch))
+            return 0
+        EVALUATION_EVENTS.labels(result="written").inc(len(batch))
+        return len(batch)
+
+    async def stop(self):
+        # Stops the writer, lets a flush it already started finish, then writes what is left
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = self._wake = self._loop = None
+        if self._flushing is not None:
+            await asyncio.gather(self._flushing, return_exceptions=True)
+            self._flushing = None
+        await asyncio.to_thread(self.flush)
+
+    def close(self):
+        # Writes anything recorded since stop() before the connection goes away
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def scores(self, section=None, since=None):
+        """
+        Counts evaluations per section and score.
+
+        Parameters:
+        ----------
+        section : str
+            Only this section. Defaults to every section.
+        since : float
+            Only events from the day (UTC) of this Unix time onwards.
+
+        Returns:
+        -------
+        dict
+            section -> {score: count}.
+        """
+        where, params = self._where(section, since)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT section, score, SUM(count) FROM evaluation_rollup{where} GROUP BY section, score", params).fetchall()
+        distribution = defaultdict(dict)
+        for row_section, score, count in rows:
+            distribution[row_section][score] = count
+        return dict(distribution)
+
+    def latency(self, section=None, since=None, percentiles=DEFAULT_PERCENTILES):
+        """
+        Summarizes grading latency per section.
+
+        Parameters:
+        ----------
+        section, since :
+            As for scores().
+        percentiles : tuple
+            Percentiles (0-100) to estimate.
+
+        Returns:
+        -------
+        dict
+            section -> {"count", "mean", "tokens" (mean per evaluation), "p50", ...}.
+            Percentiles are the upper bound of the latency bucket they fall in,
+            so they overestimate by at most LATENCY_GROWTH.
+        """
+        where, params = self._where(section, since)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT section, bucket, SUM(count), SUM(latency_sum), SUM(tokens_sum) FROM evaluation_rollup{where}"
+                " GROUP BY section, bucket ORDER BY section, bucket",
+                params,
+            ).fetchall()
+        by_section = defaultdict(list)
+        for row_section, bucket, count, latency_sum, tokens_sum in rows:
+            by_section[row_section].append((bucket, count, latency_sum, tokens_sum))
+
+        summary = {}
+        for row_section, buckets in by_section.items():
+            count = sum(bucket[1] for bucket in buckets)
+            stats = {
+                "count": count,
+                "mean": sum(bucket[2] for bucket in buckets) / count,
+                "tokens": sum(bucket[3] for bucket in buckets) / count,
+            }
+            for percentile in percentiles:
+                rank = max(1, math.ceil(percentile / 100 * count))
+                seen = 0
+                for bucket, bucket_count, _, _ in buckets:
+                    seen += bucket_count
+                    if seen >= rank:
+                        stats[f"p{percentile:g}"] = bucket_bound(bucket)
+                        break
+            summary[row_section] = stats
+        return summary
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            # Shielded: cancelling the writer must not abandon a batch a thread is still writing
+            self._flushing = asyncio.ensure_future(asyncio.to_thread(self.flush))
+            await asyncio.shield(self._flushing)
+            self._flushing = None
+
+    @staticmethod
+    def _where(section, since):
+        clauses, params = [], []
+        if section is not None:
+            clauses.append("section = ?")
+            params.append(section)
+        if since is not None:
+            clauses.append("day >= ?")
+            params.append(int(since // DAY))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
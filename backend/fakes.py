@@ -0,0 +1,258 @@
+"""
+------------------------------------------------------------
+File: fakes.py
+Description:
+    Deterministic stand-ins for the API's upstream services, for
+    tests and benchmarks that should not pay for OpenAI or need a
+    cloud Qdrant: a LangChain-compatible fake LLM with configurable
+    latency and token rate, hashed bag-of-words embeddings, and an
+    in-memory Qdrant seeded with sample Psychology2e sections.
+
+Author: TutorAI backend maintainers
+Date: October 2026
+Version: 1.0
+
+Usage:
+    tutor = TutorAI(llm=FakeLLM(latency=0.5, tokens_per_second=50))
+    db = await afake_db()
+    pool = await fake_pool(latency=0.5)  # Drop-in for ClientPool
+
+Future Updates:
+    None planned.
+------------------------------------------------------------
+"""
+import asyncio
+import hashlib
+import json
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
+
+from clients import TUTOR_TEMPERATURE
+from qdrant import QdrantConnect
+from scheduler import LLMScheduler
+from tokens import count_tokens
+from tutorai import TutorAI
+
+EMBEDDING_SIZE = 64
+COLLECTION = "Psychology2e"
+
+# A few sections shaped like the real collection's payloads; 1.2 and 2.1 span several chunks
+SAMPLE_SECTIONS = [
+    {"section": "1.1", "chunk": 0, "title": "1.1 What Is Psychology?", "chapter": "Chapter 1 Introduction to Psychology",
+     "text": "Psychology is the scientific study of the mind and behavior. The word psychology comes from the Greek words psyche, meaning life, and logos, meaning explanation. Psychologists use the scientific method to acquire knowledge."},
+    {"section": "1.2", "chunk": 0, "title": "1.2 History of Psychology", "chapter": "Chapter 1 Introduction to Psychology",
+     "text": "Wilhelm Wundt established the first psychological laboratory in Leipzig in 1879. His approach, structuralism, used introspection to break conscious experience into its basic elements."},
+    {"section": "1.2", "chunk": 1, "title": "1.2 History of Psychology", "chapter": "Chapter 1 Introduction to Psychology",
+     "text": "William James developed functionalism, which focused on how mental activities helped an organism adapt to its environment. Freud, Gestalt psychologists, behaviorists and humanists followed."},
+    {"section": "1.3", "chunk": 0, "title": "1.3 Contemporary Psychology", "chapter": "Chapter 1 Introduction to Psychology",
+     "text": "Contemporary psychology is diverse. Biopsychology studies how biology influences behavior, while cognitive psychology studies thoughts and their relationship to experiences and actions."},
+    {"section": "2.1", "chunk": 0, "title": "2.1 Why Is Research Important?", "chapter": "Chapter 2 Psychological Research",
+     "text": "Scientific research is a critical tool for navigating the complex world. Without it we would be forced to rely on intuition, other people's authority, and blind luck."},
+    {"section": "2.1", "chunk": 1, "title": "2.1 Why Is Research Important?", "chapter": "Chapter 2 Psychological Research",
+     "text": "Research is grounded in empiricism: knowledge based on observations. Hypotheses are tested, and theories are refined or rejected based on the evidence."},
+    {"section": "2.2", "chunk": 0, "title": "2.2 Approaches to Research", "chapter": "Chapter 2 Psychological Research",
+     "text": "Clinical or case studies, naturalistic observation, surveys, archival research and longitudinal studies are descriptive methods. Correlational and experimental designs test relationships between variables."},
+]
+
+
+class FakeLLM(LLM):
+    """
+    Description: Deterministic LLM that answers TutorAI's prompts in the formats its parsers expect.
+
+    Responses depend only on the prompt. Each call waits latency seconds
+    (time to first token) plus one token interval per response token, so
+    throughput and streaming behave like a real model without network calls.
+
+    Attributes:
+    ----------
+    latency : float
+        Seconds before the first token.
+    tokens_per_second : float
+        Generation speed; 0 returns the whole response immediately after latency.
+    summary_words : int
+        Length of generated summaries.
+    calls : int
+        Prompts answered so far.
+    """
+
+    latency: float = 0.0
+    tokens_per_second: float = 0.0
+    summary_words: int = 120
+    calls: int = 0
+    model_name: str = "fake-llm"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        response = self.respond(prompt)
+        time.sleep(self._duration(response))
+        return response
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        response = self.respond(prompt)
+        await asyncio.sleep(self._duration(response))
+        return response
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> Iterator[GenerationChunk]:
+        time.sleep(self.latency)
+        for piece in self._pieces(self.respond(prompt)):
+            if self.tokens_per_second:
+                time.sleep(1 / self.tokens_per_second)
+            yield GenerationChunk(text=piece)
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> AsyncIterator[GenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for piece in self._pieces(self.respond(prompt)):
+            if self.tokens_per_second:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            yield GenerationChunk(text=piece)
+
+    def respond(self, prompt):
+        self.calls += 1
+        structured = prompt.rstrip().endswith("JSON:")
+        if "Student's answer:" in prompt:
+            answer = _between(prompt, "Student's answer:\n\n", "\n\n ")
+            score = 1 + int(hashlib.sha256(answer.encode("utf-8")).hexdigest(), 16) % 10
+            evaluation = f"The answer covers {'most' if score > 5 else 'some'} of the key points in the text."
+            if structured:
+                return json.dumps({"score": score, "evaluation": evaluation})
+            return f"Score: {score}\nEvaluation: {evaluation}"
+        if prompt.rstrip().endswith("Answer:"):
+            # Free-form questions: answer with the first sentence of the retrieved text
+            context = _between(prompt, "Use the following text:\n\n", "\n\nThe text is made up")
+            lines = [line for line in context.splitlines() if line.strip() and not line.startswith("[")]
+            return "According to the text: " + (lines[0].split(". ")[0] if lines else "the text does not say.")
+        # Different texts (e.g. different learning objectives) get different questions
+        topic = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:6]
+        count = re.search(r"Create (\d+) multiple-choice", prompt)
+        if count and structured:
+            return json.dumps([
+                {"question": f"Which statement about topic {topic}-{i} is true?", "options": ["Option one", "Option two", "Option three", "Option four"], "answer": "ABCD"[i % 4]}
+                for i in range(1, int(count.group(1)) + 1)
+            ])
+        if count:
+            return "\n".join(
+                f"Question {i}: Which statement about topic {topic}-{i} is true?\nA) Option one\nB) Option two\nC) Option three\nD) Option four\nCorrect Answer: {'ABCD'[i % 4]}"
+                for i in range(1, int(count.group(1)) + 1)
+            )
+        count = re.search(r"asking students (\d+) questions", prompt)
+        if count:
+            return "\n".join(f"{i}. What does the text say about topic {topic}-{i}?" for i in range(1, int(count.group(1)) + 1))
+        # Summaries: learning objectives, then the text's own words, cycled to length
+        words = (_between(prompt, "Use the following text:\n\n", "\n\n") or prompt).split() or ["psychology"]
+        body = " ".join(words[i % len(words)] for i in range(self.summary_words))
+        return f"Learning objectives:\n1. Understand the main ideas.\n2. Apply the key terms.\n\nSummary:\n{body}"
+
+    def _duration(self, response):
+        if not self.tokens_per_second:
+            return self.latency
+        return self.latency + count_tokens(response) / self.tokens_per_second
+
+    @staticmethod
+    def _pieces(text):
+        return re.findall(r"\S+\s*|\s+", text)
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Description: Hashed bag-of-words embeddings. Texts sharing most words are close in cosine similarity.
+    """
+
+    def __init__(self, size=EMBEDDING_SIZE):
+        self.size = size
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        vector = np.zeros(self.size, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            vector[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % self.size] += 1.0
+        return vector.tolist()
+
+    async def aembed_documents(self, texts):
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+
+def sample_points(sections=SAMPLE_SECTIONS, embeddings=None):
+    embeddings = embeddings or FakeEmbeddings()
+    return [
+        models.PointStruct(id=i + 1, vector=embeddings.embed_query(payload["text"]), payload=payload)
+        for i, payload in enumerate(sections)
+    ]
+
+
+def fake_db(sections=SAMPLE_SECTIONS, collection=COLLECTION):
+    """
+    QdrantConnect over in-memory sync and async clients seeded with sections.
+    Call from synchronous code (e.g. a pytest fixture); use afake_db() inside an event loop.
+    """
+    return asyncio.run(afake_db(sections, collection))
+
+
+async def afake_db(sections=SAMPLE_SECTIONS, collection=COLLECTION):
+    points = sample_points(sections)
+    vectors = models.VectorParams(size=EMBEDDING_SIZE, distance=models.Distance.COSINE)
+
+    client = QdrantClient(":memory:")
+    client.create_collection(collection, vectors_config=vectors)
+    client.upsert(collection, points)
+
+    async_client = AsyncQdrantClient(":memory:")
+    await async_client.create_collection(collection, vectors_config=vectors)
+    await async_client.upsert(collection, points)
+
+    return QdrantConnect(host=None, api_key=None, qdrant_client=client, async_qdrant_client=async_client)
+
+
+class FakePool:
+    """
+    Description: Same attributes as clients.ClientPool, backed by the fakes above.
+
+    Attributes:
+    ----------
+    llm : FakeLLM
+        The tutor's LLM, for inspecting call counts.
+    scheduler : LLMScheduler
+        Real scheduler with the given concurrency and no rate limits to speak of.
+    tutor : TutorAI
+        Tutor using the fake LLM.
+    embeddings : FakeEmbeddings
+        Embeddings for the evaluation cache.
+    embedding_model : str
+        Name reported for the fake embeddings (not a known model, so the vector size check is skipped).
+    db : QdrantConnect
+        In-memory Qdrant connection.
+    """
+
+    def __init__(self, db, latency=0.0, tokens_per_second=0.0, llm_concurrency=32):
+        self.llm = FakeLLM(latency=latency, tokens_per_second=tokens_per_second)
+        self.scheduler = LLMScheduler(requests_per_minute=10**9, tokens_per_minute=10**12, max_concurrency=llm_concurrency)
+        self.tutor = TutorAI(temp=TUTOR_TEMPERATURE, scheduler=self.scheduler, llm=self.llm)
+        self.embeddings = FakeEmbeddings()
+        self.embedding_model = "fake-embeddings"
+        self.db = db
+
+    async def aclose(self):
+        await self.db.aclose()
+
+
+async def fake_pool(latency=0.0, tokens_per_second=0.0, llm_concurrency=32, sections=SAMPLE_SECTIONS):
+    return FakePool(await afake_db(sections), latency, tokens_per_second, llm_concurrency)
+
+
+def _between(text, start, end):
+    head, found, rest = text.partition(start)
+    return rest.partition(end)[0] if found else ""
@@ -0,0 +1,129 @@
+"""
+------------------------------------------------------------
+File: locks.py
+Description:
+    Cross-process locks for API workers sharing one machine.
+    SingleFlight only coalesces calls inside one process; when
+    several uvicorn workers serve the API, a lock file picked by
+    hashing the key makes sure only one of them pays for a given
+    LLM generation while the others wait and then read its result
+    from the shared SQLite cache.
+
+Author: TutorAI backend maintainers
+Date: October 2026
+Version: 1.0
+
+Usage:
+    locks = FileLocks("locks")
+    async with locks.hold(key):
+        value = cache.get(key)
+        if value is None:
+            value = await generate()
+            cache.set(key, value)
+
+Future Updates:
+    None planned.
+------------------------------------------------------------
+"""
+import asyncio
+import hashlib
+import os
+from contextlib import asynccontextmanager
+
+try:
+    import fcntl
+except ImportError: # Windows: no flock(), workers fall back to running in one process
+    fcntl = None
+
+
+class FileLocks:
+    """
+    Description: Exclusive advisory locks keyed by string, striped over a fixed set of lock files.
+
+    Each key maps to one of stripes lock files by its hash, so the directory
+    never holds more than stripes files however many sections are generated.
+    Two keys sharing a stripe are serialized, which only delays the second
+    by one generation; holds must not be nested, or two keys sharing a stripe
+    would wait on each other until the timeout.
+
+    Locks are taken with flock(), so the operating system releases them if
+    a worker dies while holding one. Waiting is done by polling with
+    asyncio.sleep() rather than a blocking call, so a worker keeps serving
+    other requests while it waits. With no directory (a single worker) or
+    without fcntl (Windows) hold() does not lock at all.
+
+    Attributes:
+    ----------
+    directory : str or None
+        Where lock files are created. None disables locking.
+    poll_interval : float
+        Seconds between attempts to take a busy lock.
+    timeout : float
+        Seconds to wait for a lock before giving up and running anyway.
+        A stuck holder then costs a duplicate generation, not an outage.
+    stripes : int
+        Number of lock files keys are spread over.
+
+    Methods:
+    -------
+    stripe()
+        Index of the lock file a key uses.
+    hold()
+        Async context manager holding the lock for a key.
+    """
+
+    def __init__(self, directory="locks", poll_interval=0.05, timeout=120, stripes=256):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.stripes = stripes
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def stripe(self, key):
+        # Same key, same stripe, in every worker
+        digest = hashlib.sha256(str(key).encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") % self.stripes
+
+    @asynccontextmanager
+    async def hold(self, key):
+        """
+        Holds the lock for key for the duration of the async with block.
+
+        Parameters:
+        ----------
+        key : str
+            Identifies the shared work, e.g. a cache key.
+
+        Returns:
+        -------
+        bool
+            Whether the lock was acquired (False after a timeout or when locking is disabled).
+
+        Raises:
+        ------
+        None
+
+        """
+        if self.directory is None or fcntl is None:
+            yield False
+            return
+
+        fd = os.open(os.path.join(self.directory, f"{self.stripe(key)}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        acquired = False
+        try:
+            deadline = asyncio.get_running_loop().time() + self.timeout
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    acquired = True
+                    break
+                except BlockingIOError:
+                    if asyncio.get_running_loop().time() >= deadline:
+                        break
+                    await asyncio.sleep(self.poll_interval)
+            yield acquired
+        finally:
+            if acquired:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
@@ -1,22 +1,72 @@
+import atexit
+import contextvars
+import json
 import logging
+import os
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler, WatchedFileHandler
+
+from dotenv import load_dotenv
+
+load_dotenv()  # logger is imported before anything else reads .env
+
+# Request-scoped trace ID, set by the API's middleware and stamped onto every log line
+trace_id = contextvars.ContextVar("trace_id", default="-")
+
+class TraceIdFilter(logging.Filter):
+    def filter(self, record):
+        record.trace_id = trace_id.get()
+        return True
+
+class JsonFormatter(logging.Formatter):
+    # One JSON object per line, easy to ship to a log pipeline or grep with jq
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "trace_id": getattr(record, "trace_id", "-"),
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+# Settings (all optional)
+log_level = os.getenv("LOG_LEVEL", "INFO").upper()  # DEBUG, INFO, WARNING, etc.
+log_path = os.getenv("LOG_PATH", "app.log")
+log_format = os.getenv("LOG_FORMAT", "json")  # "json" or "text" for the log file; the console is always text
+log_max_bytes = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))  # Rotate the file once it reaches this size...
+log_rotate_when = os.getenv("LOG_ROTATE_WHEN")  # ...or on a schedule instead, e.g. "midnight" or "H"
+log_backups = int(os.getenv("LOG_BACKUPS", 5))  # Rotated files kept
+workers = int(os.getenv("WEB_CONCURRENCY", 1))  # Set by serve.py; with several workers the file is never rotated here
 
 # Set up the logger
 logger = logging.getLogger('my_logger')
-logger.setLevel(logging.INFO)  # You can adjust this level (DEBUG, INFO, WARNING, etc.)
+logger.setLevel(log_level)
+logger.addFilter(TraceIdFilter())
 
-# Create file handler
-file_handler = logging.FileHandler('app.log')  # Log to this file
-file_handler.setLevel(logging.INFO)
+text_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s] %(message)s\n')
 
-# Create a formatter and set it for the file handler
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s\n')
-file_handler.setFormatter(formatter)
+# Create a rotating file handler. Several worker processes cannot rotate one file safely,
+# so they only append and reopen it once an external tool (e.g. logrotate) has moved it.
+if workers > 1:
+    file_handler = WatchedFileHandler(log_path, encoding="utf-8", delay=True)
+elif log_rotate_when:
+    file_handler = TimedRotatingFileHandler(log_path, when=log_rotate_when, backupCount=log_backups, encoding="utf-8", delay=True)
+else:
+    file_handler = RotatingFileHandler(log_path, maxBytes=log_max_bytes, backupCount=log_backups, encoding="utf-8", delay=True)
+file_handler.setFormatter(JsonFormatter() if log_format == "json" else text_formatter)
 
-# Add the file handler to the logger
-logger.addHandler(file_handler)
-
-# Optionally, add a console handler if you want logs to also be printed to the console
+# Also print to the console
 console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)  # Logs printed to console will be at least INFO level
-console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
+console_handler.setFormatter(text_formatter)
+
+# The logger itself only puts records on a queue; a background thread does the
+# formatting and the file/console I/O, so logging never blocks the event loop
+log_queue = queue.SimpleQueue()
+logger.addHandler(QueueHandler(log_queue))
+listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+listener.start()
+atexit.register(listener.stop)  # Flushes whatever is still queued on shutdown
@@ -16,18 +16,36 @@ Future Updates:
     the actual link. Will also need add features as TutorAI gains them.
 ------------------------------------------------------------
 """
-from tutorai import TutorAI
-from qdrant import QdrantConnect
+from cache import LRUCache, ResponseCache, SQLiteCache, make_key
+from singleflight import SingleFlight
+from sections import QUESTION_COUNT, payload_key, section_key, section_text
+from semantic_cache import SemanticCache
+from question_bank import QuestionBank, MULTIPLECHOICE, SHORTANSWER, afill, bank_key
+from quizzes import AnswerKeys
+from sessions import QuizSessions
+from locks import FileLocks
+from manifest import ContentManifest
+from events import EventLog
+from tokens import track_usage
+from retrieval import Retriever, format_context
+from metrics import CACHE_LOOKUPS, HTTP_REQUEST_SECONDS, IN_FLIGHT, REGISTRY, STAGE_SECONDS
 
 from fastapi import FastAPI
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from fastapi import Depends
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv # Allows you to load environment variables from a .env file
 import os # Allows you to access environment variables
-from logger import logger
+import json
+import asyncio
+import time
+import uuid
+from logger import logger, trace_id
 
 ##############################
 # Environment Variables      #
@@ -43,13 +61,154 @@ if environment == "production":
 else:
     frontend_url = os.getenv("FRONTEND_URL_LOCAL")
     backend_url = os.getenv("BACKEND_URL_LOCAL")
+cache_path = os.getenv("CACHE_PATH", "cache.db") # SQLite file backing the content cache
+cache_ttl = int(os.getenv("CACHE_TTL", 7 * 24 * 3600)) # Seconds before a cached summary is regenerated
+manifest_refresh = float(os.getenv("MANIFEST_REFRESH", 30)) # Seconds before section revisions written by sync.py are picked up
+batch_concurrency = int(os.getenv("BATCH_CONCURRENCY", 5)) # Max parallel LLM calls per /query-batch request
+semantic_cache_threshold = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.97)) # Similarity needed to reuse a prior evaluation
+http_max_connections = int(os.getenv("HTTP_MAX_CONNECTIONS", 100)) # Upstream (OpenAI/Qdrant) connection pool size
+http_keepalive_connections = int(os.getenv("HTTP_KEEPALIVE_CONNECTIONS", 20)) # Idle connections kept open for reuse
+llm_requests_per_minute = int(os.getenv("LLM_REQUESTS_PER_MINUTE", 3500)) # Match your OpenAI rate limits
+llm_tokens_per_minute = int(os.getenv("LLM_TOKENS_PER_MINUTE", 90000))
+llm_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", 32)) # Upper bound of the adaptive concurrency window
+fast_model = os.getenv("FAST_MODEL", "gpt-4o-mini") or None # Grades answers and answers /ask; borderline grades are redone by the main model. Empty disables.
+trace_ids_enabled = os.getenv("TRACE_IDS", "true").lower() == "true" # Tag each request's log lines with a trace ID
+question_bank_path = os.getenv("QUESTION_BANK_PATH", "questions.db") # SQLite file holding the per-section question pools
+workers = int(os.getenv("WEB_CONCURRENCY", 1)) # Worker processes serving the API (set by serve.py); they share the SQLite files below and split the LLM limits
+session_path = os.getenv("SESSION_PATH", "sessions.db") or None # SQLite file so quiz sessions survive restarts (required with several workers); empty keeps them in memory only
+quiz_path = os.getenv("QUIZ_PATH") or ("quizzes.db" if workers > 1 else None) # Same for multiple-choice answer keys
+lock_dir = os.getenv("LOCK_DIR", "locks") # Lock files that let one worker generate a section while the others wait for it
+ask_top_k = int(os.getenv("ASK_TOP_K", 5)) # Chunks retrieved per /ask question
+ask_context_tokens = int(os.getenv("ASK_CONTEXT_TOKENS", 1200)) # Most tokens of textbook text sent with each /ask question
+ask_score_threshold = float(os.getenv("ASK_SCORE_THRESHOLD")) if os.getenv("ASK_SCORE_THRESHOLD") else None # Minimum similarity for a chunk to be used
+qdrant_vector_name = os.getenv("QDRANT_VECTOR_NAME") or None # Named vector to search, if the collection has several
+embedding_model = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small") # Must be the model the collection's vectors were made with; checked against their size at startup
+session_ttl = int(os.getenv("SESSION_TTL", 6 * 3600)) # Seconds a quiz ID stays valid for /query
+event_log_path = os.getenv("EVENT_LOG_PATH", "events.db") # SQLite file of graded answers, read by /analytics/*
+event_flush_interval = float(os.getenv("EVENT_FLUSH_INTERVAL", 1.0)) # Seconds graded answers wait in memory before being written
 
 ##############################
 # Initialize Instances       #
 ##############################
-app = FastAPI()
-my_tutor = TutorAI(openai_api_key=openai_api_key, temp=0.3)
-my_db = QdrantConnect(host=qdrant_link, api_key=qdrant_api_key)
+content_cache = ResponseCache(
+    memory=LRUCache(max_entries=int(os.getenv("CACHE_MEMORY_ENTRIES", 256)), ttl=cache_ttl),
+    disk=SQLiteCache(path=cache_path, max_entries=int(os.getenv("CACHE_DISK_ENTRIES", 10000)), ttl=cache_ttl),
+)
+manifest = ContentManifest(path=cache_path, refresh_interval=manifest_refresh) # Section revisions; a section changed in Qdrant gets new cache keys
+flight = SingleFlight() # Coalesces identical concurrent Qdrant/LLM calls
+locks = FileLocks(lock_dir if workers > 1 else None) # SingleFlight coalesces within a worker, these across workers
+
+# Stores the app closes on shutdown are opened when it starts, so every run of the
+# lifespan (a restarted app, each test client) gets open ones.
+question_bank = None
+answer_keys = None
+quiz_sessions = None
+event_log = None
+
+def open_stores():
+    global question_bank, answer_keys, quiz_sessions, event_log
+    question_bank = QuestionBank(
+        path=question_bank_path,
+        max_size=int(os.getenv("QUESTION_BANK_SIZE", 60)), # Questions generated per section before refills stop
+        low_water=int(os.getenv("QUESTION_BANK_LOW_WATER", 10)), # Refill once a student has fewer unseen questions left
+        shared=workers > 1,
+    )
+    answer_keys = AnswerKeys(ttl=int(os.getenv("QUIZ_TTL", 24 * 3600)), path=quiz_path) # Multiple-choice answer keys, graded without the LLM
+    quiz_sessions = QuizSessions(ttl=session_ttl, path=session_path) # Summary and questions behind each quiz ID, so /query doesn't resend them
+    event_log = EventLog(path=event_log_path, flush_interval=event_flush_interval) # Every graded short answer, written in batches off the request path
+
+async def close_stores():
+    global question_bank, answer_keys, quiz_sessions, event_log
+    await event_log.stop()
+    event_log.close()
+    await question_bank.aclose()
+    answer_keys.close()
+    quiz_sessions.close()
+    question_bank = answer_keys = quiz_sessions = event_log = None
+
+# Upstream clients live for the whole application and are shared by every request.
+# They are built in the background once the app starts (so it answers /ready and /metrics
+# right away) and closed when it shuts down. Routes that need them await warm() first.
+pool = None
+my_tutor = None
+my_db = None
+evaluation_cache = None
+retriever = None
+startup_task = None
+startup_seconds = None
+
+async def create_pool():
+    # Swapped out by benchmark.py for fakes.fake_pool() to run without OpenAI or a cloud Qdrant.
+    # Each worker gets its share of the LLM limits, so adding workers does not exceed the account's quota.
+    # LangChain, OpenAI and Qdrant take seconds to import, so they are imported (and the clients built) off the event loop.
+    def build():
+        from clients import ClientPool
+        return ClientPool(
+            openai_api_key, qdrant_link, qdrant_api_key,
+            max_connections=http_max_connections,
+            max_keepalive_connections=http_keepalive_connections,
+            requests_per_minute=max(1, llm_requests_per_minute // workers),
+            tokens_per_minute=max(1, llm_tokens_per_minute // workers),
+            llm_concurrency=max(1, llm_concurrency // workers),
+            fast_model=fast_model,
+            embedding_model=embedding_model,
+        )
+    return await asyncio.to_thread(build)
+
+async def start_pool():
+    global pool, my_tutor, my_db, evaluation_cache, retriever, startup_seconds
+    started = time.perf_counter()
+    pool = await create_pool()
+    my_tutor = pool.tutor
+    my_db = pool.db
+    evaluation_cache = SemanticCache(
+        pool.embeddings,
+        threshold=semantic_cache_threshold,
+        max_per_scope=int(os.getenv("SEMANTIC_CACHE_PER_QUESTION", 200)),
+        max_scopes=int(os.getenv("SEMANTIC_CACHE_QUESTIONS", 1000)),
+    )
+    retriever = Retriever(
+        pool.embeddings, pool.db, "Psychology2e",
+        top_k=ask_top_k,
+        token_budget=ask_context_tokens,
+        score_threshold=ask_score_threshold,
+        vector_name=qdrant_vector_name,
+    )
+    # /ask is turned off (not the whole app) if the collection was built with another embedding model
+    try:
+        problem = await retriever.acheck(pool.embedding_model)
+        if problem:
+            logger.error(problem)
+    except Exception as e:
+        logger.warning("Could not check the vector size of the Psychology2e collection: %s", e)
+    startup_seconds = time.perf_counter() - started
+    STAGE_SECONDS.labels(stage="startup").observe(startup_seconds)
+    logger.info("Upstream clients ready in %.2fs", startup_seconds)
+
+async def warm():
+    # Waits for the background startup; requests arriving during it queue here instead of failing
+    if pool is None:
+        try:
+            await asyncio.shield(startup_task)
+        except Exception as e:
+            raise HTTPException(status_code=503, detail=f"Upstream clients failed to start: {e}")
+
+@asynccontextmanager
+async def lifespan(app):
+    global startup_task, pool, my_tutor, my_db, evaluation_cache, retriever
+    open_stores()
+    startup_task = asyncio.create_task(start_pool())
+    event_log.start()
+    yield
+    if not startup_task.done():
+        startup_task.cancel()
+    await asyncio.gather(startup_task, return_exceptions=True)
+    await close_stores()
+    if pool is not None:
+        await pool.aclose()
+    pool = my_tutor = my_db = evaluation_cache = retriever = None
+
+app = FastAPI(lifespan=lifespan)
 
 ##############################
 # Add CORS Middleware        #
@@ -63,64 +222,397 @@ app.add_middleware(
 )
 
 ##############################
-# Returns a new TutorAI      #
+# Metrics and Tracing        #
+##############################
+# Cache and scheduler counters are read when /metrics is scraped
+CACHE_LOOKUPS.labels(cache="content", result="hit").set_function(lambda: content_cache.hits)
+CACHE_LOOKUPS.labels(cache="content", result="miss").set_function(lambda: content_cache.misses)
+CACHE_LOOKUPS.labels(cache="evaluation", result="hit").set_function(lambda: evaluation_cache.hits if evaluation_cache else 0)
+CACHE_LOOKUPS.labels(cache="evaluation", result="miss").set_function(lambda: evaluation_cache.misses if evaluation_cache else 0)
+IN_FLIGHT.labels(kind="llm_calls").set_function(lambda: pool.scheduler.in_flight if pool else 0)
+IN_FLIGHT.labels(kind="llm_queued").set_function(lambda: pool.scheduler.queued() if pool else 0)
+IN_FLIGHT.labels(kind="generations").set_function(lambda: flight.in_flight())
+
+@app.middleware("http")
+async def observe_requests(request: Request, call_next):
+    # Reuse the caller's X-Request-ID if it sent one, so traces line up across services
+    if trace_ids_enabled:
+        trace_id.set(request.headers.get("X-Request-ID") or uuid.uuid4().hex)
+    requests_in_flight = IN_FLIGHT.labels(kind="http_requests")
+    requests_in_flight.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        if trace_ids_enabled:
+            response.headers["X-Request-ID"] = trace_id.get()
+        return response
+    finally:
+        requests_in_flight.dec()
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        HTTP_REQUEST_SECONDS.labels(path=path, status=status).observe(time.perf_counter() - started)
+
+@app.get("/metrics")
+def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/ready")
+def ready():
+    # Readiness probe: 200 once the LLM and Qdrant clients are built, 503 while starting or if startup failed
+    if pool is not None:
+        status = "ready"
+    elif startup_task is not None and startup_task.done() and not startup_task.cancelled() and startup_task.exception():
+        status = "failed"
+    else:
+        status = "starting"
+    body = {
+        "status": status,
+        "startup_seconds": startup_seconds,
+        "content_cache_entries": len(content_cache.memory), # Sections this worker can serve without SQLite or the LLM
+    }
+    if status == "failed":
+        body["error"] = str(startup_task.exception())
+    return JSONResponse(body, status_code=200 if status == "ready" else 503)
+
+##############################
+# Returns the shared TutorAI #
 ##############################
 def get_tutor():
-    tutor = TutorAI(openai_api_key=openai_api_key, temp=0.3)
-    # tutor.set_document_text(my_db.get_subchapter_from_title("Psychology2e", "1.1 What Is Psychology?"))
-    return tutor
-
-def qdrant_search(cluster, section):
-    # Response includes text, chapter, title
-    response = my_db.get_subchapter_from_section(cluster, section)
-    
+    # Reuses the application's tutor (and its connection pool) instead of building a new one per call
+    return my_tutor
+
+async def qdrant_search(cluster, section):
+    # Response includes text (every chunk of the section), chapter, title. Concurrent lookups of the same section share one scroll,
+    # and the payload is kept in the shared cache so other workers (and restarts) skip Qdrant too.
+    key = payload_key(cluster, section, revision=await manifest.arevision(cluster, section))
+    response = await content_cache.aget(key)
+    if response is None:
+        response = await flight.do(key, my_db.aget_full_section, cluster, section)
+        if response is None:
+            raise HTTPException(status_code=404, detail=f"Section {section} not found")
+        await content_cache.aset(key, response)
+
     return response
 
+async def generate_section(cluster, section, key):
+    # Another request may have filled the cache while we were waiting to start
+    cached = await content_cache.aget(key)
+    if cached is not None:
+        return cached
+
+    async with locks.hold(key):
+        # ...or another worker, while we waited for its lock
+        cached = await content_cache.aget(key)
+        if cached is not None:
+            return cached
+
+        # Get a response for the current section
+        logger.debug("Section: %s", section)
+        response = await qdrant_search(cluster, section)
+
+        # Retrieve summary and questions
+        text = section_text(section, response)
+        summary = await flight.do(("summary", make_key(text)), my_tutor.asummarize_text, text=text)
+        questions = await flight.do(("questions", QUESTION_COUNT, make_key(summary)), my_tutor.ashortanswer_questions, QUESTION_COUNT, text=summary)
+
+        result = {"summary": summary, "questions": questions}
+        await content_cache.aset(key, result)
+    return result
+
+async def fill_question_bank(pool_key, kind, summary):
+    # One worker fills a pool at a time; the others pick up what it added instead of generating their own
+    async with locks.hold(("question-bank", pool_key)):
+        added = await question_bank.arefresh(pool_key)
+        if added:
+            return added
+        return await afill(question_bank, my_tutor, pool_key, kind, summary)
+
+async def sample_questions(cluster, section, summary, user_id, kind=SHORTANSWER, seed=None):
+    # Serves a set of questions this student has not seen yet from the section's question bank.
+    # seed: questions already generated for the section, used to start an empty pool without waiting on the LLM.
+    pool_key = bank_key(cluster, section, my_tutor.fingerprint(), kind, revision=await manifest.arevision(cluster, section))
+    size = await question_bank.asize(pool_key)
+    if seed and size < QUESTION_COUNT:
+        size += await question_bank.aadd(pool_key, kind, [("", question) for question in seed])
+    if size < QUESTION_COUNT:
+        await flight.do(("question-bank", pool_key), fill_question_bank, pool_key, kind, summary)
+
+    questions = await question_bank.asample(pool_key, user_id, QUESTION_COUNT)
+
+    # Top up the pool in the background before this student runs out
+    if await question_bank.aneeds_refill(pool_key, user_id):
+        question_bank.schedule_refill(pool_key, fill_question_bank, pool_key, kind, summary)
+    return questions
+
 # Define a basic route for testing
 @app.get("/")
 def read_root():
     return {"message": "Hello, World!"}
 
 @app.get("/generate-summary-and-questions")
-async def generate_summary_and_questions(section: str = "1.1"):
-    # Get a response for the current section
-    logger.debug(f"Section: {section}")
-    response = qdrant_search("Psychology2e", section)
-    
-    # Retrieve summary and questions
-    summary = my_tutor.summarize_text(text="Section " + str(section) + " of " + response["chapter"] + ": " + response["text"])
-    questions = my_tutor.shortanswer_questions(5, text=summary)
-
-    # Return the summary and questions
-    return{"summary": summary, "questions": questions}
+async def generate_summary_and_questions(section: str = "1.1", user_id: str | None = None):
+    await warm()
+    # Serve from the cache if this section was already generated with the same prompts/model
+    key = section_key("Psychology2e", section, my_tutor.fingerprint(), revision=await manifest.arevision("Psychology2e", section))
+    result = await content_cache.aget(key)
+
+    # Students opening the same section at once wait on a single generation
+    if result is None:
+        result = await flight.do(key, generate_section, "Psychology2e", section, key)
+
+    # With a user ID, each visit gets questions from the question bank the student has not seen yet
+    questions = result["questions"]
+    if user_id is not None:
+        questions = await sample_questions("Psychology2e", section, result["summary"], user_id, seed=result["questions"])
+
+    # Return the summary and questions, plus the quiz ID answers refer to them by
+    quiz_id = await quiz_sessions.acreate(section, result["summary"], questions)
+    return {"summary": result["summary"], "questions": questions, "quiz_id": quiz_id}
+
+def sse_event(event, data):
+    # Format one Server-Sent Event. Data is JSON-encoded so newlines in the summary survive the wire format.
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_section(cluster, section, key):
+    # Clients streaming the same uncached section at once share one generation: each is replayed
+    # the summary chunks produced so far, then follows along. Every client still gets its own quiz ID.
+    if await content_cache.aget(key) is None:
+        events = flight.stream(key, section_events, cluster, section, key)
+    else:
+        events = section_events(cluster, section, key)
+    summary, questions = "", []
+    async for event, data in events:
+        if event == "summary":
+            summary += data
+        else:
+            questions = data
+        yield sse_event(event, data)
+    yield sse_event("done", {"quiz_id": await quiz_sessions.acreate(section, summary, questions)})
+
+async def section_events(cluster, section, key):
+    # Yields ("summary", text) events, then one ("questions", list) event
+    cached = await content_cache.aget(key)
+    if cached is None:
+        async with locks.hold(key):
+            # Another worker may have generated the section while we waited for its lock
+            cached = await content_cache.aget(key)
+            if cached is None:
+                async for event in stream_generation(cluster, section, key):
+                    yield event
+                return
+    yield "summary", cached["summary"]
+    yield "questions", cached["questions"]
+
+async def stream_generation(cluster, section, key):
+    response = await qdrant_search(cluster, section)
+    text = section_text(section, response)
+
+    # Forward summary tokens as soon as the LLM produces them
+    chunks = []
+    async for chunk in my_tutor.astream_summary(text=text):
+        chunks.append(chunk)
+        yield "summary", chunk
+    summary = "".join(chunks)
+
+    # Questions need the full summary, so they follow as their own event
+    questions = await flight.do(("questions", QUESTION_COUNT, make_key(summary)), my_tutor.ashortanswer_questions, QUESTION_COUNT, text=summary)
+    await content_cache.aset(key, {"summary": summary, "questions": questions})
+    yield "questions", questions
+
+@app.get("/generate-summary-stream")
+async def generate_summary_stream(section: str = "1.1"):
+    # Same content as /generate-summary-and-questions, delivered as Server-Sent Events:
+    # "summary" events carry summary chunks, then one "questions" event, then "done" with the quiz ID.
+    await warm()
+    key = section_key("Psychology2e", section, my_tutor.fingerprint(), revision=await manifest.arevision("Psychology2e", section))
+    # Look the section up before the response starts, so an unknown section is still a 404 and not a broken stream
+    if await content_cache.aget(key) is None:
+        await qdrant_search("Psychology2e", section)
+    return StreamingResponse(
+        stream_section("Psychology2e", section, key),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.get("/retrieve-document")
 async def retrieve_document():
     document = None
     return {"document": document}
 
-# Define the Query model to accept question, user answer and summary
+# Define the Query model to accept the user answer and which question it answers.
+# New clients send quiz_id + question_index; question + summary are still accepted from older ones.
 class Query(BaseModel):
-    question: str
     user_answer: str
-    summary: str
     user_id: str
     id: str
+    quiz_id: str | None = None
+    question_index: int | None = None
+    question: str | None = None
+    summary: str | None = None
+
+async def resolve_question(quiz_id, question_index, question, summary):
+    # Returns (question, summary, section), looked up by quiz ID when one is given. Without one the section is unknown.
+    if quiz_id is None:
+        if question is None or summary is None:
+            raise HTTPException(status_code=422, detail="Send quiz_id and question_index, or question and summary")
+        return question, summary, None
+    quiz = await quiz_sessions.aget(quiz_id)
+    if quiz is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired quiz")
+    if question_index is None or not 0 <= question_index < len(quiz["questions"]):
+        raise HTTPException(status_code=422, detail="question_index is out of range for this quiz")
+    return quiz["questions"][question_index], quiz["summary"], quiz["section"]
 
 @app.post("/query")
 async def query_llm(query: Query):
+    await warm()
     # Extract the question and user answer from the request body
-    user_question = query.question
+    user_question, summary, section = await resolve_question(query.quiz_id, query.question_index, query.question, query.summary)
     user_answer = query.user_answer
-    summary = query.summary
     user_id = query.user_id
     id = query.id
 
-    # Process the question and user answer with your tutor instance
-    # Assuming `my_tutor.process_query` handles both the question and answer
-    response, score = my_tutor.shortanswer_evaluate(user_question, user_answer, text=summary)
+    # Process the question and user answer with your tutor instance.
+    # Answers close enough to one already graded for this question reuse its evaluation.
+    started = time.perf_counter()
+    with track_usage() as usage:
+        response, score = await evaluation_cache.aget_or_compute(
+            make_key(user_question, summary), user_answer,
+            my_tutor.ashortanswer_evaluate, user_question, user_answer, text=summary,
+        )
+
+    logger.info("User ID: %s.%s Q/A: %s / %s | Score: %s Evaluation: %s", id, user_id, user_question, user_answer, score.strip(), response.strip())
+    event_log.record(
+        user_id, section, user_question, score, time.perf_counter() - started, usage.total,
+        quiz_id=query.quiz_id, question_index=query.question_index, cached=usage.total == 0,
+    )
+
+
+    return {"response": response, "score": score}
+
+@app.get("/multiple-choice-quiz")
+async def multiple_choice_quiz(section: str = "1.1", user_id: str = "anonymous"):
+    await warm()
+    # Questions come from the section's question bank; only the quiz ID and the questions
+    # (without answers) go to the browser, the answer key stays here
+    key = section_key("Psychology2e", section, my_tutor.fingerprint(), revision=await manifest.arevision("Psychology2e", section))
+    result = await content_cache.aget(key)
+    if result is None:
+        result = await flight.do(key, generate_section, "Psychology2e", section, key)
+
+    questions = await sample_questions("Psychology2e", section, result["summary"], user_id, kind=MULTIPLECHOICE)
+    quiz_id, questions = await answer_keys.acreate(questions)
+    return {"quiz_id": quiz_id, "questions": questions}
+
+class MultipleChoiceAnswers(BaseModel):
+    quiz_id: str
+    answers: list[str | int] # One per question: a letter ("B") or an option number (2)
+    user_id: str = "anonymous"
+
+@app.post("/grade-multiple-choice")
+def grade_multiple_choice(submission: MultipleChoiceAnswers):
+    # Graded against the stored answer key; no LLM call
+    try:
+        graded = answer_keys.grade(submission.quiz_id, submission.answers)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if graded is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired quiz")
+
+    results = [{"correct": correct, "answer": answer} for correct, answer in graded]
+    score = sum(result["correct"] for result in results)
+    logger.info("User ID: %s Quiz: %s | Score: %d/%d", submission.user_id, submission.quiz_id, score, len(results))
+    return {"results": results, "score": score, "total": len(results)}
+
+# Define the models for grading a whole quiz at once
+class Answer(BaseModel):
+    user_answer: str
+    id: str
+    question_index: int | None = None
+    question: str | None = None
+
+class BatchQuery(BaseModel):
+    answers: list[Answer]
+    user_id: str
+    quiz_id: str | None = None
+    summary: str | None = None
+
+@app.post("/query-batch")
+async def query_llm_batch(query: BatchQuery):
+    await warm()
+    resolved = [await resolve_question(query.quiz_id, answer.question_index, answer.question, query.summary) for answer in query.answers]
+    questions = [question for question, summary, section in resolved]
+    summary = resolved[0][1] if resolved else query.summary
+    section = resolved[0][2] if resolved else None
+    started = time.perf_counter()
+
+    # Reuse evaluations of similar answers, then evaluate the rest in one batched pass
+    scopes = [make_key(question, summary) for question in questions]
+    lookups = await asyncio.gather(*(evaluation_cache.alookup(scope, answer.user_answer) for scope, answer in zip(scopes, query.answers)))
+    evaluations = [value for value, vector in lookups]
+
+    misses = [i for i, value in enumerate(evaluations) if value is None]
+    if misses:
+        pairs = [(questions[i], query.answers[i].user_answer) for i in misses]
+        with track_usage() as usage:
+            fresh = await my_tutor.ashortanswer_evaluate_batch(pairs, text=summary, max_concurrency=batch_concurrency)
+        for i, value in zip(misses, fresh):
+            evaluations[i] = value
+            evaluation_cache.add(scopes[i], query.answers[i].user_answer, lookups[i][1], value)
+
+    # Every answer waited for the whole batch; its tokens are split evenly across the answers that were evaluated
+    latency = time.perf_counter() - started
+    tokens = usage.total // len(misses) if misses else 0
+    results = []
+    for i, (answer, question, (response, score)) in enumerate(zip(query.answers, questions, evaluations)):
+        logger.info("User ID: %s.%s Q/A: %s / %s | Score: %s Evaluation: %s", answer.id, query.user_id, question, answer.user_answer, score.strip(), response.strip())
+        results.append({"id": answer.id, "response": response, "score": score})
+        fresh_answer = lookups[i][0] is None
+        event_log.record(
+            query.user_id, section, question, score, latency, tokens if fresh_answer else 0,
+            quiz_id=query.quiz_id, question_index=answer.question_index, cached=not fresh_answer,
+        )
+
+    return {"results": results}
+
+# Define the model for free-form questions. section or chapter narrow the search to part of the textbook.
+class AskQuery(BaseModel):
+    question: str
+    user_id: str = "anonymous"
+    section: str | None = None
+    chapter: str | None = None
+
+@app.post("/ask")
+async def ask(query: AskQuery):
+    await warm()
+    if retriever.error:
+        raise HTTPException(status_code=503, detail=retriever.error)
+    # Only the chunks closest to the question (within ASK_CONTEXT_TOKENS) go to the LLM, not the whole section
+    filters = {key: value for key, value in (("section", query.section), ("chapter", query.chapter)) if value}
+    chunks = await retriever.aretrieve(query.question, filters=filters)
+    if chunks:
+        answer = await my_tutor.aanswer_question(query.question, format_context(chunks))
+    else:
+        answer = "I couldn't find anything about that in the textbook."
+
+    sources = [{"section": chunk["section"], "title": chunk["title"], "chapter": chunk["chapter"], "score": chunk["score"]} for chunk in chunks]
+    logger.info("User ID: %s Ask: %s | Sources: %s", query.user_id, query.question, [source["section"] for source in sources])
+    return {"answer": answer, "sources": sources}
 
-    logger.info(f"User ID: {id}.{user_id} Q/A: {user_question} / {user_answer} | Score: {score.strip()} Evaluation: {response.strip()}")
+# Analytics over graded short answers. Read from per-day rollups, so they stay fast however many answers are logged.
+# days limits results to the last N days (whole UTC days); answers graded in the last EVENT_FLUSH_INTERVAL seconds may not be included yet.
+def analytics_since(days):
+    return time.time() - days * 86400 if days is not None else None
 
+@app.get("/analytics/scores")
+def analytics_scores(section: str | None = None, days: float | None = None):
+    # {"sections": {section: {score: count}}}
+    return {"sections": event_log.scores(section, since=analytics_since(days))}
 
-    return {"response": response, "score": score}
\ No newline at end of file
+@app.get("/analytics/latency")
+def analytics_latency(section: str | None = None, days: float | None = None):
+    # {"sections": {section: {"count", "mean", "tokens", "p50", "p90", "p99"}}}, latencies in seconds
+    return {"sections": event_log.latency(section, since=analytics_since(days))}
@@ -0,0 +1,168 @@
+"""
+------------------------------------------------------------
+File: manifest.py
+Description:
+    Record of what each textbook section looked like when its
+    content was generated. Every section has a hash of its Qdrant
+    payloads and a revision number that goes up whenever the hash
+    changes. Cache keys include the revision, so after a section is
+    re-ingested or fixed only that section's summary, questions and
+    question pools are regenerated; everything else stays cached.
+
+Author: TutorAI backend maintainers
+Date: October 2026
+Version: 1.0
+
+Usage:
+    manifest = ContentManifest("cache.db")
+    changes = manifest.update("Psychology2e", {"1.1": "<hash>", ...})  # Done by sync.py
+    revision = manifest.revision("Psychology2e", "1.1")  # 0 until the section first changes
+
+Future Updates:
+    None planned.
+------------------------------------------------------------
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+
+
+class ContentManifest:
+    """
+    Description: Per-section payload hashes and revisions, stored in SQLite.
+
+    sync.py writes the manifest; the API only reads revisions. Readers keep
+    a snapshot of the revisions in memory and reload it at most every
+    refresh_interval seconds, so a sync is picked up by every worker
+    shortly after it runs without a query per request.
+
+    Attributes:
+    ----------
+    path : str
+        SQLite file holding the manifest table (normally the content cache's file).
+    refresh_interval : float
+        Seconds a snapshot of the revisions is used before it is reloaded.
+
+    Methods:
+    -------
+    revision()
+        Current revision of a section.
+    arevision()
+        revision() from async code; a snapshot reload reads SQLite in a thread.
+    diff()
+        Sections added, changed and removed compared to the manifest.
+    update()
+        Records new hashes, bumping the revision of every changed or removed section.
+    """
+
+    def __init__(self, path="cache.db", refresh_interval=30):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._snapshots = {} # collection -> (loaded_at, {section: revision})
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS manifest ("
+            " collection TEXT NOT NULL,"
+            " section TEXT NOT NULL,"
+            " hash TEXT," # NULL once the section is gone from the collection
+            " revision INTEGER NOT NULL DEFAULT 0,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (collection, section))"
+        )
+        self._conn.commit()
+
+    def revision(self, collection, section):
+        revisions = self._snapshot(collection)
+        if revisions is None:
+            revisions = self._load(collection)
+        return revisions.get(section, 0)
+
+    async def arevision(self, collection, section):
+        revisions = self._snapshot(collection)
+        if revisions is None:
+            revisions = await asyncio.to_thread(self._load, collection)
+        return revisions.get(section, 0)
+
+    def diff(self, collection, hashes):
+        """
+        Compares section hashes to the manifest.
+
+        Parameters:
+        ----------
+        collection : str
+            Qdrant collection.
+        hashes : dict
+            section -> hash of its current payloads.
+
+        Returns:
+        -------
+        dict
+            "added", "changed" and "removed" lists of sections. Sections seen for the
+            first time are "added"; they have nothing cached under a later revision to replace.
+        """
+        stored = self._stored(collection)
+        return {
+            "added": sorted(section for section in hashes if section not in stored),
+            "changed": sorted(section for section, digest in hashes.items() if section in stored and stored[section][0] != digest),
+            "removed": sorted(section for section, (digest, _) in stored.items() if digest is not None and section not in hashes),
+        }
+
+    def update(self, collection, hashes):
+        """
+        Records the current hashes.
+
+        Returns:
+        -------
+        dict
+            diff() of the hashes against the manifest before the update, plus
+            "revisions": {section: (old revision, new revision)} for every
+            changed or removed section.
+        """
+        changes = self.diff(collection, hashes)
+        stored = self._stored(collection)
+        now = time.time()
+        revisions = {}
+        with self._lock:
+            for section in changes["added"]:
+                self._conn.execute(
+                    "INSERT INTO manifest (collection, section, hash, revision, updated_at) VALUES (?, ?, ?, 0, ?)",
+                    (collection, section, hashes[section], now),
+                )
+            for section in changes["changed"] + changes["removed"]:
+                old = stored[section][1]
+                revisions[section] = (old, old + 1)
+                self._conn.execute(
+                    "UPDATE manifest SET hash = ?, revision = ?, updated_at = ? WHERE collection = ? AND section = ?",
+                    (hashes.get(section), old + 1, now, collection, section),
+                )
+            self._conn.commit()
+        self._snapshots.pop(collection, None)
+        return {**changes, "revisions": revisions}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _snapshot(self, collection):
+        # {section: revision} if the snapshot is still fresh, else None
+        loaded_at, revisions = self._snapshots.get(collection, (None, None))
+        if loaded_at is None or time.monotonic() - loaded_at >= self.refresh_interval:
+            return None
+        return revisions
+
+    def _load(self, collection):
+        with self._lock:
+            # Only changed sections are kept; anything else is revision 0
+            rows = self._conn.execute("SELECT section, revision FROM manifest WHERE collection = ? AND revision > 0", (collection,)).fetchall()
+        revisions = dict(rows)
+        self._snapshots[collection] = (time.monotonic(), revisions)
+        return revisions
+
+    def _stored(self, collection):
+        # section -> (hash, revision)
+        with self._lock:
+            rows = self._conn.execute("SELECT section, hash, revision FROM manifest WHERE collection = ?", (collection,)).fetchall()
+        return {section: (digest, revision) for section, digest, revision in rows}
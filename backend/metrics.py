@@ -0,0 +1,260 @@
+"""
+------------------------------------------------------------
+File: metrics.py
+Description:
+    Small in-process metrics registry rendered in the Prometheus
+    text format for the API's /metrics endpoint, plus the metric
+    families the backend records (stage timings, token counts,
+    cache lookups, in-flight work).
+
+Author: TutorAI backend maintainers
+Date: October 2026
+Version: 1.0
+
+Usage:
+    with STAGE_SECONDS.labels(stage="qdrant_scroll").time():
+        records = client.scroll(...)
+    LLM_TOKENS.labels(chain="summarization_chain", kind="prompt").inc(812)
+    text = REGISTRY.render()
+
+Future Updates:
+    None planned.
+------------------------------------------------------------
+"""
+import functools
+import inspect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Registry:
+    """
+    Description: Collection of metrics rendered together.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Child:
+    # One labelled series of a metric
+    def __init__(self, lock):
+        self.value = 0.0
+        self._function = None
+        self._lock = lock
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value):
+        with self._lock:
+            self.value = value
+
+    def set_function(self, function):
+        # Read the value from function() at render time instead (e.g. a cache's hit counter)
+        self._function = function
+
+    def get(self):
+        return self._function() if self._function is not None else self.value
+
+
+class _HistogramChild:
+    def __init__(self, lock, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = lock
+
+    def observe(self, value):
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        return _Child(self._lock)
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            yield "", dict(zip(self.labelnames, key)), child.get()
+
+    # Unlabelled metrics can be used directly
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf)
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(buckets) if buckets[-1] == math.inf else tuple(buckets) + (math.inf,)
+        super().__init__(name, help, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self._lock, self.buckets)
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(child.buckets, child.counts):
+                cumulative += count
+                yield "_bucket", {**labels, "le": bound}, cumulative
+            yield "_sum", labels, child.sum
+            yield "_count", labels, child.count
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+
+def timed(stage):
+    """
+    Decorator recording a function's (or coroutine's) duration in STAGE_SECONDS.
+    """
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with STAGE_SECONDS.labels(stage=stage).time():
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with STAGE_SECONDS.labels(stage=stage).time():
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for name, value in labels.items():
+        value = _format_value(value) if name == "le" else str(value)
+        value = value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+##############################
+# Backend Metrics            #
+##############################
+STAGE_SECONDS = Histogram(
+    "tutorai_stage_seconds",
+    "Time spent per stage: Qdrant calls, each TutorAI chain invoke, response parsing.",
+    ["stage"],
+)
+LLM_TOKENS = Counter(
+    "tutorai_llm_tokens_total",
+    "Tokens per chain: prompt, prompt_cached/prompt_uncached (prompt split by the provider's reported prompt-cache hits) and completion. Reported by chat models, estimated with tiktoken (never cached) for completion models.",
+    ["chain", "kind"],
+)
+CACHE_LOOKUPS = Counter(
+    "tutorai_cache_lookups_total",
+    "Cache lookups by cache and result (hit or miss).",
+    ["cache", "result"],
+)
+IN_FLIGHT = Gauge(
+    "tutorai_in_flight",
+    "Work currently in progress: HTTP requests, LLM calls holding a slot, LLM calls queued.",
+    ["kind"],
+)
+MODEL_ROUTES = Counter(
+    "tutorai_model_routes_total",
+    "Fast-model answers by chain and route: fast (kept) or redone by the main model (borderline, unreadable, error).",
+    ["chain", "route"],
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "tutorai_http_request_seconds",
+    "HTTP request latency by route and status code.",
+    ["path", "status"],
+)
+EVALUATION_EVENTS = Counter(
+    "tutorai_evaluation_events_total",
+    "Evaluation events by result: written to the event log, or dropped (buffer full or write failed).",
+    ["result"],
+)
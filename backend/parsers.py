@@ -0,0 +1,208 @@
+"""
+------------------------------------------------------------
+File: parsers.py
+Description:
+    Parsers for TutorAI's LLM completions. Each one first looks
+    for the JSON the structured-output prompts ask for and
+    validates it in one pass with pydantic; if the model answered
+    in the older free-text format instead, precompiled regexes
+    pull out the same fields.
+
+Author: TutorAI backend maintainers
+Date: October 2026
+Version: 1.0
+
+Usage:
+    evaluation, score = parse_shortanswer_evaluation(completion)
+    questions = parse_multiplechoice_questions(completion)
+
+Future Updates:
+    None planned.
+------------------------------------------------------------
+"""
+import json
+import re
+from typing import List, Literal
+
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, field_validator
+
+from metrics import Counter
+
+PARSES = Counter(
+    "tutorai_parse_total",
+    "Parsed LLM completions by parser and outcome (json, text or failed).",
+    ["parser", "result"],
+)
+
+
+##############################
+# Structured Output Schemas  #
+##############################
+class ShortAnswerEvaluation(BaseModel):
+    score: int = Field(ge=0, le=10)
+    evaluation: str
+
+
+class MultipleChoiceQuestion(BaseModel):
+    question: str
+    options: List[str] = Field(min_length=4, max_length=4)
+    answer: Literal["A", "B", "C", "D"]
+
+    @field_validator("answer", mode="before")
+    @classmethod
+    def _letter(cls, value):
+        # Accept "b", "B)" or "B) Wundt" as B
+        return value.strip()[:1].upper() if isinstance(value, str) else value
+
+
+_EVALUATION = TypeAdapter(ShortAnswerEvaluation)
+_MULTIPLECHOICE = TypeAdapter(List[MultipleChoiceQuestion])
+_MULTIPLECHOICE_ITEM = TypeAdapter(MultipleChoiceQuestion)
+_QUESTIONS = TypeAdapter(List[str])
+
+# Text-format fallbacks
+_SCORE = re.compile(r"score\W{0,2}\s*(?:of)?\s*[:=\-]?\s*\**\s*(\d{1,2})(?:\s*(?:/|out of)\s*10)?", re.IGNORECASE)
+_ANY_SCORE = re.compile(r"\b(10|[0-9])\s*(?:/|out of)\s*10\b|\b(10|[0-9])\b")
+_EVALUATION_TEXT = re.compile(r"evaluation\s*:\s*(.*)", re.IGNORECASE | re.DOTALL)
+_MULTIPLECHOICE_TEXT = re.compile(
+    r"Question\s*\d*\s*[:.)]?\s*(?P<question>.+?)\s*"
+    r"A\)\s*(?P<a>.+?)\s*B\)\s*(?P<b>.+?)\s*C\)\s*(?P<c>.+?)\s*D\)\s*(?P<d>.+?)\s*"
+    r"Correct Answer\s*:\s*\(?(?P<answer>[A-Da-d])",
+    re.DOTALL,
+)
+_QUESTION_NUMBER = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s*")
+
+
+def parse_shortanswer_evaluation(completion):
+    """
+    Parses a short-answer evaluation.
+
+    Parameters:
+    ----------
+    completion : str
+        LLM output: {"score": ..., "evaluation": ...} JSON, or "Score: ... Evaluation: ..." text.
+
+    Returns:
+    -------
+    tuple
+        (evaluation, score), both str. The score is "0" if none could be found.
+
+    Raises:
+    ------
+    None
+
+    """
+    evaluation, score, result = parse_shortanswer_evaluation_result(completion)
+    return evaluation, score
+
+
+def parse_shortanswer_evaluation_result(completion):
+    """
+    Same as parse_shortanswer_evaluation(), plus how the completion was read.
+
+    Returns:
+    -------
+    tuple
+        (evaluation, score, result), where result is "json", "text" (regex
+        fallback) or "failed" (no score found).
+    """
+    parsed = _validate_json(_EVALUATION, completion, "{", "}")
+    if parsed is not None:
+        PARSES.labels(parser="shortanswer_evaluation", result="json").inc()
+        return parsed.evaluation.strip(), str(parsed.score), "json"
+
+    # Prefer a number labelled as the score, then an "n/10", then any number from 0 to 10
+    match = _SCORE.search(completion) or _ANY_SCORE.search(completion)
+    score = next((group for group in match.groups() if group), "0") if match else "0"
+    score = str(min(int(score), 10))
+
+    evaluation = _EVALUATION_TEXT.search(completion)
+    evaluation = evaluation.group(1).strip() if evaluation else completion.strip()
+    result = "text" if match else "failed"
+    PARSES.labels(parser="shortanswer_evaluation", result=result).inc()
+    return evaluation, score, result
+
+
+def parse_multiplechoice_questions(completion):
+    """
+    Parses multiple-choice questions.
+
+    Parameters:
+    ----------
+    completion : str
+        LLM output: a JSON list of {"question", "options", "answer"}, or
+        "Question 1: ... A) ... B) ... C) ... D) ... Correct Answer: B" text.
+
+    Returns:
+    -------
+    list
+        One [question, A, B, C, D, correct letter] list per question that
+        could be read; malformed questions are dropped.
+
+    Raises:
+    ------
+    None
+
+    """
+    parsed = _validate_json(_MULTIPLECHOICE, completion, "[", "]")
+    if parsed is None:
+        parsed = _validate_items(_MULTIPLECHOICE_ITEM, completion, "[", "]")
+    if parsed:
+        PARSES.labels(parser="multiplechoice_questions", result="json").inc()
+        return [[question.question.strip(), *(option.strip() for option in question.options), question.answer] for question in parsed]
+
+    questions = [
+        [match["question"], match["a"], match["b"], match["c"], match["d"], match["answer"].upper()]
+        for match in _MULTIPLECHOICE_TEXT.finditer(completion)
+    ]
+    PARSES.labels(parser="multiplechoice_questions", result="text" if questions else "failed").inc()
+    return questions
+
+
+def parse_shortanswer_questions(completion):
+    """
+    Parses short-answer questions: a JSON list of strings, or one question per line.
+
+    Returns:
+    -------
+    list
+        List of str questions without their numbering.
+    """
+    parsed = _validate_json(_QUESTIONS, completion, "[", "]")
+    if parsed is None:
+        parsed = completion.splitlines()
+    questions = [_QUESTION_NUMBER.sub("", question).strip() for question in parsed]
+    return [question for question in questions if question]
+
+
+def _validate_json(adapter, completion, opening, closing):
+    # Validates the outermost JSON object/array in the completion, ignoring any text around it
+    start = completion.find(opening)
+    end = completion.rfind(closing)
+    if start == -1 or end < start:
+        return None
+    try:
+        return adapter.validate_json(completion[start:end + 1])
+    except ValidationError:
+        return None
+
+
+def _validate_items(adapter, completion, opening, closing):
+    # Slow path for a JSON list with some invalid items: keep the valid ones
+    start = completion.find(opening)
+    end = completion.rfind(closing)
+    if start == -1 or end < start:
+        return None
+    try:
+        items = json.loads(completion[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(items, list):
+        return None
+    valid = []
+    for item in items:
+        try:
+            valid.append(adapter.validate_python(item))
+        except ValidationError:
+            continue
+    return valid
@@ -0,0 +1,176 @@
+"""
+------------------------------------------------------------
+File: precompute.py
+Description:
+    Batch job that generates the summary and questions for every
+    section of a Qdrant collection ahead of time and stores them
+    in the API's content cache, then fills the section's short-answer
+    and multiple-choice question bank pools, so the request path
+    serves them without calling the LLM.
+
+Author: TutorAI backend maintainers
+Date: October 2026
+Version: 1.0
+
+Usage:
+    From local directory: python precompute.py --collection Psychology2e
+    Re-running resumes: sections already in the store are skipped
+    unless --force is given.
+
+Future Updates:
+    None planned.
+------------------------------------------------------------
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from cache import SQLiteCache
+from clients import ClientPool
+from logger import logger
+from manifest import ContentManifest
+from question_bank import MULTIPLECHOICE, SHORTANSWER, QuestionBank, afill, bank_key
+from sections import QUESTION_COUNT, section_key, section_text
+
+
+async def generate_section(tutor, db, collection, section):
+    # Rate limits and transient errors are retried by the tutor's LLMScheduler, not here
+    response = await db.aget_full_section(collection, section)
+    if response is None:
+        raise LookupError(f"Section {section} not found in {collection}")
+    summary = await tutor.asummarize_text(text=section_text(section, response))
+    questions = await tutor.ashortanswer_questions(QUESTION_COUNT, text=summary)
+    return {"summary": summary, "questions": questions}
+
+
+async def warm_question_bank(tutor, bank, pool_keys, result):
+    """
+    Fills a section's question bank pools the way the API does on a first visit:
+    the short-answer pool starts from the section's questions, and any pool still
+    smaller than one question set is filled from the summary.
+
+    Returns:
+    -------
+    int
+        How many questions were added.
+    """
+    added = 0
+    if bank.size(pool_keys[SHORTANSWER]) < QUESTION_COUNT:
+        added += await bank.aadd(pool_keys[SHORTANSWER], SHORTANSWER, [("", question) for question in result["questions"]])
+    for kind, pool in pool_keys.items():
+        if bank.size(pool) < QUESTION_COUNT:
+            added += await afill(bank, tutor, pool, kind, result["summary"])
+    return added
+
+
+async def precompute(tutor, db, store, collection, concurrency=4, force=False, sections=None, manifest=None, bank=None):
+    """
+    Generates and stores content for every section in the collection.
+
+    Parameters:
+    ----------
+    tutor : TutorAI
+        Generates the content. Must be configured like the API's tutor so the cache keys match.
+    db : QdrantConnect
+        Source of the sections.
+    store : SQLiteCache
+        Where results are written. Entries are pinned: they never expire and are never evicted.
+    collection : str
+        Qdrant collection to warm.
+    concurrency : int
+        Sections generated at once.
+    force : bool
+        Regenerate sections that are already stored.
+    sections : list
+        Sections to generate. Defaults to every section in the collection.
+    manifest : ContentManifest
+        Source of section revisions, so entries land under the keys the API reads.
+    bank : QuestionBank
+        The API's question bank. When given, each section's short-answer and
+        multiple-choice pools are filled too (also for sections already stored).
+
+    Returns:
+    -------
+    dict
+        Counts of "generated", "skipped" (nothing was missing) and "failed" sections.
+
+    Raises:
+    ------
+    None
+
+    """
+    if sections is None:
+        sections = await db.alist_sections(collection)
+    fingerprint = tutor.fingerprint()
+    semaphore = asyncio.Semaphore(concurrency)
+    counts = {"generated": 0, "skipped": 0, "failed": 0}
+    total = len(sections)
+    started = time.monotonic()
+
+    def report(section, status):
+        counts[status] += 1
+        done = sum(counts.values())
+        logger.info("[%d/%d] %s %s: %s (%.0fs elapsed)", done, total, collection, section, status, time.monotonic() - started)
+
+    async def run(section):
+        revision = manifest.revision(collection, section) if manifest else 0
+        key = section_key(collection, section, fingerprint, revision=revision)
+        pool_keys = {kind: bank_key(collection, section, fingerprint, kind, revision=revision) for kind in (SHORTANSWER, MULTIPLECHOICE)} if bank else {}
+        result = None if force else store.get(key)
+        if result is not None and all(bank.size(pool) >= QUESTION_COUNT for pool in pool_keys.values()):
+            report(section, "skipped")
+            return
+        async with semaphore:
+            try:
+                if result is None:
+                    result = await generate_section(tutor, db, collection, section)
+                    store.set(key, result, pin=True)
+                if bank:
+                    await warm_question_bank(tutor, bank, pool_keys, result)
+            except Exception as e:
+                logger.error("Failed to precompute %s %s: %s", collection, section, e)
+                report(section, "failed")
+                return
+        report(section, "generated")
+
+    logger.info("Precomputing %d sections of %s with concurrency %d", total, collection, concurrency)
+    await asyncio.gather(*(run(section) for section in sections))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate summaries and questions for a Qdrant collection.")
+    parser.add_argument("--collection", default="Psychology2e")
+    parser.add_argument("--concurrency", type=int, default=4, help="sections generated at once")
+    parser.add_argument("--retries", type=int, default=5, help="retries per LLM call on rate limits and transient errors")
+    parser.add_argument("--force", action="store_true", help="regenerate sections that are already stored")
+    args = parser.parse_args()
+
+    load_dotenv()
+    store = SQLiteCache(path=os.getenv("CACHE_PATH", "cache.db"), max_entries=int(os.getenv("CACHE_DISK_ENTRIES", 10000)))
+    manifest = ContentManifest(path=store.path)
+
+    async def run():
+        # Same client setup as the API, so the tutor's fingerprint (and so the cache key) matches
+        pool = ClientPool(os.getenv("OPENAI_API_KEY"), os.getenv("QDRANT_URL"), os.getenv("QDRANT_API_KEY"))
+        pool.scheduler.retries = args.retries
+        bank = QuestionBank(path=os.getenv("QUESTION_BANK_PATH", "questions.db"), shared=True)
+        try:
+            return await precompute(pool.tutor, pool.db, store, args.collection, args.concurrency, args.force, manifest=manifest, bank=bank)
+        finally:
+            await bank.aclose()
+            await pool.aclose()
+
+    counts = asyncio.run(run())
+    logger.info("Done: %d generated, %d skipped, %d failed", counts["generated"], counts["skipped"], counts["failed"])
+    manifest.close()
+    store.close()
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,83 +1,342 @@
-from qdrant_client import QdrantClient, models
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
+
+from metrics import timed
+from singleflight import SingleFlight
+
+INDEXED_FIELDS = ("section", "title", "chapter") # Payload fields lookups can be made by
+SUBCHAPTER_FIELDS = ["title", "chapter", "text"] # Payload fields returned by lookups
+CHUNK_ORDER_FIELD = "chunk" # Optional payload field giving a chunk's position within its section
+SEARCH_FIELDS = ["section"] + SUBCHAPTER_FIELDS + [CHUNK_ORDER_FIELD] # Payload fields returned by vector searches
+
+def section_sort_key(section: str):
+    # Orders "1.2" before "1.10"; anything non-numeric sorts after, alphabetically
+    try:
+        return (0, tuple(int(part) for part in section.split(".")), "")
+    except ValueError:
+        return (1, (), section)
 
 class QdrantConnect:
-    def __init__(self, host: str, api_key: str):
+    def __init__(self, host: str, api_key: str, qdrant_client=None, async_qdrant_client=None, **client_kwargs):
 
         self.host = host
         self.api_key = api_key
-        self.qdrant_client = QdrantClient(
+        # Prebuilt clients can be passed in (e.g. in-memory ones for tests).
+        # client_kwargs (e.g. limits=httpx.Limits(...)) tune the connection pool of clients built here.
+        # The server version check is skipped by default: it is a blocking round trip every time a worker starts.
+        client_kwargs.setdefault("check_compatibility", False)
+        self.qdrant_client = qdrant_client or QdrantClient(
             url=host,
             api_key=api_key,
+            **client_kwargs,
         )
+        # Used by the a* methods so the API can await Qdrant without blocking its event loop
+        self.async_qdrant_client = async_qdrant_client or AsyncQdrantClient(
+            url=host,
+            api_key=api_key,
+            **client_kwargs,
+        )
+
+        # collection -> {field -> {value -> point id}}, built on first lookup.
+        # Lookups then cost one retrieve by ID instead of a filtered scroll.
+        self._index = {}
+        self._index_offset = {} # collection -> last point ID seen, where incremental refreshes resume
+        self._index_flight = SingleFlight() # Concurrent first lookups share one index build
 
     def get_subchapter_from_section(self, collection_name: str, section: str):
-        records, next_token = self.qdrant_client.scroll(
+        return self._first_match(collection_name, "section", section)
+
+    def get_subchapter_from_title(self, collection_name: str, title: str):
+        return self._first_match(collection_name, "title", title)
+
+    def get_chapter_from_chapter(self, collection_name: str, title: str):
+        return self._first_match(collection_name, "chapter", title)
+
+    async def aget_subchapter_from_section(self, collection_name: str, section: str):
+        return await self._afirst_match(collection_name, "section", section)
+
+    async def aget_subchapter_from_title(self, collection_name: str, title: str):
+        return await self._afirst_match(collection_name, "title", title)
+
+    async def aget_chapter_from_chapter(self, collection_name: str, title: str):
+        return await self._afirst_match(collection_name, "chapter", title)
+
+    @timed("qdrant_full_section")
+    def get_full_section(self, collection_name: str, section: str):
+        # Pages through every point of the section instead of returning only the first one
+        records = []
+        offset = None
+        while True:
+            page, offset = self.qdrant_client.scroll(
+                collection_name=collection_name,
+                scroll_filter=self._match_filter("section", section),
+                limit=64,
+                offset=offset,
+                with_payload=SUBCHAPTER_FIELDS + [CHUNK_ORDER_FIELD],
+                with_vectors=False,
+            )
+            records.extend(page)
+            if offset is None:
+                break
+        return self._join_chunks(records)
+
+    @timed("qdrant_full_section")
+    async def aget_full_section(self, collection_name: str, section: str):
+        records = []
+        offset = None
+        while True:
+            page, offset = await self.async_qdrant_client.scroll(
+                collection_name=collection_name,
+                scroll_filter=self._match_filter("section", section),
+                limit=64,
+                offset=offset,
+                with_payload=SUBCHAPTER_FIELDS + [CHUNK_ORDER_FIELD],
+                with_vectors=False,
+            )
+            records.extend(page)
+            if offset is None:
+                break
+        return self._join_chunks(records)
+
+    @timed("qdrant_search")
+    def search(self, collection_name: str, vector, limit: int = 5, filters=None, score_threshold=None, using=None):
+        # Top-k nearest chunks to an embedded query, optionally restricted by payload (e.g. {"chapter": ...})
+        response = self.qdrant_client.query_points(
             collection_name=collection_name,
-            scroll_filter=models.Filter(
-                must=[
-                    models.FieldCondition(
-                        key="section",
-                        match=models.MatchValue(value=section),
-                    ),
-                ]
-            ),
+            query=vector,
+            using=using,
+            query_filter=self._payload_filter(filters),
+            limit=limit,
+            score_threshold=score_threshold,
+            with_payload=SEARCH_FIELDS,
+            with_vectors=False,
         )
-        # Extract the title, chapter, and text from the first record's payload
-        title = records[0].payload.get("title")
-        chapter = records[0].payload.get("chapter")
-        text = records[0].payload.get("text")
-        
-        # Return all three values (title, chapter, text) along with the next_token
-        return {
-            "title": title,
-            "chapter": chapter,
-            "text": text
-        }
+        return self._to_hits(response.points)
 
-    def get_subchapter_from_title(self, collection_name: str, title: str):
-        records, next_token = self.qdrant_client.scroll(
+    @timed("qdrant_search")
+    async def asearch(self, collection_name: str, vector, limit: int = 5, filters=None, score_threshold=None, using=None):
+        response = await self.async_qdrant_client.query_points(
             collection_name=collection_name,
-            scroll_filter=models.Filter(
-                must=[
-                    models.FieldCondition(
-                        key="title",
-                        match=models.MatchValue(value=title),
-                    ),
-                ]
-            ),
+            query=vector,
+            using=using,
+            query_filter=self._payload_filter(filters),
+            limit=limit,
+            score_threshold=score_threshold,
+            with_payload=SEARCH_FIELDS,
+            with_vectors=False,
         )
-        # Extract the title, chapter, and text from the first record's payload
-        title = records[0].payload.get("title")
-        chapter = records[0].payload.get("chapter")
-        text = records[0].payload.get("text")
-        
-        # Return all three values (title, chapter, text) along with the next_token
-        return {
-            "title": title,
-            "chapter": chapter,
-            "text": text
-        }
-    
-    def get_chapter_from_chapter(self, collection_name: str, title: str):
+        return self._to_hits(response.points)
+
+    async def aclose(self):
+        self.qdrant_client.close()
+        await self.async_qdrant_client.close()
+
+    def list_sections(self, collection_name: str):
+        self.refresh_index(collection_name, full=True)
+        return sorted(self._index[collection_name]["section"], key=section_sort_key)
+
+    async def alist_sections(self, collection_name: str):
+        await self.arefresh_index(collection_name, full=True)
+        return sorted(self._index[collection_name]["section"], key=section_sort_key)
+
+    async def avector_size(self, collection_name: str, using=None):
+        # Dimensions of the collection's vectors (of the named vector `using`, for collections with several)
+        info = await self.async_qdrant_client.get_collection(collection_name)
+        vectors = info.config.params.vectors
+        if isinstance(vectors, dict):
+            vectors = vectors[using if using is not None else ""]
+        return vectors.size
+
+    @timed("qdrant_section_scan")
+    async def asection_payloads(self, collection_name: str):
+        # Every point's payload grouped by section, for detecting which sections changed.
+        # Chunks are ordered like _join_chunks(): by chunk number where present, else by point ID.
+        sections = {}
+        offset = None
+        while True:
+            records, next_offset = await self.async_qdrant_client.scroll(
+                collection_name=collection_name,
+                limit=256,
+                offset=offset,
+                with_payload=SEARCH_FIELDS,
+                with_vectors=False,
+            )
+            for record in records:
+                section = record.payload.get("section")
+                if section is not None:
+                    sections.setdefault(section, []).append(record.payload)
+            if next_offset is None:
+                break
+            offset = next_offset
+        return {section: sorted(payloads, key=lambda payload: payload.get(CHUNK_ORDER_FIELD, 0)) for section, payloads in sections.items()}
+
+    @timed("qdrant_index_refresh")
+    def refresh_index(self, collection_name: str, full: bool = False):
+        # Incremental refreshes only scroll points added after the last one seen (scroll is ordered by ID).
+        # Use full=True after payloads of existing points change.
+        index, offset = self._start_refresh(collection_name, full)
+        while True:
+            records, next_offset = self.qdrant_client.scroll(
+                collection_name=collection_name,
+                limit=256,
+                offset=offset,
+                with_payload=list(INDEXED_FIELDS),
+                with_vectors=False,
+            )
+            offset = self._add_to_index(index, records, offset)
+            if next_offset is None:
+                break
+            offset = next_offset
+        self._finish_refresh(collection_name, index, offset)
+
+    async def arefresh_index(self, collection_name: str, full: bool = False):
+        await self._index_flight.do((collection_name, full), self._arefresh_index, collection_name, full)
+
+    @timed("qdrant_index_refresh")
+    async def _arefresh_index(self, collection_name: str, full: bool):
+        index, offset = self._start_refresh(collection_name, full)
+        while True:
+            records, next_offset = await self.async_qdrant_client.scroll(
+                collection_name=collection_name,
+                limit=256,
+                offset=offset,
+                with_payload=list(INDEXED_FIELDS),
+                with_vectors=False,
+            )
+            offset = self._add_to_index(index, records, offset)
+            if next_offset is None:
+                break
+            offset = next_offset
+        self._finish_refresh(collection_name, index, offset)
+
+    def _start_refresh(self, collection_name: str, full: bool):
+        if full or collection_name not in self._index:
+            return {field: {} for field in INDEXED_FIELDS}, None
+        # Copy so readers never see a half-updated index
+        index = {field: dict(values) for field, values in self._index[collection_name].items()}
+        return index, self._index_offset.get(collection_name)
+
+    def _add_to_index(self, index, records, offset):
+        for record in records:
+            for field in INDEXED_FIELDS:
+                value = record.payload.get(field)
+                # Keep the lowest ID per value, matching what a filtered scroll returns first
+                if value is not None:
+                    index[field].setdefault(value, record.id)
+            offset = record.id
+        return offset
+
+    def _finish_refresh(self, collection_name: str, index, offset):
+        self._index[collection_name] = index
+        self._index_offset[collection_name] = offset
+
+    def _match_filter(self, key: str, value: str):
+        return models.Filter(
+            must=[
+                models.FieldCondition(
+                    key=key,
+                    match=models.MatchValue(value=value),
+                ),
+            ]
+        )
+
+    def _payload_filter(self, filters):
+        # {"field": value} -> every field must match; a list value matches any of its items
+        if not filters:
+            return None
+        return models.Filter(
+            must=[
+                models.FieldCondition(
+                    key=key,
+                    match=models.MatchAny(any=list(value)) if isinstance(value, (list, tuple, set)) else models.MatchValue(value=value),
+                )
+                for key, value in filters.items()
+            ]
+        )
+
+    def _to_hits(self, points):
+        # Search results as plain dicts: the payload fields plus the similarity score
+        return [{**{field: point.payload.get(field) for field in SEARCH_FIELDS}, "score": point.score} for point in points]
+
+    @timed("qdrant_lookup")
+    def _first_match(self, collection_name: str, key: str, value: str):
+        if collection_name not in self._index:
+            self.refresh_index(collection_name)
+
+        point_id = self._index[collection_name][key].get(value)
+        if point_id is not None:
+            records = self.qdrant_client.retrieve(
+                collection_name=collection_name,
+                ids=[point_id],
+                with_payload=SUBCHAPTER_FIELDS,
+                with_vectors=False,
+            )
+            if records:
+                return self._to_subchapter(records)
+
+        # Not indexed yet (or deleted since): fall back to a single-record filtered scroll
         records, next_token = self.qdrant_client.scroll(
             collection_name=collection_name,
-            scroll_filter=models.Filter(
-                must=[
-                    models.FieldCondition(
-                        key="chapter",
-                        match=models.MatchValue(value=title),
-                    ),
-                ]
-            ),
+            scroll_filter=self._match_filter(key, value),
+            limit=1,
+            with_payload=SUBCHAPTER_FIELDS,
+            with_vectors=False,
+        )
+        self._remember(collection_name, key, value, records)
+        return self._to_subchapter(records)
+
+    @timed("qdrant_lookup")
+    async def _afirst_match(self, collection_name: str, key: str, value: str):
+        if collection_name not in self._index:
+            await self.arefresh_index(collection_name)
+
+        point_id = self._index[collection_name][key].get(value)
+        if point_id is not None:
+            records = await self.async_qdrant_client.retrieve(
+                collection_name=collection_name,
+                ids=[point_id],
+                with_payload=SUBCHAPTER_FIELDS,
+                with_vectors=False,
+            )
+            if records:
+                return self._to_subchapter(records)
+
+        records, next_token = await self.async_qdrant_client.scroll(
+            collection_name=collection_name,
+            scroll_filter=self._match_filter(key, value),
+            limit=1,
+            with_payload=SUBCHAPTER_FIELDS,
+            with_vectors=False,
         )
-        # Extract the title, chapter, and text from the first record's payload
+        self._remember(collection_name, key, value, records)
+        return self._to_subchapter(records)
+
+    def _remember(self, collection_name: str, key: str, value: str, records):
+        values = self._index[collection_name][key]
+        if records:
+            values[value] = records[0].id
+        else:
+            values.pop(value, None)
+
+    def _join_chunks(self, records):
+        # Scroll returns points in ID order; an explicit chunk number takes precedence when present
+        records = sorted(records, key=lambda record: record.payload.get(CHUNK_ORDER_FIELD, 0))
+        subchapter = self._to_subchapter(records)
+        if subchapter is None:
+            return None
+        subchapter["text"] = "\n\n".join(record.payload.get("text") or "" for record in records)
+        return subchapter
+
+    def _to_subchapter(self, records):
+        # Extract the title, chapter, and text from the first record's payload (None if nothing matched)
+        if not records:
+            return None
         title = records[0].payload.get("title")
         chapter = records[0].payload.get("chapter")
         text = records[0].payload.get("text")
-        
-        # Return all three values (title, chapter, text) along with the next_token
+
+        # Return all three values (title, chapter, text)
         return {
             "title": title,
             "chapter": chapter,
             "text": text
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,433 @@
+"""
+------------------------------------------------------------
+File: question_bank.py
+Description:
+    Per-section pools of generated questions. Instead of asking
+    the LLM for a new question set on every page load, the API
+    samples a set each student has not seen yet from a local pool
+    (indexed by section and learning objective) and tops the pool
+    up in the background when a student is close to running out.
+
+Author: TutorAI backend maintainers
+Date: October 2026
+Version: 1.0
+
+Usage:
+    bank = QuestionBank("questions.db")
+    pool = bank_key("Psychology2e", "1.1", my_tutor.fingerprint(), SHORTANSWER)
+    if bank.size(pool) < 5:
+        await afill(bank, my_tutor, pool, SHORTANSWER, summary)
+    questions = bank.sample(pool, user_id, 5)
+
+Future Updates:
+    None planned.
+------------------------------------------------------------
+"""
+import asyncio
+import json
+import random
+import re
+import sqlite3
+import threading
+
+from cache import make_key
+from logger import logger
+
+SHORTANSWER = "shortanswer"
+MULTIPLECHOICE = "multiplechoice"
+QUESTIONS_PER_OBJECTIVE = 5 # Questions asked for per learning objective on each fill
+
+# "Learning objectives:" header followed by a numbered or bulleted list
+_OBJECTIVES_HEADER = re.compile(r"learning objectives?\s*:?\s*$", re.IGNORECASE)
+_LIST_ITEM = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s*(.+?)\s*$")
+
+
+def bank_key(collection, section, fingerprint, kind, revision=0):
+    # Questions generated with different prompts/models, or from an older revision of the section, live in different pools
+    parts = ("question-bank", collection, section, kind, fingerprint)
+    return make_key(*parts, revision) if revision else make_key(*parts)
+
+
+def learning_objectives(summary):
+    """
+    Extracts the learning objectives listed at the top of a summary.
+
+    Parameters:
+    ----------
+    summary : str
+        Output of TutorAI.summarize_text(), which starts with a list of learning objectives.
+
+    Returns:
+    -------
+    list
+        List of str objectives, in order. Empty if the summary has no recognizable list.
+
+    Raises:
+    ------
+    None
+
+    """
+    objectives = []
+    in_list = False
+    for line in summary.splitlines():
+        if not in_list:
+            in_list = bool(_OBJECTIVES_HEADER.search(line.strip()))
+            continue
+        item = _LIST_ITEM.match(line)
+        if item:
+            objectives.append(item.group(1))
+        elif line.strip() or objectives:
+            break
+    return objectives
+
+
+class _Pool:
+    # In-memory mirror of one pool's rows
+    def __init__(self):
+        self.questions = {} # id -> (objective, question)
+        self.by_objective = {} # objective -> [id]
+
+    def add(self, question_id, objective, question):
+        self.questions[question_id] = (objective, question)
+        self.by_objective.setdefault(objective, []).append(question_id)
+
+
+class QuestionBank:
+    """
+    Description: Question pools stored in SQLite and mirrored in memory.
+
+    Pools and the questions each student has been served are loaded from
+    SQLite on first use; after that, sampling only touches memory. Sampling
+    spreads a set across learning objectives and never repeats a question
+    for a student until they have seen the whole pool.
+
+    Several worker processes can share one database. refresh() picks up
+    questions other workers added, and with shared=True sample() reloads
+    what the student was served before picking, since their previous
+    request may have gone to another worker.
+
+    Attributes:
+    ----------
+    path : str
+        Location of the SQLite database file.
+    max_size : int
+        Questions a pool grows to before background refills stop.
+    low_water : int
+        Refill once a student has fewer unseen questions than this.
+    shared : bool
+        Whether other processes write to the same database.
+
+    Methods:
+    -------
+    add()
+        Stores generated questions in a pool, skipping duplicates.
+    refresh()
+        Loads questions added to a pool by other processes.
+    drop()
+        Deletes a pool and its served records.
+    sample()
+        Picks questions a student has not been served yet and records them as served.
+    needs_refill()
+        Whether a student is running low on unseen questions.
+    schedule_refill()
+        Runs a refill in the background, at most one per pool at a time.
+    asize(), aadd(), arefresh(), asample(), aneeds_refill()
+        The same from async code, with SQLite accessed in a thread.
+    """
+
+    def __init__(self, path="questions.db", max_size=60, low_water=10, shared=False):
+        self.path = path
+        self.max_size = max_size
+        self.low_water = low_water
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._pools = {}
+        self._served = {} # (pool, user_id) -> set of question ids
+        self._exhausted = set() # Pools whose last refill produced nothing new
+        self._refills = {} # pool -> running refill task
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS questions ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " pool TEXT NOT NULL,"
+            " kind TEXT NOT NULL,"
+            " objective TEXT NOT NULL,"
+            " question TEXT NOT NULL,"
+            " UNIQUE (pool, question))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS served ("
+            " pool TEXT NOT NULL,"
+            " user_id TEXT NOT NULL,"
+            " question_id INTEGER NOT NULL,"
+            " PRIMARY KEY (pool, user_id, question_id))"
+        )
+        self._conn.commit()
+
+    def add(self, pool, kind, questions):
+        """
+        Stores questions in a pool.
+
+        Parameters:
+        ----------
+        pool : str
+            Key from bank_key().
+        kind : str
+            SHORTANSWER or MULTIPLECHOICE.
+        questions : list
+            (objective, question) pairs. A question is any JSON-serializable
+            value: a str for short answer, the parsed list for multiple choice.
+
+        Returns:
+        -------
+        int
+            How many were new to the pool.
+        """
+        entry = self._pool(pool)
+        added = 0
+        with self._lock:
+            for objective, question in questions:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO questions (pool, kind, objective, question) VALUES (?, ?, ?, ?)",
+                    (pool, kind, objective, json.dumps(question)),
+                )
+                if cursor.rowcount:
+                    entry.add(cursor.lastrowid, objective, question)
+                    added += 1
+            self._conn.commit()
+        if added:
+            self._exhausted.discard(pool)
+        return added
+
+    def refresh(self, pool):
+        """
+        Loads questions other processes added to a pool since it was last read.
+
+        Returns:
+        -------
+        int
+            How many questions were new to this process.
+        """
+        entry = self._pool(pool)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, objective, question FROM questions WHERE pool = ? AND id > ? ORDER BY id",
+                (pool, max(entry.questions, default=0)),
+            ).fetchall()
+        added = 0
+        with self._lock:
+            # add() may have mirrored some of these already, from another thread
+            for question_id, objective, question in rows:
+                if question_id not in entry.questions:
+                    entry.add(question_id, objective, json.loads(question))
+                    added += 1
+        if added:
+            self._exhausted.discard(pool)
+        return added
+
+    def drop(self, pool):
+        """
+        Deletes every question in a pool and the record of who was served them,
+        e.g. once the section they were generated from has changed.
+
+        Returns:
+        -------
+        int
+            How many questions were deleted.
+        """
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM questions WHERE pool = ?", (pool,)).rowcount
+            self._conn.execute("DELETE FROM served WHERE pool = ?", (pool,))
+            self._conn.commit()
+            self._pools.pop(pool, None)
+            self._exhausted.discard(pool)
+            for key in [key for key in self._served if key[0] == pool]:
+                del self._served[key]
+        return deleted
+
+    def size(self, pool):
+        return len(self._pool(pool).questions)
+
+    def objectives(self, pool):
+        return list(self._pool(pool).by_objective)
+
+    def unseen(self, pool, user_id):
+        return self.size(pool) - len(self._served_set(pool, user_id))
+
+    def sample(self, pool, user_id, count):
+        """
+        Picks count questions the student has not been served, spread across
+        learning objectives, and records them as served. A student who has
+        seen every question starts over.
+
+        Returns:
+        -------
+        list
+            Up to count questions (fewer only if the pool is smaller than count).
+        """
+        entry = self._pool(pool)
+        if self.shared:
+            self._served.pop((pool, user_id), None)
+        served = self._served_set(pool, user_id)
+
+        # add() and refresh() may be growing the pool from another thread (asample() and aadd() run in threads)
+        with self._lock:
+            picked = self._round_robin(entry, served, count)
+            if len(picked) < count:
+                # Pool used up: start this student over, without repeating what was just picked
+                served.clear()
+                self._conn.execute("DELETE FROM served WHERE pool = ? AND user_id = ?", (pool, user_id))
+                picked += self._round_robin(entry, set(picked), count - len(picked))
+
+            served.update(picked)
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO served (pool, user_id, question_id) VALUES (?, ?, ?)",
+                [(pool, user_id, question_id) for question_id in picked],
+            )
+            self._conn.commit()
+            return [entry.questions[question_id][1] for question_id in picked]
+
+    async def asize(self, pool):
+        # Only the first call for a pool reads SQLite; later ones are answered from memory
+        if pool in self._pools:
+            return self.size(pool)
+        return await asyncio.to_thread(self.size, pool)
+
+    async def aadd(self, pool, kind, questions):
+        return await asyncio.to_thread(self.add, pool, kind, questions)
+
+    async def arefresh(self, pool):
+        return await asyncio.to_thread(self.refresh, pool)
+
+    async def asample(self, pool, user_id, count):
+        return await asyncio.to_thread(self.sample, pool, user_id, count)
+
+    async def aneeds_refill(self, pool, user_id):
+        # Answered from memory once the pool and the student's served set are loaded, as they are after asample()
+        if pool in self._pools and (pool, user_id) in self._served:
+            return self.needs_refill(pool, user_id)
+        return await asyncio.to_thread(self.needs_refill, pool, user_id)
+
+    def needs_refill(self, pool, user_id):
+        return (
+            self.unseen(pool, user_id) < self.low_water
+            and self.size(pool) < self.max_size
+            and pool not in self._exhausted
+            and pool not in self._refills
+        )
+
+    def schedule_refill(self, pool, fn, *args, **kwargs):
+        """
+        Starts fn(*args, **kwargs) (a coroutine function returning the number
+        of questions added) as a background task, unless one is already
+        running for this pool. A refill that adds nothing new marks the pool
+        exhausted so it is not retried on every request.
+        """
+        if pool in self._refills:
+            return self._refills[pool]
+
+        async def run():
+            try:
+                if not await fn(*args, **kwargs):
+                    self._exhausted.add(pool)
+            except Exception as e:
+                logger.error("Question bank refill failed: %s", e)
+            finally:
+                self._refills.pop(pool, None)
+
+        task = self._refills[pool] = asyncio.create_task(run())
+        return task
+
+    async def aclose(self):
+        # Stops background refills and closes the database
+        for task in list(self._refills.values()):
+            task.cancel()
+        await asyncio.gather(*self._refills.values(), return_exceptions=True)
+        with self._lock:
+            self._conn.close()
+
+    def _pool(self, pool):
+        entry = self._pools.get(pool)
+        if entry is None:
+            entry = _Pool()
+            with self._lock:
+                rows = self._conn.execute("SELECT id, objective, question FROM questions WHERE pool = ? ORDER BY id", (pool,)).fetchall()
+            for question_id, objective, question in rows:
+                entry.add(question_id, objective, json.loads(question))
+            entry = self._pools.setdefault(pool, entry)
+        return entry
+
+    def _served_set(self, pool, user_id):
+        served = self._served.get((pool, user_id))
+        if served is None:
+            with self._lock:
+                rows = self._conn.execute("SELECT question_id FROM served WHERE pool = ? AND user_id = ?", (pool, user_id)).fetchall()
+            served = self._served.setdefault((pool, user_id), {question_id for (question_id,) in rows})
+        return served
+
+    @staticmethod
+    def _round_robin(entry, exclude, count):
+        # Take one random unseen question per objective in turn, so a set covers as many objectives as possible
+        candidates = [
+            random.sample(available, len(available))
+            for available in ([i for i in ids if i not in exclude] for ids in entry.by_objective.values())
+            if available
+        ]
+        random.shuffle(candidates)
+        picked = []
+        while len(picked) < count and candidates:
+            for available in list(candidates):
+                if len(picked) == count:
+                    break
+                picked.append(available.pop())
+                if not available:
+                    candidates.remove(available)
+        return picked
+
+
+async def afill(bank, tutor, pool, kind, summary, per_objective=QUESTIONS_PER_OBJECTIVE):
+    """
+    Generates questions for every learning objective in the summary and adds them to the pool.
+
+    Parameters:
+    ----------
+    bank : QuestionBank
+        Where the questions are stored.
+    tutor : TutorAI
+        Generates the questions.
+    pool : str
+        Key from bank_key().
+    kind : str
+        SHORTANSWER or MULTIPLECHOICE.
+    summary : str
+        Section summary the questions are about.
+    per_objective : int
+        Questions asked for per objective.
+
+    Returns:
+    -------
+    int
+        How many new questions were added.
+
+    Raises:
+    ------
+    Exception
+        Whatever the tutor raised, if every objective failed.
+
+    """
+    generate = tutor.ashortanswer_questions if kind == SHORTANSWER else tutor.amultiplechoice_questions
+    objectives = learning_objectives(summary) or [""]
+
+    async def for_objective(objective):
+        # The objective goes after the summary in the prompt, so every call shares the summary as a cacheable prefix
+        return [(objective, question) for question in await generate(per_objective, text=summary, objective=objective)]
+
+    results = await asyncio.gather(*(for_objective(objective) for objective in objectives), return_exceptions=True)
+    failures = [result for result in results if isinstance(result, BaseException)]
+    if len(failures) == len(results):
+        raise failures[0]
+    for failure in failures:
+        logger.warning("Question generation failed for one learning objective: %s", failure)
+    return await bank.aadd(pool, kind, [question for result in results if not isinstance(result, BaseException) for question in result])
@@ -0,0 +1,179 @@
+"""
+------------------------------------------------------------
+File: quizzes.py
+Description:
+    Multiple-choice quizzes graded locally. The correct answers of
+    a quiz handed to a student stay on the server, packed into a
+    short string of letters under a random quiz ID, so grading is a
+    lookup and a comparison instead of an LLM call.
+
+Author: TutorAI backend maintainers
+Date: October 2026
+Version: 1.0
+
+Usage:
+    keys = AnswerKeys()
+    quiz_id, questions = keys.create(my_tutor.multiplechoice_questions(5, text=summary))
+    ...
+    results = keys.grade(quiz_id, ["B", "D", "A", "A", "C"])
+
+Future Updates:
+    None planned.
+------------------------------------------------------------
+"""
+import re
+import secrets
+
+from cache import LRUCache, ResponseCache, SQLiteCache
+
+OPTION_COUNT = 4 # A) to D), as asked for by the multiple-choice prompt
+OPTION_LETTERS = "ABCD"
+
+_QUESTION_NUMBER = re.compile(r"^\s*\d*\s*[:.)]\s*") # Left over from splitting on "Question"
+_ANSWER_LETTER = re.compile(r"[A-Da-d]")
+
+
+def correct_option(question):
+    # 1-based index of the correct option of a parsed question, or None if it cannot be read
+    if len(question) != OPTION_COUNT + 2:
+        return None
+    letter = _ANSWER_LETTER.search(question[-1])
+    return option_number(letter.group(0)) if letter else None
+
+
+def option_number(letter):
+    # "B" or "b" -> 2. Kept here rather than using tutorai.letters_to_number, so the API can import this without the LLM stack.
+    return OPTION_LETTERS.index(letter.upper()) + 1 if len(letter) == 1 and letter.upper() in OPTION_LETTERS else None
+
+
+def to_public(question):
+    # What the student sees: the question and its options, without the answer
+    return {"question": _QUESTION_NUMBER.sub("", question[0]).strip(), "options": [option.strip() for option in question[1:-1]]}
+
+
+class AnswerKeys:
+    """
+    Description: Server-side answer keys of multiple-choice quizzes, keyed by quiz ID.
+
+    Each key is stored as a string with one letter per question, the
+    correct option. Keys expire after ttl seconds and the least recently
+    used ones are dropped past max_entries. With a path, keys are also
+    written to SQLite, so a quiz can be graded by any worker process or
+    after a restart.
+
+    Attributes:
+    ----------
+    max_entries : int
+        Quizzes kept in memory.
+    ttl : float
+        Seconds a quiz can be graded after it was created.
+    path : str or None
+        Optional SQLite file shared by every worker.
+
+    Methods:
+    -------
+    create()
+        Stores the answer key of a set of parsed questions and returns what the student sees.
+    grade()
+        Grades a student's answers against a stored key.
+    acreate()
+        create() from async code, with SQLite accessed in a thread.
+    """
+
+    def __init__(self, max_entries=100000, ttl=24 * 3600, path=None):
+        self._keys = ResponseCache(
+            memory=LRUCache(max_entries=max_entries, ttl=ttl),
+            disk=SQLiteCache(path=path, max_entries=max_entries * 10, ttl=ttl) if path else None,
+        )
+
+    def create(self, questions):
+        """
+        Stores the answer key of a quiz.
+
+        Parameters:
+        ----------
+        questions : list
+            Questions as parsed by TutorAI.multiplechoice_questions():
+            [question, A, B, C, D, correct letter]. Questions whose correct
+            answer cannot be read are left out of the quiz.
+
+        Returns:
+        -------
+        tuple
+            (quiz_id, questions), where questions is a list of
+            {"question", "options"} dicts without answers.
+
+        Raises:
+        ------
+        None
+
+        """
+        answers, public = self._split(questions)
+        quiz_id = secrets.token_urlsafe(12)
+        self._keys.set(quiz_id, answers)
+        return quiz_id, public
+
+    async def acreate(self, questions):
+        answers, public = self._split(questions)
+        quiz_id = secrets.token_urlsafe(12)
+        await self._keys.aset(quiz_id, answers)
+        return quiz_id, public
+
+    def grade(self, quiz_id, answers):
+        """
+        Grades answers against a stored key.
+
+        Parameters:
+        ----------
+        quiz_id : str
+            ID returned by create().
+        answers : list
+            One answer per question: a letter ("B") or a 1-based option number.
+            Blank or unreadable answers are marked incorrect.
+
+        Returns:
+        -------
+        list or None
+            (correct, correct_letter) per question, or None if the quiz is
+            unknown or expired.
+
+        Raises:
+        ------
+        ValueError
+            If the number of answers does not match the number of questions.
+
+        """
+        key = self._keys.get(quiz_id)
+        if key is None:
+            return None
+        if len(answers) != len(key):
+            raise ValueError(f"Expected {len(key)} answers, got {len(answers)}")
+        return [(self._to_number(answer) == option_number(correct), correct) for answer, correct in zip(answers, key)]
+
+    def close(self):
+        if self._keys.disk is not None:
+            self._keys.disk.close()
+
+    def __len__(self):
+        return len(self._keys.memory)
+
+    @staticmethod
+    def _split(questions):
+        # (answer key as a string of letters, questions without answers)
+        answers = []
+        public = []
+        for question in questions:
+            answer = correct_option(question)
+            if answer is not None:
+                answers.append(chr(64 + answer))
+                public.append(to_public(question))
+        return "".join(answers), public
+
+    @staticmethod
+    def _to_number(answer):
+        if isinstance(answer, int):
+            return answer
+        answer = str(answer).strip()
+        if answer.isdigit():
+            return int(answer)
+        return option_number(answer)
@@ -0,0 +1,187 @@
+"""
+------------------------------------------------------------
+File: retrieval.py
+Description:
+    Retrieval for free-form student questions. The question is
+    embedded, Qdrant returns the nearest textbook chunks (optionally
+    limited to a section or chapter), and only as many of the best
+    chunks as fit a token budget are passed on, so answering a
+    question costs a small, targeted context instead of a whole
+    section or summary.
+
+Author: TutorAI backend maintainers
+Date: October 2026
+Version: 1.0
+
+Usage:
+    retriever = Retriever(pool.embeddings, pool.db, "Psychology2e", top_k=5, token_budget=1200)
+    chunks = await retriever.aretrieve("Who opened the first psychology lab?", filters={"chapter": chapter})
+    answer = await my_tutor.aanswer_question(question, format_context(chunks))
+
+Future Updates:
+    None planned.
+------------------------------------------------------------
+"""
+from tokens import count_tokens, truncate_to_tokens
+
+DEFAULT_TOP_K = 5
+DEFAULT_TOKEN_BUDGET = 1200 # Tokens of textbook text sent with each question
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
+# Vector sizes of OpenAI's embedding models (at their default dimensions), to check a collection was built with the configured model
+EMBEDDING_DIMENSIONS = {"text-embedding-3-small": 1536, "text-embedding-3-large": 3072, "text-embedding-ada-002": 1536}
+
+
+def select_chunks(hits, token_budget):
+    """
+    Picks the best search hits that fit a token budget.
+
+    Parameters:
+    ----------
+    hits : list
+        Search results, best first, each a dict with at least "text".
+    token_budget : int
+        Most tokens of chunk text to keep in total.
+
+    Returns:
+    -------
+    list
+        Hits kept, best first, each with a "tokens" count added. Duplicate
+        texts are dropped; if even the best hit is over budget, it is cut
+        down to the budget rather than dropped.
+
+    Raises:
+    ------
+    None
+
+    """
+    selected = []
+    seen = set()
+    used = 0
+    for hit in hits:
+        text = (hit.get("text") or "").strip()
+        if not text or text in seen:
+            continue
+        tokens = count_tokens(text)
+        if used + tokens > token_budget:
+            if selected:
+                continue # A shorter, lower-ranked chunk may still fit
+            text = truncate_to_tokens(text, token_budget)
+            tokens = count_tokens(text)
+        seen.add(text)
+        selected.append({**hit, "text": text, "tokens": tokens})
+        used += tokens
+    return selected
+
+
+def format_context(chunks):
+    # The text handed to the LLM: each chunk under a header naming where it comes from
+    return "\n\n".join(f"[{chunk.get('title') or chunk.get('section')}]\n{chunk['text']}" for chunk in chunks)
+
+
+class Retriever:
+    """
+    Description: Embeds a question and returns the most relevant chunks of a collection, within a token budget.
+
+    Attributes:
+    ----------
+    embeddings : Embeddings
+        LangChain embeddings; must be the model the collection's vectors were made with.
+    db : QdrantConnect
+        Qdrant connection used for the vector search.
+    collection : str
+        Collection to search.
+    top_k : int
+        Nearest chunks asked for per question, before the token budget is applied.
+    token_budget : int
+        Most tokens of chunk text returned per question.
+    score_threshold : float or None
+        Minimum similarity for a chunk to be returned.
+    vector_name : str or None
+        Named vector to search, for collections with more than one.
+    error : str or None
+        Why the collection cannot be searched with these embeddings, once acheck() found a problem.
+
+    Methods:
+    -------
+    acheck()
+        Checks the collection's vectors match the embedding model.
+    aretrieve()
+        Returns the chunks to answer a question with.
+    """
+
+    def __init__(self, embeddings, db, collection, top_k=DEFAULT_TOP_K, token_budget=DEFAULT_TOKEN_BUDGET, score_threshold=None, vector_name=None):
+        self.embeddings = embeddings
+        self.db = db
+        self.collection = collection
+        self.top_k = top_k
+        self.token_budget = token_budget
+        self.score_threshold = score_threshold
+        self.vector_name = vector_name
+        self.error = None
+
+    async def acheck(self, model):
+        """
+        Checks the collection's vectors have the size the embedding model produces.
+        Question vectors from a different model than the one the collection was
+        built with give meaningless search results, so a mismatch is recorded in
+        self.error. Models of unknown size are not checked.
+
+        Parameters:
+        ----------
+        model : str
+            Name of the embedding model questions are embedded with.
+
+        Returns:
+        -------
+        str or None
+            The problem found, or None.
+
+        Raises:
+        ------
+        Exception
+            Whatever Qdrant raises if the collection cannot be read.
+
+        """
+        expected = EMBEDDING_DIMENSIONS.get(model)
+        if expected is None:
+            return None
+        size = await self.db.avector_size(self.collection, self.vector_name)
+        if size != expected:
+            self.error = (
+                f"The {self.collection} collection has {size}-dimensional vectors but EMBEDDING_MODEL={model} "
+                f"makes {expected}-dimensional ones; set EMBEDDING_MODEL to the model the collection was built with"
+            )
+        return self.error
+
+    async def aretrieve(self, question, filters=None, top_k=None, token_budget=None):
+        """
+        Finds the chunks most relevant to a question.
+
+        Parameters:
+        ----------
+        question : str
+            The student's question.
+        filters : dict
+            Optional payload filters, e.g. {"section": "1.2"} or {"chapter": [...]}.
+        top_k, token_budget : int
+            Optional overrides of the instance defaults.
+
+        Returns:
+        -------
+        list
+            Chunk dicts (section, title, chapter, text, chunk, score, tokens), best first.
+
+        Raises:
+        ------
+        None
+
+        """
+        vector = await self.embeddings.aembed_query(question)
+        hits = await self.db.asearch(
+            self.collection, vector,
+            limit=top_k or self.top_k,
+            filters=filters,
+            score_threshold=self.score_threshold,
+            using=self.vector_name,
+        )
+        return select_chunks(hits, token_budget or self.token_budget)
@@ -0,0 +1,221 @@
+"""
+------------------------------------------------------------
+File: scheduler.py
+Description:
+    Shared scheduler for upstream LLM calls. Keeps the API under
+    OpenAI's request and token rate limits, shrinks its
+    concurrency when it gets rate limited, retries with jittered
+    backoff, and lets interactive work (grading) jump ahead of
+    bulk work (summaries, question sets).
+
+Author: TutorAI backend maintainers
+Date: October 2026
+Version: 1.0
+
+Usage:
+    scheduler = LLMScheduler(requests_per_minute=3500, tokens_per_minute=90000)
+    result = await scheduler.run(chain.ainvoke, inputs, priority=INTERACTIVE, tokens=600)
+
+Future Updates:
+    None planned.
+------------------------------------------------------------
+"""
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from contextlib import asynccontextmanager
+
+import openai
+
+from logger import logger
+
+# Lower runs first
+INTERACTIVE = 0 # A student is waiting on the answer (/query)
+BATCH = 1 # A student is waiting on a whole quiz (/query-batch); one request must not crowd out single answers
+BULK = 2 # Content generation (summaries, question sets)
+
+# Errors worth retrying besides rate limits
+TRANSIENT_ERRORS = (openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+
+
+class TokenBucket:
+    """
+    Description: Per-minute rate limit that refills continuously.
+
+    Callers reserve their amount up front and sleep off any deficit, so
+    waiting callers are served in arrival order.
+
+    Attributes:
+    ----------
+    capacity : float
+        Burst size (one minute's worth).
+    rate : float
+        Refill per second.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.available = self.capacity
+        self._updated = time.monotonic()
+
+    async def acquire(self, amount=1):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+        self._updated = now
+
+        self.available -= min(amount, self.capacity)
+        if self.available < 0:
+            await asyncio.sleep(-self.available / self.rate)
+
+
+class LLMScheduler:
+    """
+    Description: Priority queue, rate limits and adaptive concurrency for LLM calls.
+
+    A call first waits for a concurrency slot (highest priority first, FIFO
+    within a priority), then for room in the requests/min and tokens/min
+    buckets. The concurrency window grows by roughly one slot per window's
+    worth of successes and halves on every 429 (AIMD), never leaving
+    [min_concurrency, max_concurrency].
+
+    Attributes:
+    ----------
+    requests : TokenBucket
+        Requests per minute.
+    tokens : TokenBucket
+        Tokens (prompt + completion estimate) per minute.
+    window : float
+        Current concurrency limit.
+    in_flight : int
+        Calls currently holding a slot.
+    retries : int
+        Retries per call on rate limits and transient errors.
+    rate_limited : int
+        429 responses seen.
+
+    Methods:
+    -------
+    run()
+        Awaits a coroutine function under the scheduler, with retries.
+    slot()
+        Context manager holding a slot without retries (for streaming).
+    """
+
+    def __init__(self, requests_per_minute=3500, tokens_per_minute=90000, max_concurrency=32, min_concurrency=1, retries=5, base_delay=1.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.window = float(max_concurrency)
+        self.in_flight = 0
+        self.retries = retries
+        self.base_delay = base_delay
+        self.rate_limited = 0
+        self._waiters = [] # heap of (priority, arrival, future)
+        self._arrivals = itertools.count()
+
+    async def run(self, fn, *args, priority=BULK, tokens=0, **kwargs):
+        """
+        Awaits fn(*args, **kwargs) once a slot and rate-limit budget are available.
+
+        Parameters:
+        ----------
+        fn : callable
+            Coroutine function making the LLM call.
+        priority : int
+            INTERACTIVE, BATCH or BULK; lower runs first.
+        tokens : int
+            Estimated prompt + completion tokens for the tokens/min bucket.
+
+        Returns:
+        -------
+        any
+            Whatever fn returned.
+
+        Raises:
+        ------
+        openai.RateLimitError, openai.APIError
+            Once retries are exhausted (or immediately for non-transient errors).
+
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.slot(priority, tokens):
+                    result = await fn(*args, **kwargs)
+            except openai.RateLimitError as e:
+                self._on_rate_limited()
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(self._backoff(attempt, e))
+            except TRANSIENT_ERRORS as e:
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(self._backoff(attempt, e))
+            else:
+                self._on_success()
+                return result
+
+    @asynccontextmanager
+    async def slot(self, priority=BULK, tokens=0):
+        await self._acquire(priority)
+        try:
+            await self.requests.acquire(1)
+            await self.tokens.acquire(tokens)
+            yield
+        finally:
+            self._release()
+
+    def queued(self):
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    async def _acquire(self, priority):
+        if self.in_flight < self._limit() and not self._waiters:
+            self.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._arrivals), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the caller went away
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+    def _release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_flight < self._limit():
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done(): # Cancelled while queued
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+    def _limit(self):
+        return max(self.min_concurrency, int(self.window))
+
+    def _on_success(self):
+        self.window = min(self.max_concurrency, self.window + 1.0 / self.window)
+        self._wake()
+
+    def _on_rate_limited(self):
+        self.rate_limited += 1
+        self.window = max(self.min_concurrency, self.window / 2)
+        logger.warning("LLM rate limited, concurrency window now %s", self._limit())
+
+    def _backoff(self, attempt, error):
+        # Honor the server's Retry-After when it sends one
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return float(retry_after) * random.uniform(1.0, 1.25)
+            except ValueError:
+                pass
+        return self.base_delay * (2 ** attempt) * random.uniform(0.5, 1.5)
@@ -0,0 +1,40 @@
+"""
+------------------------------------------------------------
+File: sections.py
+Description:
+    Helpers shared by the API and the batch jobs for turning a
+    Qdrant section into generated content, so both agree on the
+    prompt text and on the cache key it is stored under.
+
+Author: TutorAI backend maintainers
+Date: October 2026
+Version: 1.0
+
+Usage:
+    key = section_key("Psychology2e", "1.1", my_tutor.fingerprint())
+    summary = my_tutor.summarize_text(text=section_text("1.1", response))
+
+Future Updates:
+    None planned.
+------------------------------------------------------------
+"""
+from cache import make_key
+
+QUESTION_COUNT = 5 # Short-answer questions generated per section
+
+
+def section_key(collection, section, fingerprint, count=QUESTION_COUNT, revision=0):
+    # Cache key for a section's summary and question set. revision comes from the content
+    # manifest; it is left out at 0 so keys from before a section first changed stay valid.
+    parts = ("summary-and-questions", collection, section, count, fingerprint)
+    return make_key(*parts, revision) if revision else make_key(*parts)
+
+
+def payload_key(collection, section, revision=0):
+    # Cache key for a section's Qdrant payload (every chunk's text, chapter, title)
+    return make_key("qdrant", collection, section, revision) if revision else make_key("qdrant", collection, section)
+
+
+def section_text(section, response):
+    # Text sent to the summarization chain for a Qdrant lookup result
+    return "Section " + str(section) + " of " + response["chapter"] + ": " + response["text"]
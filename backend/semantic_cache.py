@@ -0,0 +1,212 @@
+"""
+------------------------------------------------------------
+File: semantic_cache.py
+Description:
+    Embedding-based cache for short-answer evaluations. Students'
+    answers to the same question cluster heavily, so an answer
+    that is close enough to one already graded reuses its score
+    and evaluation instead of calling the LLM again.
+
+Author: TutorAI backend maintainers
+Date: October 2026
+Version: 1.0
+
+Usage:
+    cache = SemanticCache(OpenAIEmbeddings(api_key=...), threshold=0.97)
+    evaluation, score = await cache.aget_or_compute(
+        make_key(question, summary), answer,
+        my_tutor.ashortanswer_evaluate, question, answer, text=summary)
+
+Future Updates:
+    None planned.
+------------------------------------------------------------
+"""
+import itertools
+from collections import OrderedDict
+
+import numpy as np
+
+from logger import logger
+
+
+class _Scope:
+    # Cached answers for one question: a matrix of unit vectors plus their values
+    def __init__(self):
+        self.vectors = None
+        self.values = []
+        self.texts = []
+        self.last_used = []
+        self.exact = {} # normalized answer text -> row
+
+
+class SemanticCache:
+    """
+    Description: In-process vector index of graded answers, grouped by question.
+
+    Lookups first try an exact match on the normalized answer, then embed
+    it and compare (cosine similarity) against every answer already graded
+    for the same question. Each question keeps at most max_per_scope answers
+    and at most max_scopes questions are kept; both evict least recently used.
+
+    Attributes:
+    ----------
+    embeddings : Embeddings
+        Any LangChain embeddings object (needs aembed_query()).
+    threshold : float
+        Minimum cosine similarity for a cached answer to be reused.
+    max_per_scope : int
+        Answers kept per question.
+    max_scopes : int
+        Questions kept.
+    hits : int
+        Lookups answered from the cache.
+    misses : int
+        Lookups that had to compute a new value.
+    evictions : int
+        Answers dropped to stay within the size limits.
+
+    Methods:
+    -------
+    aget_or_compute()
+        Returns a cached value for a similar answer, or computes and caches a new one.
+    alookup(), add()
+        The two halves of aget_or_compute(), for callers that compute misses in bulk.
+    stats()
+        Hit/miss/eviction counters and current size.
+    """
+
+    def __init__(self, embeddings, threshold=0.97, max_per_scope=200, max_scopes=1000):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_per_scope = max_per_scope
+        self.max_scopes = max_scopes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._scopes = OrderedDict()
+        self._clock = itertools.count()
+
+    async def aget_or_compute(self, scope, text, fn, /, *args, **kwargs):
+        """
+        Looks up a value for text within scope, computing it with fn on a miss.
+
+        Parameters:
+        ----------
+        scope : hashable
+            Groups comparable answers, e.g. a key for (question, summary).
+        text : str
+            The answer being looked up.
+        fn : callable
+            Coroutine function computing the value on a miss.
+        *args, **kwargs
+            Passed through to fn.
+
+        Returns:
+        -------
+        any
+            The cached or freshly computed value.
+
+        Raises:
+        ------
+        Exception
+            Whatever fn raised. Embedding failures are logged and treated as a miss.
+
+        """
+        value, vector = await self.alookup(scope, text)
+        if value is not None:
+            return value
+        value = await fn(*args, **kwargs)
+        self.add(scope, text, vector, value)
+        return value
+
+    async def alookup(self, scope, text):
+        """
+        Finds a cached value for an answer similar to text.
+
+        Returns:
+        -------
+        tuple
+            (value, vector). value is None on a miss; pass vector on to add()
+            so the answer is not embedded twice. vector is None if embedding failed.
+        """
+        normalized = self._normalize_text(text)
+
+        entry = self._scopes.get(scope)
+        if entry is not None and normalized in entry.exact:
+            return self._hit(scope, entry, entry.exact[normalized]), None
+
+        try:
+            vector = self._normalize(await self.embeddings.aembed_query(normalized))
+        except Exception as e:
+            logger.warning("Embedding failed, skipping semantic cache: %s", e)
+            self.misses += 1
+            return None, None
+
+        entry = self._scopes.get(scope)
+        if entry is not None and entry.vectors is not None:
+            similarities = entry.vectors @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.threshold:
+                return self._hit(scope, entry, best), vector
+
+        self.misses += 1
+        return None, vector
+
+    def add(self, scope, text, vector, value):
+        # Answers that could not be embedded are not cached
+        if vector is None:
+            return
+        normalized = self._normalize_text(text)
+
+        entry = self._scopes.get(scope)
+        if entry is None:
+            entry = self._scopes[scope] = _Scope()
+            while len(self._scopes) > self.max_scopes:
+                _, evicted = self._scopes.popitem(last=False)
+                self.evictions += len(evicted.values)
+        self._scopes.move_to_end(scope)
+
+        if len(entry.values) >= self.max_per_scope:
+            self._evict_row(entry, int(np.argmin(entry.last_used)))
+
+        entry.vectors = vector[np.newaxis, :] if entry.vectors is None else np.vstack([entry.vectors, vector])
+        entry.values.append(value)
+        entry.texts.append(normalized)
+        entry.last_used.append(next(self._clock))
+        entry.exact[normalized] = len(entry.values) - 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "scopes": len(self._scopes),
+            "entries": sum(len(entry.values) for entry in self._scopes.values()),
+        }
+
+    def clear(self):
+        self._scopes.clear()
+
+    def _hit(self, scope, entry, row):
+        self.hits += 1
+        entry.last_used[row] = next(self._clock)
+        self._scopes.move_to_end(scope)
+        return entry.values[row]
+
+    def _evict_row(self, entry, row):
+        self.evictions += 1
+        entry.vectors = np.delete(entry.vectors, row, axis=0)
+        del entry.values[row], entry.texts[row], entry.last_used[row]
+        entry.exact = {text: i for i, text in enumerate(entry.texts)}
+
+    @staticmethod
+    def _normalize_text(text):
+        return " ".join(text.lower().split())
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -0,0 +1,71 @@
+"""
+------------------------------------------------------------
+File: serve.py
+Description:
+    Launches the API with one uvicorn worker process per usable
+    CPU core. Workers share the SQLite caches (content, question
+    bank, quiz sessions, answer keys) and lock files, so a section
+    is generated once no matter which worker is asked, and each
+    worker gets an equal share of the LLM rate limits.
+
+Author: TutorAI backend maintainers
+Date: October 2026
+Version: 1.0
+
+Usage:
+    From local directory: python serve.py
+    Options: python serve.py --workers 4 --host 0.0.0.0 --port 8000
+
+Future Updates:
+    None planned.
+------------------------------------------------------------
+"""
+import argparse
+import os
+
+import uvicorn
+from dotenv import load_dotenv
+
+
+def available_cores():
+    # Cores this process may run on (respects taskset/cgroup CPU pinning), else every core
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def default_workers():
+    """
+    Number of worker processes to start.
+
+    Returns:
+    -------
+    int
+        WEB_CONCURRENCY if set, otherwise one per available core,
+        capped at MAX_WORKERS when that is set.
+    """
+    if os.getenv("WEB_CONCURRENCY"):
+        return max(1, int(os.getenv("WEB_CONCURRENCY")))
+    workers = available_cores()
+    if os.getenv("MAX_WORKERS"):
+        workers = min(workers, int(os.getenv("MAX_WORKERS")))
+    return max(1, workers)
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Serve the TutorAI API with one worker per CPU core.")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per available core)")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    args = parser.parse_args()
+
+    workers = args.workers or default_workers()
+    # Workers read this to split the LLM limits and to keep sessions and answer keys in the shared SQLite files
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    uvicorn.run("main:app", host=args.host, port=args.port, workers=workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+------------------------------------------------------------
+File: sessions.py
+Description:
+    Server-side store for the content a student is working on.
+    Each generated summary and question set is kept under a quiz
+    ID, so answers only need to send the ID and the question's
+    index instead of posting the whole summary back every time.
+    The ID is derived from the content, so page loads that show the
+    same summary and questions share one session.
+
+Author: TutorAI backend maintainers
+Date: October 2026
+Version: 1.0
+
+Usage:
+    sessions = QuizSessions(ttl=6 * 3600, path="sessions.db")
+    quiz_id = sessions.create("1.1", summary, questions)
+    quiz = sessions.get(quiz_id)  # {"section", "summary", "questions"} or None once expired
+
+Future Updates:
+    None planned.
+------------------------------------------------------------
+"""
+import time
+
+from cache import LRUCache, ResponseCache, SQLiteCache, make_key
+
+
+class QuizSessions:
+    """
+    Description: Quiz ID -> summary and questions, in memory with an optional SQLite tier.
+
+    Both tiers expire entries after ttl seconds. With a path, sessions
+    survive restarts and are shared by every worker using the same file.
+    Identical content maps to the same quiz ID, and an existing session
+    is only rewritten once it is half way to expiring, so repeat views of
+    a cached section do not add rows.
+
+    Attributes:
+    ----------
+    store : ResponseCache
+        The underlying two-tier cache.
+    ttl : float
+        Seconds a session stays valid after it was last written.
+
+    Methods:
+    -------
+    create()
+        Stores a summary and question set, returning its quiz ID.
+    get()
+        Returns a stored quiz, or None if it is unknown or expired.
+    acreate(), aget()
+        The same from async code, with SQLite accessed in a thread.
+    """
+
+    def __init__(self, ttl=6 * 3600, max_entries=10000, path=None, max_disk_entries=100000):
+        self.store = ResponseCache(
+            memory=LRUCache(max_entries=max_entries, ttl=ttl),
+            disk=SQLiteCache(path=path, max_entries=max_disk_entries, ttl=ttl) if path else None,
+        )
+        self.ttl = ttl
+
+    def create(self, section, summary, questions):
+        quiz_id, quiz = self._quiz(section, summary, questions)
+        if self._stale(self.store.get(quiz_id)):
+            self.store.set(quiz_id, quiz)
+        return quiz_id
+
+    def get(self, quiz_id):
+        return self.store.get(quiz_id)
+
+    async def acreate(self, section, summary, questions):
+        quiz_id, quiz = self._quiz(section, summary, questions)
+        if self._stale(await self.store.aget(quiz_id)):
+            await self.store.aset(quiz_id, quiz)
+        return quiz_id
+
+    async def aget(self, quiz_id):
+        return await self.store.aget(quiz_id)
+
+    def close(self):
+        if self.store.disk is not None:
+            self.store.disk.close()
+
+    @staticmethod
+    def _quiz(section, summary, questions):
+        quiz_id = make_key("quiz", section, summary, questions)[:24]
+        return quiz_id, {"section": section, "summary": summary, "questions": questions, "created": time.time()}
+
+    def _stale(self, stored):
+        # Missing, or old enough that a student starting now could see it expire mid-quiz
+        return stored is None or stored.get("created", 0) < time.time() - self.ttl / 2
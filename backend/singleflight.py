@@ -0,0 +1,160 @@
+"""
+------------------------------------------------------------
+File: singleflight.py
+Description:
+    Request coalescing for expensive async calls. Concurrent
+    callers asking for the same key share one in-flight task
+    instead of each starting their own Qdrant scroll or LLM call.
+    Streamed work (e.g. LLM tokens) is fanned out the same way:
+    every caller receives every item of one shared stream.
+
+Author: TutorAI backend maintainers
+Date: October 2026
+Version: 1.0
+
+Usage:
+    flight = SingleFlight()
+    result = await flight.do(("summary", section), make_summary, section)
+    async for chunk in flight.stream(("summary", section), stream_summary, section):
+        ...
+
+Future Updates:
+    None planned.
+------------------------------------------------------------
+"""
+import asyncio
+
+
+class SingleFlight:
+    """
+    Description: Deduplicates concurrent async calls by key.
+
+    The first caller for a key starts the work as its own task; anyone
+    arriving before it finishes awaits that same task. The task is
+    shielded, so a caller that disconnects does not cancel the work for
+    everyone else. Once the task finishes the key is released and the
+    next call starts fresh. stream() does the same for async generators:
+    one task consumes the generator and each caller is replayed the items
+    produced so far, then follows along as new ones arrive.
+
+    Attributes:
+    ----------
+    calls : int
+        Tasks actually started.
+    shared : int
+        Calls that joined an in-flight task instead of starting one.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self._streams = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key, fn, *args, **kwargs):
+        """
+        Runs fn(*args, **kwargs) once per key among concurrent callers.
+
+        Parameters:
+        ----------
+        key : hashable
+            Identifies identical work.
+        fn : callable
+            Coroutine function doing the work.
+        *args, **kwargs
+            Passed through to fn.
+
+        Returns:
+        -------
+        any
+            Whatever fn returned (the same object for every caller).
+
+        Raises:
+        ------
+        Exception
+            Whatever fn raised, re-raised in every waiting caller.
+
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+            self.calls += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    async def stream(self, key, fn, *args, **kwargs):
+        """
+        Iterates fn(*args, **kwargs) once per key among concurrent callers.
+
+        Parameters:
+        ----------
+        key : hashable
+            Identifies identical work.
+        fn : callable
+            Async generator function producing the items.
+        *args, **kwargs
+            Passed through to fn.
+
+        Yields:
+        ------
+        any
+            Every item fn yields, in order, to every caller (including
+            callers that join after the first items were produced).
+
+        Raises:
+        ------
+        Exception
+            Whatever fn raised, re-raised in every caller once it has been
+            given the items produced before the failure.
+
+        """
+        entry = self._streams.get(key)
+        if entry is None:
+            entry = self._streams[key] = _Stream()
+            entry.task = asyncio.ensure_future(self._produce(key, entry, fn(*args, **kwargs)))
+            self.calls += 1
+        else:
+            self.shared += 1
+
+        index = 0
+        while True:
+            async with entry.changed:
+                await entry.changed.wait_for(lambda: index < len(entry.items) or entry.done)
+            # A caller that goes away (e.g. a closed connection) stops here; the producer carries on for the others
+            while index < len(entry.items):
+                yield entry.items[index]
+                index += 1
+            if entry.done and index == len(entry.items):
+                if entry.error is not None:
+                    raise entry.error
+                return
+
+    async def _produce(self, key, entry, items):
+        try:
+            async for item in items:
+                async with entry.changed:
+                    entry.items.append(item)
+                    entry.changed.notify_all()
+        except (Exception, asyncio.CancelledError) as e:
+            entry.error = e
+        finally:
+            self._streams.pop(key, None)
+            async with entry.changed:
+                entry.done = True
+                entry.changed.notify_all()
+
+    def in_flight(self):
+        return len(self._tasks) + len(self._streams)
+
+
+class _Stream:
+    # One shared stream: the items produced so far and whether the producer has finished
+    def __init__(self):
+        self.items = []
+        self.done = False
+        self.error = None
+        self.task = None
+        self.changed = asyncio.Condition()
@@ -0,0 +1,168 @@
+"""
+------------------------------------------------------------
+File: sync.py
+Description:
+    Incremental content sync. Scrolls a Qdrant collection, hashes
+    each section's payloads and compares them with the content
+    manifest. Only sections whose text actually changed get a new
+    revision: their old summary, questions, Qdrant payload and
+    question pools are deleted, and (with --regenerate) their new
+    content is generated here, in the background, so students never
+    wait on it. Every other section keeps its cached content.
+
+Author: TutorAI backend maintainers
+Date: October 2026
+Version: 1.0
+
+Usage:
+    From local directory: python sync.py --collection Psychology2e
+    Options: --regenerate to generate changed sections right away,
+             --dry-run to only report changes,
+             --interval 3600 to keep syncing every hour.
+    The first run records a baseline and invalidates nothing.
+
+Future Updates:
+    None planned.
+------------------------------------------------------------
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from cache import SQLiteCache
+from clients import ClientPool
+from logger import logger
+from manifest import ContentManifest
+from precompute import precompute
+from qdrant import SEARCH_FIELDS
+from question_bank import MULTIPLECHOICE, SHORTANSWER, QuestionBank, bank_key
+from sections import payload_key, section_key
+
+
+def section_hash(payloads):
+    # Stable digest of the fields content is generated from, in chunk order
+    fields = [{field: payload.get(field) for field in SEARCH_FIELDS} for payload in payloads]
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+async def section_hashes(db, collection):
+    payloads = await db.asection_payloads(collection)
+    return {section: section_hash(chunks) for section, chunks in payloads.items()}
+
+
+def invalidate(store, bank, collection, section, fingerprint, revision):
+    # Deletes everything derived from one revision of a section. Workers still holding it in
+    # memory stop reading it once they see the new revision, and their LRU evicts it.
+    store.delete(section_key(collection, section, fingerprint, revision=revision))
+    store.delete(payload_key(collection, section, revision=revision))
+    for kind in (SHORTANSWER, MULTIPLECHOICE):
+        bank.drop(bank_key(collection, section, fingerprint, kind, revision=revision))
+
+
+async def sync(tutor, db, store, manifest, bank, collection, regenerate=False, concurrency=4, dry_run=False):
+    """
+    Finds changed sections and invalidates (and optionally regenerates) their content.
+
+    Parameters:
+    ----------
+    tutor : TutorAI
+        Configured like the API's tutor, so its fingerprint matches the API's cache keys.
+    db : QdrantConnect
+        Source of the sections.
+    store : SQLiteCache
+        The API's content cache.
+    manifest : ContentManifest
+        Hashes and revisions from the previous sync.
+    bank : QuestionBank
+        The API's question bank.
+    collection : str
+        Qdrant collection to sync.
+    regenerate : bool
+        Generate content for changed and new sections instead of leaving it to the first request.
+    concurrency : int
+        Passed on to precompute() when regenerating.
+    dry_run : bool
+        Only report what changed; nothing is written.
+
+    Returns:
+    -------
+    dict
+        "added", "changed" and "removed" lists of sections, plus precompute()'s
+        counts under "regenerated" when regenerate is set.
+
+    Raises:
+    ------
+    None
+
+    """
+    hashes = await section_hashes(db, collection)
+    if dry_run:
+        return manifest.diff(collection, hashes)
+
+    changes = manifest.update(collection, hashes)
+    fingerprint = tutor.fingerprint()
+    for section, (old_revision, _) in changes.pop("revisions").items():
+        invalidate(store, bank, collection, section, fingerprint, old_revision)
+        logger.info("%s %s: changed, content from revision %s invalidated", collection, section, old_revision)
+
+    if regenerate and (changes["changed"] or changes["added"]):
+        changes["regenerated"] = await precompute(
+            tutor, db, store, collection, concurrency,
+            sections=changes["changed"] + changes["added"],
+            manifest=manifest,
+            bank=bank,
+        )
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Invalidate or regenerate content for sections that changed in Qdrant.")
+    parser.add_argument("--collection", default="Psychology2e")
+    parser.add_argument("--regenerate", action="store_true", help="generate changed and new sections now")
+    parser.add_argument("--dry-run", action="store_true", help="only report which sections changed")
+    parser.add_argument("--interval", type=float, default=0, help="keep syncing, this many seconds apart")
+    parser.add_argument("--concurrency", type=int, default=4, help="sections generated at once")
+    parser.add_argument("--retries", type=int, default=5, help="retries per LLM call on rate limits and transient errors")
+    args = parser.parse_args()
+
+    load_dotenv()
+    store = SQLiteCache(path=os.getenv("CACHE_PATH", "cache.db"), max_entries=int(os.getenv("CACHE_DISK_ENTRIES", 10000)))
+    manifest = ContentManifest(path=store.path)
+
+    async def run():
+        # Same client setup as the API, so the tutor's fingerprint (and so the cache keys) match
+        pool = ClientPool(os.getenv("OPENAI_API_KEY"), os.getenv("QDRANT_URL"), os.getenv("QDRANT_API_KEY"))
+        pool.scheduler.retries = args.retries
+        bank = QuestionBank(path=os.getenv("QUESTION_BANK_PATH", "questions.db"), shared=True)
+        try:
+            while True:
+                changes = await sync(
+                    pool.tutor, pool.db, store, manifest, bank, args.collection,
+                    regenerate=args.regenerate, concurrency=args.concurrency, dry_run=args.dry_run,
+                )
+                failed = changes.get("regenerated", {}).get("failed", 0)
+                logger.info(
+                    "Sync of %s: %d added, %d changed, %d removed%s",
+                    args.collection, len(changes["added"]), len(changes["changed"]), len(changes["removed"]),
+                    " (dry run)" if args.dry_run else "",
+                )
+                if not args.interval:
+                    return failed
+                await asyncio.sleep(args.interval)
+        finally:
+            await bank.aclose()
+            await pool.aclose()
+
+    failed = asyncio.run(run())
+    manifest.close()
+    store.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -18,21 +18,22 @@ Future Updates:
 ------------------------------------------------------------
 """
 
-from tutorai import TutorAI
-from qdrant import QdrantConnect
-
 from dotenv import load_dotenv # Allows you to load environment variables from a .env file
 import os # Allows you to access environment variables
 
-load_dotenv() # Loads environment variables
-openai_api_key = os.getenv("OPENAI_API_KEY") # Retrieves the API key from the .env file
-qdrant_api_key = os.getenv("QDRANT_API_KEY") # Retrieves the API key from the .env file
-qdrant_url = os.getenv("QDRANT_URL") # Retrieves the API key from the .env file
 
+def main():
+    load_dotenv() # Loads environment variables
+    qdrant_api_key = os.getenv("QDRANT_API_KEY") # Retrieves the API key from the .env file
+    qdrant_url = os.getenv("QDRANT_URL") # Retrieves the API key from the .env file
+
+    # Only the Qdrant client is needed for lookups; imported here so importing this module stays cheap
+    from qdrant import QdrantConnect
+    my_db = QdrantConnect(host=qdrant_url, api_key=qdrant_api_key)
+
+    print(my_db.get_subchapter_from_title("Psychology2e", "1.1 What Is Psychology?"))
+    print(my_db.get_chapter_from_chapter("Psychology2e", "Chapter 1 Introduction to Psychology"))
 
-# Create an instance of the tutor
-my_tutor = TutorAI(openai_api_key=openai_api_key, temp=0.5)
-my_db = QdrantConnect(host=qdrant_url, api_key=qdrant_api_key)
 
-print(my_db.get_subchapter_from_title("Psychology2e", "1.1 What Is Psychology?"))
-print(my_db.get_chapter_from_chapter("Psychology2e", "Chapter 1 Introduction to Psychology"))
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import asyncio
+
+from benchmark import measure_imports, percentile, run_in_process
+
+
+def test_percentile():
+    """Nearest-rank percentiles."""
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) == 0.0
+
+
+def test_run_in_process():
+    """Both scenarios run against the app on fakes without errors."""
+    results = asyncio.run(run_in_process(("summary", "query"), requests=12, concurrency=4))
+    assert [result["scenario"] for result in results] == ["summary", "query"]
+    for result in results:
+        assert result["errors"] == 0
+        assert result["p50_ms"] <= result["p99_ms"] <= result["max_ms"]
+    assert results[-1]["llm_calls"] > 0
+
+
+def test_measure_imports():
+    """Import time is measured in a fresh interpreter, with the module's own imports broken down."""
+    result = measure_imports("cache", repeat=1)
+    assert result["module"] == "cache" and result["import_ms"] > 0
+    assert "sqlite3" in [name for name, ms in result["slowest"]]
@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+import pytest
+from cache import LRUCache, ResponseCache, SQLiteCache, make_key
+
+
+@pytest.fixture
+def disk(tmp_path):
+    cache = SQLiteCache(path=str(tmp_path / "cache.db"), max_entries=3, ttl=60)
+    yield cache
+    cache.close()
+
+
+def test_make_key_is_stable():
+    """Identical parts give identical keys, different parts do not."""
+    assert make_key("Psychology2e", "1.1", "abc") == make_key("Psychology2e", "1.1", "abc")
+    assert make_key("Psychology2e", "1.1", "abc") != make_key("Psychology2e", "1.2", "abc")
+
+
+def test_lru_evicts_least_recently_used():
+    """The oldest untouched entry is dropped once the cache is full."""
+    cache = LRUCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_lru_ttl_expiry():
+    """Entries past their TTL are treated as misses."""
+    cache = LRUCache(max_entries=2, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+
+def test_sqlite_round_trip_and_eviction(disk):
+    """Values survive JSON round-trips and the table stays within max_entries."""
+    disk.set("a", {"summary": "s", "questions": ["q1"]})
+    assert disk.get("a") == {"summary": "s", "questions": ["q1"]}
+    for key in ["b", "c", "d"]:
+        disk.set(key, key)
+    assert len(disk) == 3
+    assert disk.get("a") is None
+
+
+def test_sqlite_evicts_every_interval(tmp_path):
+    """Eviction runs once per evict_interval writes, using indexes rather than table scans."""
+    disk = SQLiteCache(path=str(tmp_path / "cache.db"), max_entries=2, evict_interval=5)
+    for key in ["a", "b", "c", "d"]:
+        disk.set(key, key)
+    assert len(disk) == 4
+    disk.set("e", "e")
+    assert len(disk) == 2 and disk.get("e") == "e"
+    plan = " ".join(row[-1] for row in disk._conn.execute(
+        "EXPLAIN QUERY PLAN SELECT key FROM entries WHERE pinned = 0 ORDER BY accessed_at LIMIT 1"
+    ))
+    assert "entries_lru" in plan
+    disk.close()
+
+def test_sqlite_pinned_entries_are_never_evicted(disk, tmp_path):
+    """Pinned entries outlive the LRU cap and don't count towards it; old files gain the column on open."""
+    for key in ["p1", "p2", "p3", "p4"]:
+        disk.set(key, key, pin=True)
+    for key in ["a", "b", "c", "d"]:
+        disk.set(key, key)
+    assert [disk.get(key) for key in ["p1", "p2", "p3", "p4"]] == ["p1", "p2", "p3", "p4"]
+    assert disk.get("a") is None and disk.get("d") == "d"
+
+    import sqlite3
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)")
+    conn.execute("INSERT INTO entries VALUES ('a', '1', NULL, 0)")
+    conn.commit()
+    conn.close()
+    old = SQLiteCache(path=path)
+    assert old.get("a") == 1
+    old.close()
+
+
+def test_sqlite_survives_reopen(tmp_path):
+    """The disk tier persists across instances (i.e. restarts)."""
+    path = str(tmp_path / "cache.db")
+    SQLiteCache(path=path).set("a", "value")
+    assert SQLiteCache(path=path).get("a") == "value"
+
+
+def test_response_cache_promotes_disk_hits(disk):
+    """A disk hit is copied into memory and counted as a hit."""
+    disk.set("a", "value")
+    cache = ResponseCache(memory=LRUCache(), disk=disk)
+    assert cache.get("a") == "value"
+    assert cache.memory.get("a") == "value"
+    assert cache.get("missing") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_response_cache_async_reads_and_writes_disk(disk):
+    """aget()/aset() behave like get()/set(), with the disk tier read and written off the event loop."""
+    cache = ResponseCache(memory=LRUCache(), disk=disk)
+
+    async def run():
+        await cache.aset("a", "value")
+        cache.memory.clear()
+        return await cache.aget("a"), await cache.aget("missing")
+
+    assert asyncio.run(run()) == ("value", None)
+    assert disk.get("a") == cache.memory.get("a") == "value"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_sqlite_shared_between_connections(tmp_path):
+    """Two instances on one file (as in two workers) see each other's writes."""
+    path = str(tmp_path / "cache.db")
+    first, second = SQLiteCache(path=path), SQLiteCache(path=path)
+    first.set("a", "value")
+    assert second.get("a") == "value"
+    second.delete("a")
+    assert first.get("a") is None
+    assert first._conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    first.close()
+    second.close()
@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+import pytest
+from events import DAY, LATENCY_GROWTH, EventLog, bucket_bound, latency_bucket
+
+
+@pytest.fixture
+def events(tmp_path):
+    events = EventLog(path=str(tmp_path / "events.db"), batch_size=3, flush_interval=60)
+    yield events
+    events.close()
+
+
+def test_latency_buckets_are_within_growth():
+    """Every latency falls in a bucket whose upper bound overestimates it by less than LATENCY_GROWTH."""
+    for latency in (0.001, 0.01, 0.0123, 0.5, 1.0, 7.3, 45.0):
+        bound = bucket_bound(latency_bucket(latency))
+        assert latency <= bound * (1 + 1e-9)
+        assert bound < max(latency, 0.01) * LATENCY_GROWTH
+
+
+def test_flush_writes_events_and_rollups(events):
+    """Buffered events are written in one batch and summarized per section and score."""
+    for i in range(10):
+        events.record("student", "1.1", "Q1", " 4 " if i % 2 else "2", latency=0.1 * (i + 1), tokens=100)
+    events.record("student", None, "Q", "5", latency=1.0, tokens=0, cached=True)
+    assert events.scores() == {}
+    assert events.flush() == 11
+    assert events.flush() == 0
+
+    assert events.scores() == {"1.1": {"4": 5, "2": 5}, "": {"5": 1}}
+    assert events.scores(section="1.1", since=0) == {"1.1": {"4": 5, "2": 5}}
+
+    stats = events.latency(section="1.1")["1.1"]
+    assert stats["count"] == 10 and stats["tokens"] == 100
+    assert stats["mean"] == pytest.approx(0.55)
+    assert 0.5 <= stats["p50"] < 0.5 * LATENCY_GROWTH
+    assert 1.0 <= stats["p99"] < 1.0 * LATENCY_GROWTH
+    assert events._conn.execute("SELECT COUNT(*) FROM evaluations").fetchone() == (11,)
+
+
+def test_since_filters_by_day(events):
+    """since keeps whole days from the one it falls in."""
+    events.record("student", "1.1", "Q1", "3", latency=0.2, tokens=10)
+    events.flush()
+    events._conn.execute("UPDATE evaluation_rollup SET day = day - 2")
+    events.record("student", "1.1", "Q1", "5", latency=0.2, tokens=10)
+    events.flush()
+
+    assert events.scores(since=time.time() - DAY) == {"1.1": {"5": 1}}
+    assert events.scores() == {"1.1": {"3": 1, "5": 1}}
+
+
+def test_background_writer_flushes_full_batches(events):
+    """The writer flushes as soon as batch_size events are waiting, and stop() writes the rest."""
+    async def run():
+        events.start()
+        for _ in range(3):
+            events.record("student", "1.1", "Q1", "4", latency=0.1, tokens=1)
+        for _ in range(20):
+            await asyncio.sleep(0.01)
+            if events.scores():
+                break
+        written = events.scores()
+        events.record("student", "1.1", "Q1", "4", latency=0.1, tokens=1)
+        await events.stop()
+        return written
+
+    assert asyncio.run(run()) == {"1.1": {"4": 3}}
+    assert events.scores() == {"1.1": {"4": 4}}
+
+
+def test_stop_waits_for_the_flush_in_flight(tmp_path):
+    """A batch the writer is still committing when the app stops is written, not lost to close()."""
+    import threading
+
+    class SlowLock:
+        # Makes every database write take a while, so stop() lands in the middle of one
+        def __init__(self):
+            self.lock = threading.Lock()
+
+        def __enter__(self):
+            time.sleep(0.1)
+            self.lock.acquire()
+
+        def __exit__(self, *exc):
+            self.lock.release()
+
+    events = EventLog(path=str(tmp_path / "events.db"), batch_size=3, flush_interval=60)
+    events._lock = SlowLock()
+
+    async def run():
+        events.start()
+        for _ in range(3):
+            events.record("student", "1.1", "Q1", "4", latency=0.1, tokens=1)
+        await asyncio.sleep(0.02)
+        await events.stop()
+
+    asyncio.run(run())
+    events.record("student", "1.1", "Q1", "4", latency=0.1, tokens=1)
+    events.close()
+    reopened = EventLog(path=str(tmp_path / "events.db"))
+    assert reopened.scores() == {"1.1": {"4": 4}}
+    reopened.close()
+
+def test_full_buffer_drops_new_events(tmp_path):
+    """Past max_pending, events are dropped instead of growing memory without bound."""
+    events = EventLog(path=str(tmp_path / "events.db"), max_pending=2)
+    for _ in range(5):
+        events.record("student", "1.1", "Q1", "4", latency=0.1, tokens=1)
+    assert events.flush() == 2
+    events.close()
@@ -0,0 +1,52 @@
+import asyncio
+
+from locks import FileLocks
+
+
+def test_hold_serializes_across_instances(tmp_path):
+    """Two lock holders (as in two workers) for the same key run one after the other."""
+    first, second = FileLocks(str(tmp_path)), FileLocks(str(tmp_path), poll_interval=0.01)
+    events = []
+
+    async def work(locks, name):
+        async with locks.hold("section-1.1") as acquired:
+            events.append((name, "start", acquired))
+            await asyncio.sleep(0.05)
+            events.append((name, "end", acquired))
+
+    async def run():
+        await asyncio.gather(work(first, "a"), work(second, "b"))
+
+    asyncio.run(run())
+    assert [event[:2] for event in events] == [("a", "start"), ("a", "end"), ("b", "start"), ("b", "end")]
+    assert all(acquired for _, _, acquired in events)
+
+
+def test_timeout_and_disabled(tmp_path):
+    """A lock that stays busy is given up on after the timeout; without a directory nothing is locked."""
+    holder, waiter = FileLocks(str(tmp_path)), FileLocks(str(tmp_path), poll_interval=0.01, timeout=0.05)
+
+    async def run():
+        async with holder.hold("key"):
+            async with waiter.hold("key") as acquired:
+                assert not acquired
+            async with waiter.hold("other key") as acquired:
+                assert acquired
+        async with FileLocks(None).hold("key") as acquired:
+            assert not acquired
+
+    asyncio.run(run())
+
+
+def test_keys_share_a_fixed_set_of_lock_files(tmp_path):
+    """However many keys are locked, the directory holds at most one file per stripe."""
+    locks = FileLocks(str(tmp_path), stripes=4)
+
+    async def run():
+        for i in range(50):
+            async with locks.hold(f"section-{i}") as acquired:
+                assert acquired
+
+    asyncio.run(run())
+    assert len(list(tmp_path.iterdir())) <= 4
+    assert locks.stripe("section-1") == FileLocks(None, stripes=4).stripe("section-1")
@@ -0,0 +1,47 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+from logging.handlers import QueueHandler
+
+from logger import JsonFormatter, logger, trace_id
+
+
+def test_logger_only_enqueues():
+    """The logger hands records to a queue; file and console I/O happen on the listener thread."""
+    assert len(logger.handlers) == 1
+    assert isinstance(logger.handlers[0], QueueHandler)
+
+
+def test_json_formatter():
+    """Each record becomes one JSON object carrying the request's trace ID."""
+    token = trace_id.set("abc123")
+    try:
+        record = logger.makeRecord(logger.name, logging.INFO, __file__, 1, "Score: %s", ("4",), None)
+        logger.filters[0].filter(record)
+    finally:
+        trace_id.reset(token)
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["level"] == "INFO"
+    assert entry["trace_id"] == "abc123"
+    assert entry["message"] == "Score: 4"
+
+
+def test_disabled_debug_is_not_formatted():
+    """Lazy arguments are never formatted when DEBUG is off."""
+    class Exploding:
+        def __str__(self):
+            raise AssertionError("formatted a disabled log message")
+
+    assert not logger.isEnabledFor(logging.DEBUG)
+    logger.debug("Sending summarization request: %.1000s", Exploding())
+
+
+def test_workers_share_the_file_without_rotating():
+    """With several workers the file handler never rotates, whatever LOG_MAX_BYTES says."""
+    code = "import logger; print(type(logger.file_handler).__name__)"
+    env = {**os.environ, "WEB_CONCURRENCY": "4", "LOG_MAX_BYTES": "1024"}
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=os.path.dirname(__file__), env=env, check=True)
+    assert result.stdout.strip().splitlines()[-1] == "WatchedFileHandler"
@@ -1,14 +1,53 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
 import pytest
 from fastapi.testclient import TestClient
 from main import app
 
 
-# Create the test client for interacting with FastAPI
+# Every test gets its own SQLite files, for the stores opened at import and in the lifespan alike
+@pytest.fixture(autouse=True)
+def stores(monkeypatch, tmp_path):
+    import main
+    from cache import LRUCache, SQLiteCache
+    from manifest import ContentManifest
+
+    cache_path = str(tmp_path / "cache.db")
+    monkeypatch.setattr(main, "content_cache", main.ResponseCache(memory=LRUCache(), disk=SQLiteCache(path=cache_path)))
+    monkeypatch.setattr(main, "manifest", ContentManifest(path=cache_path))
+    monkeypatch.setattr(main, "session_path", str(tmp_path / "sessions.db"))
+    monkeypatch.setattr(main, "event_log_path", str(tmp_path / "events.db"))
+    monkeypatch.setattr(main, "question_bank_path", str(tmp_path / "questions.db"))
+    monkeypatch.setattr(main, "quiz_path", str(tmp_path / "quizzes.db"))
+
+# Create the test client for interacting with FastAPI, once the (fake) upstream clients are built
 @pytest.fixture
-def client():
+def client(monkeypatch):
+    import main
+    from fakes import fake_pool
+
+    monkeypatch.setattr(main, "create_pool", fake_pool)
     with TestClient(app) as client:
+        deadline = time.monotonic() + 60
+        while (response := client.get("/ready")).status_code != 200:
+            if response.json()["status"] == "failed":
+                pytest.fail(f"Upstream clients failed to start: {response.json()['error']}")
+            if time.monotonic() > deadline:
+                pytest.fail("Upstream clients did not start within 60s")
+            time.sleep(0.05)
         yield client
 
+def cache_lookup(lookup):
+    # Stands in for ResponseCache.aget, answering every key with lookup(key)
+    async def aget(key):
+        return lookup(key)
+    return aget
+
 def test_read_root(client):
     """Test the root endpoint."""
     response = client.get("/")
@@ -21,4 +60,270 @@ def test_retrieve_document(client):
     assert response.status_code == 200
     data = response.json()
     assert "document" in data
-    assert data["document"] is not None  # Ensure document is returned, could be a placeholder if empty.
\ No newline at end of file
+    assert data["document"] is not None  # Ensure document is returned, could be a placeholder if empty.
+
+def test_query_batch(client, monkeypatch):
+    """Test /query-batch returns one result per answer, in order."""
+    import main
+
+    async def fake_batch(pairs, text, max_concurrency=5):
+        return [(f"Evaluation of {answer}", str(i + 1)) for i, (question, answer) in enumerate(pairs)]
+
+    async def fake_lookup(scope, text):
+        return None, None
+
+    monkeypatch.setattr(main.my_tutor, "ashortanswer_evaluate_batch", fake_batch)
+    monkeypatch.setattr(main.evaluation_cache, "alookup", fake_lookup)
+    response = client.post("/query-batch", json={
+        "summary": "A summary.",
+        "user_id": "student",
+        "answers": [
+            {"question": "Q1", "user_answer": "A1", "id": "1"},
+            {"question": "Q2", "user_answer": "A2", "id": "2"},
+        ],
+    })
+    assert response.status_code == 200
+    assert response.json() == {"results": [
+        {"id": "1", "response": "Evaluation of A1", "score": "1"},
+        {"id": "2", "response": "Evaluation of A2", "score": "2"},
+    ]}
+
+
+def test_generate_summary_stream_from_cache(client, monkeypatch):
+    """Test /generate-summary-stream replays a cached section as SSE events."""
+    import main
+
+    monkeypatch.setattr(main.content_cache, "aget", cache_lookup(lambda key: {"summary": "Cached\nsummary", "questions": ["Q1", "Q2"]}))
+    response = client.get("/generate-summary-stream", params={"section": "1.1"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.startswith(
+        'event: summary\ndata: "Cached\\nsummary"\n\n'
+        'event: questions\ndata: ["Q1", "Q2"]\n\n'
+        'event: done\ndata: {"quiz_id": '
+    )
+    quiz_id = json.loads(response.text.split("event: done\ndata: ")[1])["quiz_id"]
+    assert main.quiz_sessions.get(quiz_id)["questions"] == ["Q1", "Q2"]
+
+
+def test_unknown_section_is_not_found(client, monkeypatch):
+    """Test an unknown section is a 404 from both the JSON and the streaming endpoint."""
+    import main
+
+    async def no_section(collection_name, section):
+        return None
+
+    monkeypatch.setattr(main.content_cache, "aget", cache_lookup(lambda key: None))
+    monkeypatch.setattr(main.my_db, "aget_full_section", no_section)
+    response = client.get("/generate-summary-and-questions", params={"section": "99.9"})
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Section 99.9 not found"}
+    assert client.get("/generate-summary-stream", params={"section": "99.9"}).status_code == 404
+
+
+def test_metrics(client):
+    """Test /metrics exposes Prometheus text and requests carry a trace ID."""
+    response = client.get("/", headers={"X-Request-ID": "trace-123"})
+    assert response.headers["X-Request-ID"] == "trace-123"
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "# TYPE tutorai_stage_seconds histogram" in response.text
+    assert 'tutorai_http_request_seconds_count{path="/",status="200"}' in response.text
+    assert 'tutorai_cache_lookups_total{cache="content",result="hit"}' in response.text
+
+
+def test_generate_summary_and_questions_per_student(client, monkeypatch, tmp_path):
+    """With a user ID, repeat visits get questions the student has not seen yet."""
+    import main
+    from question_bank import QuestionBank
+
+    async def fake_fill(bank, tutor, pool, kind, summary):
+        return bank.add(pool, kind, [("Objective", f"Extra question {i}") for i in range(5)])
+
+    bank = QuestionBank(path=str(tmp_path / "questions.db"), low_water=3)
+    monkeypatch.setattr(main, "question_bank", bank)
+    monkeypatch.setattr(main, "afill", fake_fill)
+    monkeypatch.setattr(main.content_cache, "aget", cache_lookup(lambda key: {"summary": "Summary", "questions": [f"Question {i}" for i in range(5)]}))
+
+    first = client.get("/generate-summary-and-questions", params={"section": "1.1", "user_id": "student"}).json()
+    second = client.get("/generate-summary-and-questions", params={"section": "1.1", "user_id": "student"}).json()
+    assert first["summary"] == "Summary"
+    assert sorted(first["questions"]) == [f"Question {i}" for i in range(5)]
+    assert sorted(second["questions"]) == [f"Extra question {i}" for i in range(5)]
+
+
+def test_changed_section_uses_new_cache_key(client, monkeypatch, tmp_path):
+    """After sync.py bumps a section's revision, its content is read from a new cache key."""
+    import main
+    from manifest import ContentManifest
+    from sections import section_key
+
+    manifest = ContentManifest(path=str(tmp_path / "cache.db"), refresh_interval=0)
+    monkeypatch.setattr(main, "manifest", manifest)
+    fingerprint = main.my_tutor.fingerprint()
+    cached = {
+        section_key("Psychology2e", "1.1", fingerprint): {"summary": "Old summary", "questions": []},
+        section_key("Psychology2e", "1.1", fingerprint, revision=1): {"summary": "New summary", "questions": []},
+    }
+    monkeypatch.setattr(main.content_cache, "aget", cache_lookup(cached.get))
+
+    assert client.get("/generate-summary-and-questions", params={"section": "1.1"}).json()["summary"] == "Old summary"
+    manifest.update("Psychology2e", {"1.1": "old"})
+    manifest.update("Psychology2e", {"1.1": "new"})
+    assert client.get("/generate-summary-and-questions", params={"section": "1.1"}).json()["summary"] == "New summary"
+    manifest.close()
+
+
+def test_multiple_choice_quiz_is_graded_locally(client, monkeypatch, tmp_path):
+    """A quiz hides its answers and is graded without calling the LLM."""
+    import main
+    from question_bank import QuestionBank
+
+    async def fake_fill(bank, tutor, pool, kind, summary):
+        return bank.add(pool, kind, [("", [f"{i}: Question {i}?", "a", "b", "c", "d", "ABCD"[i % 4]]) for i in range(5)])
+
+    monkeypatch.setattr(main, "question_bank", QuestionBank(path=str(tmp_path / "questions.db")))
+    monkeypatch.setattr(main, "afill", fake_fill)
+    monkeypatch.setattr(main.content_cache, "aget", cache_lookup(lambda key: {"summary": "Summary", "questions": []}))
+
+    quiz = client.get("/multiple-choice-quiz", params={"section": "1.1", "user_id": "student"}).json()
+    assert len(quiz["questions"]) == 5
+    assert set(quiz["questions"][0]) == {"question", "options"}
+
+    answers = ["ABCD"[int(question["question"].split()[1][:-1]) % 4] for question in quiz["questions"]]
+    graded = client.post("/grade-multiple-choice", json={"quiz_id": quiz["quiz_id"], "answers": answers}).json()
+    assert graded["score"] == graded["total"] == 5
+
+    assert client.post("/grade-multiple-choice", json={"quiz_id": "unknown", "answers": answers}).status_code == 404
+    assert client.post("/grade-multiple-choice", json={"quiz_id": quiz["quiz_id"], "answers": ["A"]}).status_code == 422
+
+
+def test_query_by_quiz_id(client, monkeypatch):
+    """/query looks the question and summary up by quiz ID instead of receiving them."""
+    import main
+
+    calls = []
+
+    async def fake_evaluate(question, answer, text):
+        calls.append((question, answer, text))
+        return "Good answer.", "8"
+
+    async def fake_lookup(scope, text):
+        return None, None
+
+    monkeypatch.setattr(main.my_tutor, "ashortanswer_evaluate", fake_evaluate)
+    monkeypatch.setattr(main.evaluation_cache, "alookup", fake_lookup)
+    monkeypatch.setattr(main.content_cache, "aget", cache_lookup(lambda key: {"summary": "Summary", "questions": ["Q1", "Q2"]}))
+
+    quiz_id = client.get("/generate-summary-and-questions", params={"section": "1.1"}).json()["quiz_id"]
+    response = client.post("/query", json={"quiz_id": quiz_id, "question_index": 1, "user_answer": "A2", "user_id": "student", "id": "1"})
+    assert response.json() == {"response": "Good answer.", "score": "8"}
+    assert calls == [("Q2", "A2", "Summary")]
+
+    assert client.post("/query", json={"quiz_id": quiz_id, "question_index": 5, "user_answer": "A", "user_id": "s", "id": "1"}).status_code == 422
+    assert client.post("/query", json={"quiz_id": "unknown", "question_index": 0, "user_answer": "A", "user_id": "s", "id": "1"}).status_code == 404
+    assert client.post("/query", json={"user_answer": "A", "user_id": "s", "id": "1"}).status_code == 422
+
+def test_graded_answers_feed_analytics(client, monkeypatch, tmp_path):
+    """Graded answers are logged with their section and show up in the analytics endpoints."""
+    import main
+    from events import EventLog
+
+    async def fake_evaluate(question, answer, text):
+        return "Good answer.", "4"
+
+    async def fake_lookup(scope, text):
+        return None, None
+
+    events = EventLog(path=str(tmp_path / "events.db"))
+    monkeypatch.setattr(main, "event_log", events)
+    monkeypatch.setattr(main.my_tutor, "ashortanswer_evaluate", fake_evaluate)
+    monkeypatch.setattr(main.evaluation_cache, "alookup", fake_lookup)
+    monkeypatch.setattr(main.content_cache, "aget", cache_lookup(lambda key: {"summary": "Summary", "questions": ["Q1", "Q2"]}))
+
+    quiz_id = client.get("/generate-summary-and-questions", params={"section": "1.2"}).json()["quiz_id"]
+    client.post("/query", json={"quiz_id": quiz_id, "question_index": 0, "user_answer": "A1", "user_id": "student", "id": "1"})
+    client.post("/query", json={"question": "Q", "summary": "S", "user_answer": "A", "user_id": "student", "id": "2"})
+    assert events.flush() == 2
+
+    assert client.get("/analytics/scores", params={"section": "1.2"}).json() == {"sections": {"1.2": {"4": 1}}}
+    latency = client.get("/analytics/latency", params={"days": 1}).json()["sections"]
+    assert sorted(latency) == ["", "1.2"]
+    assert latency["1.2"]["count"] == 1 and latency["1.2"]["p99"] >= latency["1.2"]["mean"]
+    events.close()
+
+def test_ready_reports_warm_state(client):
+    """/ready answers 200 with startup details once the clients are built."""
+    response = client.get("/ready")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "ready"
+    assert data["startup_seconds"] >= 0
+
+def test_import_skips_llm_stack():
+    """Importing the app does not import LangChain, OpenAI or Qdrant; they load in the background at startup."""
+    code = "import sys, main; print(sorted(m for m in ('langchain', 'langchain_openai', 'openai', 'qdrant_client') if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=os.path.dirname(__file__), check=True)
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+def test_requests_wait_for_startup(monkeypatch):
+    """While the clients are still being built /ready says so, and requests wait instead of failing."""
+    import main
+    from fakes import fake_pool
+
+    async def slow_pool():
+        await asyncio.sleep(0.3)
+        return await fake_pool()
+
+    monkeypatch.setattr(main, "create_pool", slow_pool)
+    monkeypatch.setattr(main, "content_cache", main.ResponseCache())
+    with TestClient(app) as client:
+        response = client.get("/ready")
+        assert response.status_code == 503 and response.json()["status"] == "starting"
+        assert client.get("/generate-summary-and-questions", params={"section": "1.1"}).status_code == 200
+        assert client.get("/ready").status_code == 200
+
+def test_failed_startup(monkeypatch):
+    """A startup error is reported by /ready and turns requests into 503s, without taking the app down."""
+    import main
+
+    async def broken_pool():
+        raise RuntimeError("OPENAI_API_KEY is not set")
+
+    monkeypatch.setattr(main, "create_pool", broken_pool)
+    with TestClient(app) as client:
+        assert client.get("/").status_code == 200
+        assert client.get("/generate-summary-and-questions").status_code == 503
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "failed" and "OPENAI_API_KEY" in response.json()["error"]
+
+def test_ask_uses_retrieved_chunks(monkeypatch):
+    """/ask answers from the chunks nearest the question and lists them as sources."""
+    import main
+    from fakes import fake_pool
+
+    monkeypatch.setattr(main, "create_pool", fake_pool)
+    with TestClient(app) as client:
+        response = client.post("/ask", json={"question": "Who established the first psychological laboratory in Leipzig?"})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["sources"][0]["section"] == "1.2"
+        assert "Wundt" in data["answer"]
+
+        response = client.post("/ask", json={"question": "Wundt laboratory", "section": "9.9"})
+        assert response.json() == {"answer": "I couldn't find anything about that in the textbook.", "sources": []}
+
+def test_lifespan_can_run_twice(monkeypatch):
+    """Each app start opens its own stores, so a second start does not reuse ones the first shut down."""
+    import main
+    from fakes import fake_pool
+
+    monkeypatch.setattr(main, "create_pool", fake_pool)
+    for _ in range(2):
+        with TestClient(app):
+            quiz_id = asyncio.run(main.quiz_sessions.acreate("1.1", "Summary", ["Q1"]))
+            assert main.quiz_sessions.get(quiz_id)["questions"] == ["Q1"]
+            assert main.question_bank.size("pool") == 0
+        assert main.question_bank is None
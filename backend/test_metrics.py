@@ -0,0 +1,44 @@
+from metrics import Counter, Gauge, Histogram, Registry, timed
+
+
+def test_render_prometheus_text():
+    """Counters, gauges and histograms render in the Prometheus text format."""
+    registry = Registry()
+    requests = Counter("requests_total", "Requests.", ["path"], registry=registry)
+    in_flight = Gauge("in_flight", "In flight.", registry=registry)
+    latency = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0), registry=registry)
+
+    requests.labels(path="/query").inc()
+    requests.labels(path="/query").inc(2)
+    in_flight.labels().set_function(lambda: 7)
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{path="/query"} 3' in text
+    assert "in_flight 7" in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_count 3" in text
+
+
+def test_timed_records_stage():
+    """The timed decorator observes sync and async calls."""
+    import asyncio
+    from metrics import STAGE_SECONDS
+
+    @timed("test_sync")
+    def work():
+        return 1
+
+    @timed("test_async")
+    async def awork():
+        return 2
+
+    assert work() == 1
+    assert asyncio.run(awork()) == 2
+    assert STAGE_SECONDS.labels(stage="test_sync").count == 1
+    assert STAGE_SECONDS.labels(stage="test_async").count == 1
@@ -0,0 +1,50 @@
+from parsers import parse_multiplechoice_questions, parse_shortanswer_evaluation, parse_shortanswer_evaluation_result, parse_shortanswer_questions
+
+
+def test_evaluation_json():
+    """Structured evaluations are validated in one pass, even with text around the JSON."""
+    assert parse_shortanswer_evaluation('Sure!\n{"score": 8, "evaluation": "Good answer."}') == ("Good answer.", "8")
+    assert parse_shortanswer_evaluation('{"score": "7", "evaluation": "Fine."}') == ("Fine.", "7")
+
+
+def test_evaluation_text_fallback():
+    """Free-text evaluations find the labelled score instead of the first digit anywhere."""
+    assert parse_shortanswer_evaluation("Score: 8/10\nEvaluation: You named 2 of the 3 schools.") == ("You named 2 of the 3 schools.", "8")
+    assert parse_shortanswer_evaluation("Score: 7.\nEvaluation: Mostly right.") == ("Mostly right.", "7")
+    assert parse_shortanswer_evaluation("Evaluation: In 1879 Wundt... I'd give this 6/10.")[1] == "6"
+    assert parse_shortanswer_evaluation('{"score": 15, "evaluation": "Out of range"}')[1] == "10"
+    assert parse_shortanswer_evaluation("No idea.") == ("No idea.", "0")
+
+
+def test_multiplechoice_json_keeps_valid_questions():
+    """Malformed questions in a JSON list are dropped instead of failing the whole set."""
+    completion = '''[
+        {"question": "Who opened the first lab?", "options": ["Freud", "James", "Wundt", "Skinner"], "answer": "c"},
+        {"question": "Too few options", "options": ["A", "B"], "answer": "A"}
+    ]'''
+    assert parse_multiplechoice_questions(completion) == [["Who opened the first lab?", "Freud", "James", "Wundt", "Skinner", "C"]]
+
+
+def test_multiplechoice_text_fallback():
+    """The free-text format parses with or without newlines between parts."""
+    completion = (
+        "Question 1: What is psychology?\nA) Rocks\nB) Mind and behavior\nC) Physics\nD) Therapy\nCorrect Answer: B\n\n"
+        "Question 2: Who founded functionalism? A) Wundt B) James C) Freud D) Watson Correct Answer: B) James"
+    )
+    assert parse_multiplechoice_questions(completion) == [
+        ["What is psychology?", "Rocks", "Mind and behavior", "Physics", "Therapy", "B"],
+        ["Who founded functionalism?", "Wundt", "James", "Freud", "Watson", "B"],
+    ]
+
+
+def test_shortanswer_questions():
+    """Numbering and blank lines are stripped; JSON lists are accepted too."""
+    assert parse_shortanswer_questions("1. First?\n\n2) Second?\n- Third?") == ["First?", "Second?", "Third?"]
+    assert parse_shortanswer_questions('["First?", "Second?"]') == ["First?", "Second?"]
+
+
+def test_evaluation_parse_result():
+    """The parse result says whether the score came from JSON, the text fallback, or nowhere."""
+    assert parse_shortanswer_evaluation_result('{"score": 8, "evaluation": "Good."}') == ("Good.", "8", "json")
+    assert parse_shortanswer_evaluation_result("Score: 4\nEvaluation: Partly.")[1:] == ("4", "text")
+    assert parse_shortanswer_evaluation_result("No idea.")[1:] == ("0", "failed")
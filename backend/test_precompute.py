@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+from cache import SQLiteCache
+from precompute import precompute
+from question_bank import MULTIPLECHOICE, SHORTANSWER, QuestionBank, bank_key
+from sections import section_key
+
+
+class FakeDB:
+    async def alist_sections(self, collection_name):
+        return ["1.1", "1.2", "1.3"]
+
+    async def aget_full_section(self, collection_name, section):
+        if section == "1.3":
+            raise ValueError("missing section")
+        return {"title": section, "chapter": "Chapter 1", "text": "Text of " + section}
+
+
+class FakeTutor:
+    def __init__(self):
+        self.summaries = 0
+
+    def fingerprint(self):
+        return "fingerprint"
+
+    async def asummarize_text(self, text):
+        self.summaries += 1
+        return "Summary: " + text
+
+    async def ashortanswer_questions(self, count, text, objective=""):
+        return [f"Question {i + 1}" for i in range(count)]
+
+    async def amultiplechoice_questions(self, count, text, objective=""):
+        return [[f"Question {i + 1}", "A", "B", "C", "D", "A"] for i in range(count)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteCache(path=str(tmp_path / "cache.db"))
+    yield store
+    store.close()
+
+
+def test_precompute_stores_sections_and_resumes(store):
+    """Sections are stored under the API's cache key and skipped on the next run."""
+    tutor = FakeTutor()
+    counts = asyncio.run(precompute(tutor, FakeDB(), store, "Psychology2e", concurrency=2))
+    assert counts == {"generated": 2, "skipped": 0, "failed": 1}
+    stored = store.get(section_key("Psychology2e", "1.1", "fingerprint"))
+    assert stored["summary"] == "Summary: Section 1.1 of Chapter 1: Text of 1.1"
+    assert len(stored["questions"]) == 5
+
+    counts = asyncio.run(precompute(tutor, FakeDB(), store, "Psychology2e"))
+    assert counts == {"generated": 0, "skipped": 2, "failed": 1}
+    assert tutor.summaries == 2
+
+
+def test_precompute_warms_question_bank(store, tmp_path):
+    """Both question pools are filled, including for sections stored by an earlier run."""
+    tutor = FakeTutor()
+    asyncio.run(precompute(tutor, FakeDB(), store, "Psychology2e"))
+    bank = QuestionBank(path=str(tmp_path / "questions.db"))
+    counts = asyncio.run(precompute(tutor, FakeDB(), store, "Psychology2e", bank=bank))
+    assert counts == {"generated": 2, "skipped": 0, "failed": 1}
+    assert tutor.summaries == 2
+    for kind in (SHORTANSWER, MULTIPLECHOICE):
+        assert bank.size(bank_key("Psychology2e", "1.1", "fingerprint", kind)) == 5
+
+    counts = asyncio.run(precompute(tutor, FakeDB(), store, "Psychology2e", bank=bank))
+    assert counts == {"generated": 0, "skipped": 2, "failed": 1}
+    asyncio.run(bank.aclose())
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
+from qdrant import QdrantConnect
+
+SECTIONS = [
+    {"section": "1.1", "title": "1.1 What Is Psychology?", "chapter": "Chapter 1 Introduction to Psychology", "text": "Psychology is the scientific study of the mind and behavior."},
+    {"section": "1.2", "title": "1.2 History of Psychology", "chapter": "Chapter 1 Introduction to Psychology", "text": "Wundt and James were early psychologists."},
+    {"section": "1.10", "title": "1.10 Summary", "chapter": "Chapter 1 Introduction to Psychology", "text": "A summary."},
+]
+VECTORS = models.VectorParams(size=2, distance=models.Distance.COSINE)
+
+
+def points(payloads, start=1):
+    return [models.PointStruct(id=start + i, vector=[1.0, 0.0], payload=payload) for i, payload in enumerate(payloads)]
+
+
+@pytest.fixture
+def db():
+    """QdrantConnect backed by in-memory clients seeded with the same sections."""
+    client = QdrantClient(":memory:")
+    client.create_collection("Psychology2e", vectors_config=VECTORS)
+    client.upsert("Psychology2e", points(SECTIONS))
+
+    async def seed_async():
+        async_client = AsyncQdrantClient(":memory:")
+        await async_client.create_collection("Psychology2e", vectors_config=VECTORS)
+        await async_client.upsert("Psychology2e", points(SECTIONS))
+        return async_client
+
+    return QdrantConnect(host=None, api_key=None, qdrant_client=client, async_qdrant_client=asyncio.run(seed_async()))
+
+
+def test_lookups_use_the_index(db):
+    """Lookups return the matching payload and build the index on first use."""
+    assert db.get_subchapter_from_section("Psychology2e", "1.2") == {
+        "title": "1.2 History of Psychology",
+        "chapter": "Chapter 1 Introduction to Psychology",
+        "text": "Wundt and James were early psychologists.",
+    }
+    assert db._index["Psychology2e"]["section"] == {"1.1": 1, "1.2": 2, "1.10": 3}
+    assert db.get_chapter_from_chapter("Psychology2e", "Chapter 1 Introduction to Psychology")["title"] == "1.1 What Is Psychology?"
+    assert asyncio.run(db.aget_subchapter_from_title("Psychology2e", "1.10 Summary"))["text"] == "A summary."
+
+
+def test_incremental_refresh_and_miss_fallback(db):
+    """New points are found by the fallback scroll and by incremental refreshes."""
+    db.get_subchapter_from_section("Psychology2e", "1.1")
+    db.qdrant_client.upsert("Psychology2e", points([
+        {"section": "2.1", "title": "2.1 Why Is Research Important?", "chapter": "Chapter 2", "text": "Research."},
+        {"section": "2.2", "title": "2.2 Approaches to Research", "chapter": "Chapter 2", "text": "Approaches."},
+    ], start=4))
+
+    assert db.get_subchapter_from_section("Psychology2e", "2.1")["text"] == "Research."
+    assert "2.2" not in db._index["Psychology2e"]["section"]
+    db.refresh_index("Psychology2e")
+    assert db._index["Psychology2e"]["section"]["2.2"] == 5
+
+
+def test_full_section_joins_every_chunk_in_order(db):
+    """Sections split across points come back whole, ordered by their chunk number."""
+    db.qdrant_client.upsert("Psychology2e", points([
+        {"section": "3.1", "title": "3.1 Genes", "chapter": "Chapter 3", "text": "Second part.", "chunk": 1},
+        {"section": "3.1", "title": "3.1 Genes", "chapter": "Chapter 3", "text": "First part.", "chunk": 0},
+    ], start=10))
+    assert db.get_full_section("Psychology2e", "3.1") == {
+        "title": "3.1 Genes",
+        "chapter": "Chapter 3",
+        "text": "First part.\n\nSecond part.",
+    }
+    assert asyncio.run(db.aget_full_section("Psychology2e", "1.1"))["text"] == SECTIONS[0]["text"]
+
+
+def test_unknown_section_is_none(db):
+    """Lookups of a section that does not exist return None instead of raising."""
+    assert db.get_full_section("Psychology2e", "99.9") is None
+    assert asyncio.run(db.aget_full_section("Psychology2e", "99.9")) is None
+    assert db.get_subchapter_from_section("Psychology2e", "99.9") is None
+    assert asyncio.run(db.aget_subchapter_from_section("Psychology2e", "99.9")) is None
+
+
+def test_list_sections_sorted_numerically(db):
+    """Sections are listed in reading order."""
+    assert db.list_sections("Psychology2e") == ["1.1", "1.2", "1.10"]
+
+
+def test_section_payloads_grouped_in_chunk_order(db):
+    """The full scan groups every point's payload by section, chunks in order."""
+    async def scan():
+        await db.async_qdrant_client.upsert("Psychology2e", points([
+            {"section": "3.1", "title": "3.1 Genes", "chapter": "Chapter 3", "text": "Second part.", "chunk": 1},
+            {"section": "3.1", "title": "3.1 Genes", "chapter": "Chapter 3", "text": "First part.", "chunk": 0},
+        ], start=10))
+        return await db.asection_payloads("Psychology2e")
+
+    payloads = asyncio.run(scan())
+    assert sorted(payloads) == ["1.1", "1.10", "1.2", "3.1"]
+    assert [payload["text"] for payload in payloads["3.1"]] == ["First part.", "Second part."]
+    assert payloads["1.2"][0]["title"] == "1.2 History of Psychology"
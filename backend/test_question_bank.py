@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+from question_bank import MULTIPLECHOICE, SHORTANSWER, QuestionBank, afill, bank_key, learning_objectives
+from tutorai import TutorAI
+
+SUMMARY = "Learning objectives:\n1. Define psychology.\n2. Describe structuralism.\n- Explain functionalism.\n\nSummary:\nPsychology is..."
+
+
+@pytest.fixture
+def bank(tmp_path):
+    bank = QuestionBank(path=str(tmp_path / "questions.db"), max_size=30, low_water=4)
+    yield bank
+    asyncio.run(bank.aclose())
+
+
+def test_learning_objectives():
+    """The objective list at the top of a summary is extracted; anything else gives none."""
+    assert learning_objectives(SUMMARY) == ["Define psychology.", "Describe structuralism.", "Explain functionalism."]
+    assert learning_objectives("Just a summary.") == []
+
+
+def test_sample_never_repeats_until_pool_is_used_up(bank):
+    """A student sees every question once, spread across objectives, before any repeats."""
+    pool = bank_key("Psychology2e", "1.1", "fingerprint", SHORTANSWER)
+    assert bank.add(pool, SHORTANSWER, [(f"objective {i % 3}", f"Question {i}") for i in range(9)]) == 9
+    assert bank.add(pool, SHORTANSWER, [("objective 0", "Question 0")]) == 0
+
+    first = bank.sample(pool, "student", 3)
+    assert len({question for question in first}) == 3
+    assert {int(question.split()[-1]) % 3 for question in first} == {0, 1, 2}
+    seen = first + bank.sample(pool, "student", 3) + bank.sample(pool, "student", 3)
+    assert sorted(seen) == sorted(f"Question {i}" for i in range(9))
+    assert bank.unseen(pool, "student") == 0
+    assert bank.unseen(pool, "other student") == 9
+
+    # Starting over still gives a full set without duplicates
+    again = bank.sample(pool, "student", 3)
+    assert len(set(again)) == 3
+
+
+def test_served_questions_survive_restart(bank, tmp_path):
+    """Pools and served questions are reloaded from SQLite."""
+    pool = bank_key("Psychology2e", "1.1", "fingerprint", MULTIPLECHOICE)
+    bank.add(pool, MULTIPLECHOICE, [("", ["Q1", "a", "b", "c", "d", "A"]), ("", ["Q2", "a", "b", "c", "d", "B"])])
+    served = bank.sample(pool, "student", 1)
+
+    reopened = QuestionBank(path=str(tmp_path / "questions.db"))
+    assert reopened.size(pool) == 2
+    assert reopened.sample(pool, "student", 1) != served
+    asyncio.run(reopened.aclose())
+
+
+def test_sample_while_adding_from_another_thread(bank):
+    """Sampling in threads while a refill adds new objectives never fails or repeats a question."""
+    pool = bank_key("Psychology2e", "1.1", "fingerprint", SHORTANSWER)
+    bank.add(pool, SHORTANSWER, [("objective 0", f"Question {i}") for i in range(5)])
+
+    async def run():
+        adds = [bank.aadd(pool, SHORTANSWER, [(f"objective {i}", f"New question {i}")]) for i in range(1, 200)]
+        samples = [bank.asample(pool, "student", 1) for _ in range(150)]
+        return await asyncio.gather(*adds, *samples)
+
+    picked = [question for result in asyncio.run(run())[199:] for question in result]
+    assert len(picked) == 150
+    assert len(set(picked)) == 150
+
+def test_shared_banks_see_each_others_questions(bank, tmp_path):
+    """Workers sharing the database pick up each other's questions and what a student was served."""
+    pool = bank_key("Psychology2e", "1.1", "fingerprint", SHORTANSWER)
+    other = QuestionBank(path=str(tmp_path / "questions.db"), shared=True)
+    bank.shared = True
+    assert other.size(pool) == 0
+
+    bank.add(pool, SHORTANSWER, [("", "Q1"), ("", "Q2")])
+    assert other.refresh(pool) == 2 and other.refresh(pool) == 0
+    served = bank.sample(pool, "student", 1)
+    assert other.sample(pool, "student", 1) != served
+    asyncio.run(other.aclose())
+
+
+def test_fill_and_background_refill(bank, fake_llm):
+    """afill() tags questions with their objective; refills run once per pool and stop when nothing new comes back."""
+    tutor = TutorAI(llm=fake_llm)
+    pool = bank_key("Psychology2e", "1.1", tutor.fingerprint(), SHORTANSWER)
+
+    async def run():
+        added = await afill(bank, tutor, pool, SHORTANSWER, SUMMARY, per_objective=2)
+        assert added == 6
+        assert bank.objectives(pool) == ["Define psychology.", "Describe structuralism.", "Explain functionalism."]
+
+        bank.sample(pool, "student", 3)
+        assert bank.needs_refill(pool, "student")
+        task = bank.schedule_refill(pool, afill, bank, tutor, pool, SHORTANSWER, SUMMARY, per_objective=2)
+        assert bank.schedule_refill(pool, afill, bank, tutor, pool, SHORTANSWER, SUMMARY) is task
+        await task
+
+        # The fake LLM is deterministic, so the refill found nothing new
+        assert bank.size(pool) == 6
+        assert not bank.needs_refill(pool, "student")
+
+    asyncio.run(run())
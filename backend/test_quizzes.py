@@ -0,0 +1,40 @@
+import pytest
+from quizzes import AnswerKeys
+
+QUESTIONS = [
+    ["1: What is psychology?", "The study of rocks", "The study of mind and behavior", "A branch of physics", "A type of therapy", "B"],
+    [" 2: Who opened the first lab?", "Freud", "James", "Wundt", "Skinner", "C) Wundt"],
+    ["3: Malformed question", "Only one option", "D"],
+]
+
+
+def test_create_hides_answers_and_drops_malformed():
+    """Students get questions and options only; unreadable questions are left out."""
+    keys = AnswerKeys()
+    quiz_id, questions = keys.create(QUESTIONS)
+    assert questions == [
+        {"question": "What is psychology?", "options": ["The study of rocks", "The study of mind and behavior", "A branch of physics", "A type of therapy"]},
+        {"question": "Who opened the first lab?", "options": ["Freud", "James", "Wundt", "Skinner"]},
+    ]
+    assert len(keys) == 1 and quiz_id
+
+
+def test_grade_locally():
+    """Letters (any case) and option numbers are graded against the stored key."""
+    keys = AnswerKeys()
+    quiz_id, _ = keys.create(QUESTIONS)
+    assert keys.grade(quiz_id, ["b", 2]) == [(True, "B"), (False, "C")]
+    assert keys.grade(quiz_id, ["", "3"]) == [(False, "B"), (True, "C")]
+    assert keys.grade("unknown", ["B", "C"]) is None
+    with pytest.raises(ValueError):
+        keys.grade(quiz_id, ["B"])
+
+
+def test_answer_keys_shared_through_sqlite(tmp_path):
+    """With a path, a quiz created by one worker can be graded by another."""
+    path = str(tmp_path / "quizzes.db")
+    creator, grader = AnswerKeys(path=path), AnswerKeys(path=path)
+    quiz_id, _ = creator.create(QUESTIONS)
+    assert grader.grade(quiz_id, ["B", "A"]) == [(True, "B"), (False, "C")]
+    creator.close()
+    grader.close()
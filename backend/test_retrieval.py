@@ -0,0 +1,51 @@
+import asyncio
+
+from fakes import COLLECTION, FakeEmbeddings
+from retrieval import Retriever, format_context, select_chunks
+from tokens import count_tokens
+
+
+def test_select_chunks_within_budget():
+    """Best hits are kept while they fit; duplicates are dropped and an oversized best hit is cut down."""
+    hits = [
+        {"section": "1.1", "text": "one two three four five six seven eight", "score": 0.9},
+        {"section": "1.1", "text": "one two three four five six seven eight", "score": 0.8},
+        {"section": "1.2", "text": "nine ten " * 40, "score": 0.7},
+        {"section": "1.3", "text": "eleven twelve", "score": 0.6},
+    ]
+    budget = count_tokens(hits[0]["text"]) + count_tokens(hits[3]["text"])
+    assert [chunk["section"] for chunk in select_chunks(hits, budget)] == ["1.1", "1.3"]
+
+    (only,) = select_chunks(hits[2:3], 5)
+    assert only["tokens"] <= 5 and only["text"]
+
+
+def test_retriever_finds_relevant_chunks(fake_db):
+    """The nearest chunks come back best first, and payload filters narrow the search."""
+    retriever = Retriever(FakeEmbeddings(), fake_db, COLLECTION, top_k=3, token_budget=1000)
+
+    chunks = asyncio.run(retriever.aretrieve("Wilhelm Wundt established the first psychological laboratory"))
+    assert chunks[0]["section"] == "1.2" and chunks[0]["chunk"] == 0
+    assert chunks[0]["score"] >= chunks[-1]["score"]
+    assert "[1.2 History of Psychology]" in format_context(chunks)
+
+    chunks = asyncio.run(retriever.aretrieve("Wilhelm Wundt laboratory", filters={"chapter": "Chapter 2 Psychological Research"}))
+    assert chunks and {chunk["section"] for chunk in chunks} <= {"2.1", "2.2"}
+
+
+def test_search_sync_and_any_filter(fake_db):
+    """The sync search matches the async one, and a list filter value matches any of its items."""
+    vector = FakeEmbeddings().embed_query("research hypotheses evidence")
+    hits = fake_db.search(COLLECTION, vector, limit=2, filters={"section": ["2.1", "2.2"]})
+    assert len(hits) == 2 and {hit["section"] for hit in hits} <= {"2.1", "2.2"}
+    assert hits == asyncio.run(fake_db.asearch(COLLECTION, vector, limit=2, filters={"section": ["2.1", "2.2"]}))
+
+
+def test_check_flags_a_different_embedding_model(fake_db):
+    """A known model whose vector size does not match the collection is reported; unknown models are not checked."""
+    retriever = Retriever(FakeEmbeddings(), fake_db, COLLECTION)
+    assert asyncio.run(retriever.acheck("fake-embeddings")) is None
+    assert asyncio.run(fake_db.avector_size(COLLECTION)) == 64
+
+    problem = asyncio.run(retriever.acheck("text-embedding-3-small"))
+    assert "1536" in problem and retriever.error == problem
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+import httpx
+import openai
+from scheduler import BULK, INTERACTIVE, LLMScheduler, TokenBucket
+
+
+def rate_limit_error():
+    request = httpx.Request("POST", "https://api.openai.com/v1/completions")
+    response = httpx.Response(429, request=request, headers={"retry-after": "0"})
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+def test_interactive_jumps_ahead_of_bulk():
+    """Queued interactive calls get the next free slot before earlier bulk calls."""
+    scheduler = LLMScheduler(max_concurrency=1)
+    order = []
+
+    async def call(name):
+        order.append(name)
+        await asyncio.sleep(0.01)
+        return name
+
+    async def run():
+        first = asyncio.create_task(scheduler.run(call, "bulk-1", priority=BULK))
+        await asyncio.sleep(0)
+        rest = [
+            asyncio.create_task(scheduler.run(call, "bulk-2", priority=BULK)),
+            asyncio.create_task(scheduler.run(call, "interactive", priority=INTERACTIVE)),
+        ]
+        await asyncio.gather(first, *rest)
+
+    asyncio.run(run())
+    assert order == ["bulk-1", "interactive", "bulk-2"]
+    assert scheduler.in_flight == 0
+
+
+def test_rate_limit_shrinks_window_and_retries():
+    """A 429 halves the concurrency window and the call is retried."""
+    scheduler = LLMScheduler(max_concurrency=8, retries=2, base_delay=0)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise rate_limit_error()
+        return "ok"
+
+    assert asyncio.run(scheduler.run(flaky)) == "ok"
+    assert len(attempts) == 2
+    assert scheduler.rate_limited == 1
+    assert 4 <= scheduler.window < 5
+
+
+def test_token_bucket_waits_for_refill():
+    """Requests past the per-minute budget sleep until the bucket refills."""
+    bucket = TokenBucket(per_minute=600) # 10 per second
+
+    async def run():
+        start = time.monotonic()
+        await bucket.acquire(600)
+        await bucket.acquire(1)
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.09
@@ -0,0 +1,81 @@
+import asyncio
+
+from semantic_cache import SemanticCache
+
+VOCABULARY = ["mind", "behavior", "study", "scientific", "brain", "dream", "the", "of"]
+
+
+class WordCountEmbeddings:
+    """Deterministic stand-in for an embeddings model: counts vocabulary words."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def aembed_query(self, text):
+        self.calls += 1
+        words = text.split()
+        return [float(words.count(word)) for word in VOCABULARY]
+
+
+def evaluator():
+    calls = []
+
+    async def evaluate(answer):
+        calls.append(answer)
+        return ("Evaluation of " + answer, str(len(calls)))
+
+    return evaluate, calls
+
+
+def test_similar_answers_reuse_evaluation():
+    """A near-identical answer to the same question is a hit; a different one is not."""
+    cache = SemanticCache(WordCountEmbeddings(), threshold=0.9)
+    evaluate, calls = evaluator()
+
+    async def run():
+        first = await cache.aget_or_compute("q1", "the study of mind and behavior", evaluate, "a1")
+        similar = await cache.aget_or_compute("q1", "The study of the mind and behavior", evaluate, "a2")
+        different = await cache.aget_or_compute("q1", "dream brain", evaluate, "a3")
+        other_question = await cache.aget_or_compute("q2", "the study of mind and behavior", evaluate, "a4")
+        return first, similar, different, other_question
+
+    first, similar, different, other_question = asyncio.run(run())
+    assert similar == first
+    assert different != first
+    assert other_question != first
+    assert calls == ["a1", "a3", "a4"]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 3
+
+
+def test_exact_repeat_skips_embedding():
+    """Repeating an answer verbatim (ignoring case/whitespace) does not call the embeddings model."""
+    embeddings = WordCountEmbeddings()
+    cache = SemanticCache(embeddings)
+    evaluate, calls = evaluator()
+
+    async def run():
+        await cache.aget_or_compute("q1", "Scientific study", evaluate, "a1")
+        await cache.aget_or_compute("q1", "  scientific   STUDY ", evaluate, "a2")
+
+    asyncio.run(run())
+    assert embeddings.calls == 1
+    assert calls == ["a1"]
+
+
+def test_eviction_limits():
+    """Per-question and per-cache limits evict the least recently used entries."""
+    cache = SemanticCache(WordCountEmbeddings(), threshold=0.999, max_per_scope=2, max_scopes=2)
+    evaluate, calls = evaluator()
+
+    async def run():
+        for answer in ["mind", "brain", "dream"]:
+            await cache.aget_or_compute("q1", answer, evaluate, answer)
+        await cache.aget_or_compute("q2", "mind", evaluate, "q2")
+        await cache.aget_or_compute("q3", "mind", evaluate, "q3")
+
+    asyncio.run(run())
+    stats = cache.stats()
+    assert stats["scopes"] == 2
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 3
@@ -0,0 +1,13 @@
+import serve
+
+
+def test_default_workers(monkeypatch):
+    """One worker per available core unless WEB_CONCURRENCY or MAX_WORKERS says otherwise."""
+    monkeypatch.setattr(serve, "available_cores", lambda: 8)
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    monkeypatch.delenv("MAX_WORKERS", raising=False)
+    assert serve.default_workers() == 8
+    monkeypatch.setenv("MAX_WORKERS", "3")
+    assert serve.default_workers() == 3
+    monkeypatch.setenv("WEB_CONCURRENCY", "2")
+    assert serve.default_workers() == 2
@@ -0,0 +1,27 @@
+import asyncio
+import time
+
+from sessions import QuizSessions
+
+
+def test_identical_content_reuses_one_session(tmp_path):
+    """Repeat views of the same content share a quiz ID and write no new rows; different content gets its own."""
+    sessions = QuizSessions(ttl=60, path=str(tmp_path / "sessions.db"))
+    quiz_id = sessions.create("1.1", "Summary", ["Q1", "Q2"])
+    assert asyncio.run(sessions.acreate("1.1", "Summary", ["Q1", "Q2"])) == quiz_id
+    assert sessions.create("1.1", "Summary", ["Q2", "Q1"]) != quiz_id
+    assert len(sessions.store.disk) == 2
+    assert sessions.get(quiz_id)["questions"] == ["Q1", "Q2"]
+    sessions.close()
+
+
+def test_session_near_expiry_is_renewed(tmp_path, monkeypatch):
+    """A session past half its lifetime is written again, so a student starting now has the full TTL."""
+    sessions = QuizSessions(ttl=60, path=str(tmp_path / "sessions.db"))
+    quiz_id = sessions.create("1.1", "Summary", ["Q1"])
+    created = sessions.get(quiz_id)["created"]
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 40)
+    assert sessions.create("1.1", "Summary", ["Q1"]) == quiz_id
+    assert sessions.get(quiz_id)["created"] > created
+    sessions.close()
@@ -0,0 +1,107 @@
+import asyncio
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_task():
+    """Callers with the same key wait on one call and get the same result."""
+    flight = SingleFlight()
+    started = 0
+
+    async def work(value):
+        nonlocal started
+        started += 1
+        await asyncio.sleep(0.01)
+        return {"value": value}
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", work, 1) for _ in range(10)))
+
+    results = asyncio.run(run())
+    assert started == 1
+    assert all(result is results[0] for result in results)
+    assert (flight.calls, flight.shared) == (1, 9)
+    assert flight.in_flight() == 0
+
+
+def test_distinct_keys_run_separately():
+    """Different keys never share work."""
+    flight = SingleFlight()
+
+    async def work(value):
+        await asyncio.sleep(0)
+        return value
+
+    async def run():
+        return await asyncio.gather(flight.do("a", work, 1), flight.do("b", work, 2))
+
+    assert asyncio.run(run()) == [1, 2]
+    assert flight.calls == 2
+
+
+def test_errors_reach_every_caller_and_release_key():
+    """A failure is raised in all waiters and the next call starts fresh."""
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def ok():
+        return "ok"
+
+    async def run():
+        results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        return await flight.do("k", ok)
+
+    assert asyncio.run(run()) == "ok"
+
+
+def test_stream_is_fanned_out_to_every_caller():
+    """Concurrent streams of one key run the generator once; late callers are replayed what they missed."""
+    flight = SingleFlight()
+    started = 0
+
+    async def tokens():
+        nonlocal started
+        started += 1
+        for token in ("a", "b", "c"):
+            await asyncio.sleep(0.01)
+            yield token
+
+    async def collect(delay=0):
+        await asyncio.sleep(delay)
+        return [token async for token in flight.stream("k", tokens)]
+
+    async def run():
+        return await asyncio.gather(collect(), collect(), collect(delay=0.015))
+
+    assert asyncio.run(run()) == [["a", "b", "c"]] * 3
+    assert started == 1
+    assert (flight.calls, flight.shared) == (1, 2)
+    assert flight.in_flight() == 0
+
+
+def test_stream_errors_reach_every_caller_after_their_items():
+    """A failing stream delivers what it produced, then raises in every caller."""
+    flight = SingleFlight()
+
+    async def tokens():
+        yield "a"
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def collect():
+        received = []
+        try:
+            async for token in flight.stream("k", tokens):
+                received.append(token)
+        except ValueError:
+            return received
+        return None
+
+    async def run():
+        return await asyncio.gather(collect(), collect())
+
+    assert asyncio.run(run()) == [["a"], ["a"]]
@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+from cache import SQLiteCache
+from manifest import ContentManifest
+from question_bank import MULTIPLECHOICE, SHORTANSWER, QuestionBank, bank_key
+from sections import payload_key, section_key
+from sync import section_hash, sync
+
+
+class FakeDB:
+    def __init__(self):
+        self.sections = {
+            "1.1": [{"section": "1.1", "title": "1.1", "chapter": "Chapter 1", "text": "Text of 1.1"}],
+            "1.2": [{"section": "1.2", "title": "1.2", "chapter": "Chapter 1", "text": "Text of 1.2"}],
+        }
+
+    async def asection_payloads(self, collection_name):
+        return self.sections
+
+    async def aget_full_section(self, collection_name, section):
+        payload = self.sections[section][0]
+        return {"title": payload["title"], "chapter": payload["chapter"], "text": payload["text"]}
+
+
+class FakeTutor:
+    def __init__(self):
+        self.summaries = []
+
+    def fingerprint(self):
+        return "fingerprint"
+
+    async def asummarize_text(self, text):
+        self.summaries.append(text)
+        return "Summary: " + text
+
+    async def ashortanswer_questions(self, count, text, objective=""):
+        return [f"Question {i + 1}" for i in range(count)]
+
+    async def amultiplechoice_questions(self, count, text, objective=""):
+        return [[f"Question {i + 1}", "A", "B", "C", "D", "A"] for i in range(count)]
+
+
+@pytest.fixture
+def stores(tmp_path):
+    store = SQLiteCache(path=str(tmp_path / "cache.db"))
+    manifest = ContentManifest(path=store.path, refresh_interval=0)
+    bank = QuestionBank(path=str(tmp_path / "questions.db"))
+    yield store, manifest, bank
+    asyncio.run(bank.aclose())
+    manifest.close()
+    store.close()
+
+
+def test_section_hash_tracks_text_and_order():
+    """Hashes change with the text or chunk order, not with unrelated payload fields."""
+    first = {"section": "1.1", "text": "A", "chunk": 0}
+    second = {"section": "1.1", "text": "B", "chunk": 1}
+    assert section_hash([first, second]) == section_hash([{**first, "page": 3}, second])
+    assert section_hash([first, second]) != section_hash([second, first])
+    assert section_hash([first]) != section_hash([{**first, "text": "A."}])
+
+
+def test_first_sync_records_a_baseline(stores):
+    """The first run only records hashes; existing cache keys stay valid."""
+    store, manifest, bank = stores
+    store.set(section_key("Psychology2e", "1.1", "fingerprint"), {"summary": "S", "questions": []})
+    changes = asyncio.run(sync(FakeTutor(), FakeDB(), store, manifest, bank, "Psychology2e"))
+    assert changes == {"added": ["1.1", "1.2"], "changed": [], "removed": []}
+    assert manifest.revision("Psychology2e", "1.1") == 0
+    assert store.get(section_key("Psychology2e", "1.1", "fingerprint")) is not None
+
+
+def test_only_changed_sections_are_invalidated(stores):
+    """A changed section gets a new revision and loses its old content; others keep theirs."""
+    store, manifest, bank = stores
+    db = FakeDB()
+    asyncio.run(sync(FakeTutor(), db, store, manifest, bank, "Psychology2e"))
+    for section in ("1.1", "1.2"):
+        store.set(section_key("Psychology2e", section, "fingerprint"), {"summary": "S", "questions": []})
+        store.set(payload_key("Psychology2e", section), {"text": "old"})
+        bank.add(bank_key("Psychology2e", section, "fingerprint", SHORTANSWER), SHORTANSWER, [("", "Q?")])
+        bank.add(bank_key("Psychology2e", section, "fingerprint", MULTIPLECHOICE), MULTIPLECHOICE, [("", ["Q?", "A", "B"])])
+
+    db.sections["1.2"] = [{**db.sections["1.2"][0], "text": "Corrected text of 1.2"}]
+    assert asyncio.run(sync(FakeTutor(), db, store, manifest, bank, "Psychology2e", dry_run=True))["changed"] == ["1.2"]
+    assert manifest.revision("Psychology2e", "1.2") == 0
+
+    changes = asyncio.run(sync(FakeTutor(), db, store, manifest, bank, "Psychology2e"))
+    assert changes == {"added": [], "changed": ["1.2"], "removed": []}
+    assert manifest.revision("Psychology2e", "1.2") == 1
+    assert asyncio.run(manifest.arevision("Psychology2e", "1.2")) == 1
+    assert store.get(section_key("Psychology2e", "1.2", "fingerprint")) is None
+    assert store.get(payload_key("Psychology2e", "1.2")) is None
+    assert bank.size(bank_key("Psychology2e", "1.2", "fingerprint", SHORTANSWER)) == 0
+    assert bank.size(bank_key("Psychology2e", "1.2", "fingerprint", MULTIPLECHOICE)) == 0
+    assert store.get(section_key("Psychology2e", "1.1", "fingerprint")) is not None
+    assert bank.size(bank_key("Psychology2e", "1.1", "fingerprint", SHORTANSWER)) == 1
+
+    # Nothing changed since: nothing happens
+    assert asyncio.run(sync(FakeTutor(), db, store, manifest, bank, "Psychology2e")) == {"added": [], "changed": [], "removed": []}
+
+
+def test_regenerate_changed_and_removed_sections(stores):
+    """With regenerate, only changed sections are generated, under their new revision."""
+    store, manifest, bank = stores
+    db = FakeDB()
+    asyncio.run(sync(FakeTutor(), db, store, manifest, bank, "Psychology2e"))
+    db.sections["1.1"] = [{**db.sections["1.1"][0], "text": "New text of 1.1"}]
+    del db.sections["1.2"]
+
+    tutor = FakeTutor()
+    changes = asyncio.run(sync(tutor, db, store, manifest, bank, "Psychology2e", regenerate=True))
+    assert changes["changed"] == ["1.1"] and changes["removed"] == ["1.2"]
+    assert changes["regenerated"] == {"generated": 1, "skipped": 0, "failed": 0}
+    assert tutor.summaries == ["Section 1.1 of Chapter 1: New text of 1.1"]
+    stored = store.get(section_key("Psychology2e", "1.1", "fingerprint", revision=1))
+    assert stored["summary"] == "Summary: Section 1.1 of Chapter 1: New text of 1.1"
+
+    # A section that comes back is treated as changed again
+    db.sections["1.2"] = [{"section": "1.2", "title": "1.2", "chapter": "Chapter 1", "text": "Text of 1.2"}]
+    assert asyncio.run(sync(FakeTutor(), db, store, manifest, bank, "Psychology2e"))["changed"] == ["1.2"]
+    assert manifest.revision("Psychology2e", "1.2") == 2
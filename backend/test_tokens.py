@@ -0,0 +1,48 @@
+from tokens import count_tokens, split_by_tokens, truncate_to_tokens
+
+
+def test_count_tokens_grows_with_text():
+    """Longer text never counts as fewer tokens."""
+    assert count_tokens("") == 0
+    assert 0 < count_tokens("Psychology is the study of the mind.") < count_tokens("Psychology is the study of the mind. " * 10)
+
+
+def test_split_keeps_paragraphs_and_budget():
+    """Chunks stay within the budget and paragraphs are not cut when they fit."""
+    paragraphs = [f"Paragraph {i} about behavior and mental processes." for i in range(40)]
+    text = "\n\n".join(paragraphs)
+    chunks = split_by_tokens(text, 50)
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 50 for chunk in chunks)
+    assert "\n\n".join(chunks) == text
+
+
+def test_split_hard_cuts_oversized_paragraph():
+    """A single paragraph over budget is split rather than dropped."""
+    text = "word " * 500
+    chunks = split_by_tokens(text, 100)
+    assert len(chunks) > 1
+    assert "".join(chunks) == text
+
+
+def test_truncate_to_tokens():
+    assert count_tokens(truncate_to_tokens("word " * 500, 20)) <= 20
+    assert truncate_to_tokens("", 20) == ""
+
+
+def test_track_usage_counts_tasks_started_inside():
+    """Usage recorded in the block, including by tasks it starts, is tallied; outside it is ignored."""
+    import asyncio
+    from tokens import record_usage, track_usage
+
+    async def call():
+        record_usage(100, 20)
+
+    async def run():
+        with track_usage() as usage:
+            await asyncio.gather(call(), call())
+        record_usage(5, 5)
+        return usage
+
+    usage = asyncio.run(run())
+    assert (usage.prompt, usage.completion, usage.total) == (200, 40, 240)
@@ -1,21 +1,14 @@
+import asyncio
+
 import pytest
-from unittest.mock import MagicMock, patch
+from langchain_core.language_models.fake import FakeListLLM
 from tutorai import TutorAI
 
 
 @pytest.fixture
-def mock_openai():
-    """Fixture to mock OpenAI API."""
-    with patch("tutorai.OpenAI") as mock_openai_class:
-        mock_openai_instance = MagicMock()
-        mock_openai_class.return_value = mock_openai_instance
-        yield mock_openai_instance
-
-
-@pytest.fixture
-def tutor_ai(mock_openai):
-    """Fixture to initialize TutorAI with mocked OpenAI."""
-    return TutorAI(api_key="test_api_key")
+def tutor_ai(fake_llm):
+    """TutorAI backed by the deterministic fake LLM."""
+    return TutorAI(llm=fake_llm)
 
 
 def test_initialization(tutor_ai):
@@ -23,80 +16,183 @@ def test_initialization(tutor_ai):
     assert tutor_ai.rec_accuracy == 0.85
     assert tutor_ai.req_accuracy == 0.6
     assert tutor_ai.system_message.startswith("You are a kind and helpful tutor")
+    assert tutor_ai.model_params["model"] == "fake-llm"
+
+
+def test_fingerprint_tracks_prompts(fake_llm):
+    """The fingerprint changes with the prompts and not between identical tutors."""
+    assert TutorAI(llm=fake_llm).fingerprint() == TutorAI(llm=fake_llm).fingerprint()
+    assert TutorAI(llm=fake_llm).fingerprint() != TutorAI(llm=fake_llm, system_message="Be brief.").fingerprint()
+
 
+def test_fingerprint_ignores_uncached_chains(tutor_ai):
+    """Changing the free-form answer prompt leaves cached content valid."""
+    fingerprint = tutor_ai.fingerprint()
+    tutor_ai.templates["answer_question"] += " Be brief."
+    assert tutor_ai.fingerprint() == fingerprint
 
-def test_set_document_text(tutor_ai):
-    """Test the set_document_text method."""
-    new_text = "This is a new document."
-    tutor_ai.set_document_text(new_text)
-    assert tutor_ai.document_text == new_text
 
+def test_answer_question(tutor_ai):
+    """Free-form questions are answered from the given excerpts, sync and async alike."""
+    text = "[1.2 History of Psychology]\nWilhelm Wundt established the first psychological laboratory in Leipzig in 1879. It used introspection."
+    answer = tutor_ai.answer_question("Who opened the first lab?", text)
+    assert answer.startswith("According to the text: Wilhelm Wundt")
+    assert asyncio.run(tutor_ai.aanswer_question("Who opened the first lab?", text)) == answer
 
-def test_summarize_text(tutor_ai, mock_openai):
+
+def test_summarize_text(tutor_ai):
     """Test the summarize_text method."""
-    mock_openai.invoke.return_value = "Mocked Summary"
-    tutor_ai.summarization_chain = MagicMock()
-    tutor_ai.summarization_chain.invoke.return_value = "Mocked Summary"
+    summary = tutor_ai.summarize_text("Psychology is the scientific study of the mind.")
+    assert summary.startswith("Learning objectives:")
+    assert "Psychology" in summary
+    assert tutor_ai.summary == summary
 
-    summary = tutor_ai.summarize_text()
-    assert summary == "Mocked Summary"
-    tutor_ai.summarization_chain.invoke.assert_called_once_with({"text": tutor_ai.document_text})
 
+def test_empty_text_fallback(tutor_ai):
+    """Empty text is replaced by a placeholder instead of being sent as is."""
+    assert tutor_ai.summarize_text("")
 
-def test_shortanswer_questions(tutor_ai, mock_openai):
-    """Test the shortanswer_questions method."""
-    mock_openai.invoke.return_value = "Question 1\nQuestion 2\nQuestion 3"
-    tutor_ai.shortanswer_question_chain = MagicMock()
-    tutor_ai.shortanswer_question_chain.invoke.return_value = "Question 1\nQuestion 2\nQuestion 3"
 
-    questions = tutor_ai.shortanswer_questions(count=3)
-    assert questions == ["Question 1", "Question 2", "Question 3"]
-    tutor_ai.shortanswer_question_chain.invoke.assert_called_once_with(
-        {"count": 3, "text": tutor_ai.document_text}
-    )
+def test_shortanswer_questions(tutor_ai):
+    """Test the shortanswer_questions method."""
+    questions = tutor_ai.shortanswer_questions(3, text="Some text.")
+    assert len(questions) == 3
+    assert all(question.startswith("What does the text say about topic") for question in questions)
+    assert questions != tutor_ai.shortanswer_questions(3, text="Other text.")
 
 
-def test_multiplechoice_questions(tutor_ai, mock_openai):
+def test_multiplechoice_questions():
     """Test the multiplechoice_questions method."""
-    mock_openai.invoke.return_value = '{"question": "Mock question", "options": ["a", "b", "c"]}'
-    tutor_ai.multiplechoice_question_chain = MagicMock()
-    tutor_ai.multiplechoice_question_chain.invoke.return_value = (
-        '{"question": "Mock question", "options": ["a", "b", "c"]}'
-    )
+    tutor_ai = TutorAI(llm=FakeListLLM(responses=["Question 1: Mock question\nA) a\nB) b\nC) c\nD) d\nCorrect Answer: B"]))
+    questions = tutor_ai.multiplechoice_questions(1, text="Sample text")
+    assert questions == [["Mock question", "a", "b", "c", "d", "B"]]
 
-    questions = tutor_ai.multiplechoice_questions(count=1, text="Sample text")
-    assert questions == ['{"question": "Mock question", "options": ["a", "b", "c"]}']
-    tutor_ai.multiplechoice_question_chain.invoke.assert_called_once_with(
-        {"count": 1, "text": "Sample text"}
-    )
 
-
-def test_shortanswer_evaluate(tutor_ai, mock_openai):
+def test_shortanswer_evaluate():
     """Test the shortanswer_evaluate method."""
-    mock_openai.invoke.return_value = "Score: 9\nEvaluation: Great answer."
-    tutor_ai.shortanswer_evaluation_chain = MagicMock()
-    tutor_ai.shortanswer_evaluation_chain.invoke.return_value = "Score: 9\nEvaluation: Great answer."
-
-    evaluation, score = tutor_ai.shortanswer_evaluate(
-        question="What is AI?", answer="Artificial Intelligence."
-    )
+    tutor_ai = TutorAI(llm=FakeListLLM(responses=["Score: 9\nEvaluation: Great answer."]))
+    evaluation, score = tutor_ai.shortanswer_evaluate("What is AI?", "Artificial Intelligence.", text="AI is...")
     assert evaluation == "Great answer."
     assert score == "9"
-    tutor_ai.shortanswer_evaluation_chain.invoke.assert_called_once_with(
-        {"text": tutor_ai.document_text, "question": "What is AI?", "answer": "Artificial Intelligence."}
-    )
-
 
-def test_default_document_text(tutor_ai):
-    """Test that the default document text is set correctly."""
-    assert "psychological disorder" in tutor_ai.document_text
 
+def test_async_methods_match_sync(tutor_ai):
+    """The async methods give the same results as the sync ones."""
+    text = "Wundt opened the first psychology laboratory."
+    assert asyncio.run(tutor_ai.asummarize_text(text)) == tutor_ai.summarize_text(text)
+    assert asyncio.run(tutor_ai.ashortanswer_evaluate("Q?", "An answer.", text=text)) == tutor_ai.shortanswer_evaluate("Q?", "An answer.", text=text)
 
-def test_empty_text_fallback(tutor_ai, mock_openai):
-    """Test handling of empty text input in summarize_text."""
-    tutor_ai.summarization_chain = MagicMock()
-    tutor_ai.summarization_chain.invoke.return_value = "Fallback summary"
+    async def stream():
+        return "".join([chunk async for chunk in tutor_ai.astream_summary(text)])
 
-    result = tutor_ai.summarize_text(text="")
-    assert result == "Fallback summary"
-    tutor_ai.summarization_chain.invoke.assert_called_once_with({"text": tutor_ai.document_text})
+    assert asyncio.run(stream()) == tutor_ai.summarize_text(text)
+
+
+def test_structured_output_round_trip(tutor_ai):
+    """With structured output, the fake LLM answers in JSON and the parsers read it."""
+    questions = tutor_ai.multiplechoice_questions(2, text="Some text.")
+    assert len(questions) == 2 and all(len(question) == 6 for question in questions)
+    evaluation, score = tutor_ai.shortanswer_evaluate("Q?", "An answer.", text="Some text.")
+    assert evaluation.startswith("The answer covers") and score.isdigit()
+    assert TutorAI(llm=tutor_ai._TutorAI__llm, structured_output=False).fingerprint() != tutor_ai.fingerprint()
+
+
+def test_prompts_share_a_text_prefix(tutor_ai):
+    """Every prompt starts with the system message and the text, so calls about one text share a cacheable prefix."""
+    prefix = tutor_ai.templates["prefix"].format(text="A summary.")
+    inputs = {"text": "A summary.", "count": 5, "focus": "", "question": "Q?", "answer": "A."}
+    for name in ("summarization", "chunk_summarization", "shortanswer_question", "multiplechoice_question", "shortanswer_evaluation", "answer_question"):
+        assert tutor_ai.templates[name].format(**inputs).startswith(prefix)
+
+
+def test_cached_prompt_tokens_come_from_the_provider(tutor_ai):
+    """Cached prompt tokens are what a chat model reports; completion models never count any."""
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.messages import AIMessage
+    from metrics import LLM_TOKENS
+
+    text = "Psychology is the scientific study of the mind and behavior. " * 150
+    cached = LLM_TOKENS.labels(chain="answer_question_chain", kind="prompt_cached")
+    before = cached.value
+    tutor_ai.answer_question("Q1?", text)
+    tutor_ai.answer_question("Q2?", text)
+    assert cached.value == before
+
+    usage = {"input_tokens": 1600, "output_tokens": 20, "total_tokens": 1620, "input_token_details": {"cache_read": 1536}}
+    chat = GenericFakeChatModel(messages=iter([AIMessage(content="An answer.", usage_metadata=usage)]))
+    prompt = LLM_TOKENS.labels(chain="answer_question_chain", kind="prompt")
+    prompt_before = prompt.value
+    assert TutorAI(llm=chat).answer_question("Q1?", text) == "An answer."
+    assert cached.value == before + 1536
+    assert prompt.value == prompt_before + 1600
+
+
+def evaluation(score):
+    return '{"score": %d, "evaluation": "Fast evaluation."}' % score
+
+
+def test_fast_model_routing(fake_llm):
+    """Clear-cut fast-model grades are kept; borderline, unreadable and failed ones are redone by the main model."""
+    fast = FakeListLLM(responses=[evaluation(9), evaluation(6), "I think it is fine.", evaluation(2), evaluation(5)])
+    tutor = TutorAI(llm=fake_llm, fast_llm=fast)
+    assert tutor.shortanswer_evaluate("Q?", "A.", text="Text.") == ("Fast evaluation.", "9")
+    assert fake_llm.calls == 0
+
+    for _ in range(2):
+        evaluation_text, score = tutor.shortanswer_evaluate("Q?", "A.", text="Text.")
+        assert evaluation_text != "Fast evaluation."
+    assert fake_llm.calls == 2
+
+    results = asyncio.run(tutor.ashortanswer_evaluate_batch([("Q1?", "A1."), ("Q2?", "A2.")], text="Text."))
+    assert results[0] == ("Fast evaluation.", "2") and results[1][0] != "Fast evaluation."
+    assert fake_llm.calls == 3
+
+
+def test_fast_model_errors_escalate(fake_llm):
+    """If the fast model call fails, the main model answers instead."""
+    class BrokenLLM(FakeListLLM):
+        def _call(self, *args, **kwargs):
+            raise RuntimeError("model not found")
+
+    tutor = TutorAI(llm=fake_llm, fast_llm=BrokenLLM(responses=[""]))
+    assert tutor.shortanswer_evaluate("Q?", "A.", text="Text.")[0].startswith("The answer covers")
+    assert fake_llm.calls == 1
+
+
+def test_chain_params(fake_llm):
+    """Each chain has its own max_tokens; only the fast chains use the fast model."""
+    tutor = TutorAI(llm=fake_llm, fast_llm=FakeListLLM(responses=["According to the text: yes."]))
+    assert tutor.chain_params["summarization_chain"]["max_tokens"] == 1096
+    assert tutor.chain_params["shortanswer_evaluation_chain"]["max_tokens"] < 1096
+    assert tutor.chain_params["shortanswer_evaluation_chain"]["model"] == "fake-list"
+    assert tutor.chain_params["shortanswer_evaluation_escalation_chain"]["model"] == "fake-llm"
+    assert tutor.answer_question("Q?", "Text.") == "According to the text: yes."
+    assert tutor.fingerprint() == TutorAI(llm=fake_llm).fingerprint()
+
+
+def test_batch_through_scheduler_respects_max_concurrency(fake_llm):
+    """With a scheduler, a batch runs at most max_concurrency calls at once, below interactive priority."""
+    from scheduler import BATCH
+
+    class RecordingScheduler:
+        def __init__(self):
+            self.running = self.peak = 0
+            self.priorities = set()
+
+        async def run(self, fn, *args, priority, tokens=0):
+            self.priorities.add(priority)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            try:
+                await asyncio.sleep(0.01)
+                return await fn(*args)
+            finally:
+                self.running -= 1
+
+    scheduler = RecordingScheduler()
+    tutor = TutorAI(llm=fake_llm, scheduler=scheduler)
+    pairs = [(f"Q{i}?", f"A{i}.") for i in range(6)]
+    results = asyncio.run(tutor.ashortanswer_evaluate_batch(pairs, text="Text.", max_concurrency=2))
+    assert len(results) == 6
+    assert scheduler.peak == 2
+    assert scheduler.priorities == {BATCH}
@@ -0,0 +1,164 @@
+"""
+------------------------------------------------------------
+File: tokens.py
+Description:
+    Token counting and token-budgeted text splitting with
+    tiktoken, so prompts are sized by what the model actually
+    sees instead of by character counts.
+
+Author: TutorAI backend maintainers
+Date: October 2026
+Version: 1.0
+
+Usage:
+    if count_tokens(text) > 2500:
+        chunks = split_by_tokens(text, 2500)
+    with track_usage() as usage:
+        await my_tutor.ashortanswer_evaluate(question, answer, text=summary)
+    print(usage.total)  # Tokens of every LLM call made inside the block
+
+Future Updates:
+    None planned.
+------------------------------------------------------------
+"""
+import contextlib
+import contextvars
+import functools
+
+import tiktoken
+
+from logger import logger
+
+DEFAULT_MODEL = "gpt-3.5-turbo-instruct"
+CHARS_PER_TOKEN = 4 # Rough English average, used only if no tiktoken encoding can be loaded
+
+
+# The tally of the innermost track_usage() block, if any; tasks started inside the block share it
+_usage = contextvars.ContextVar("token_usage", default=None)
+
+
+class TokenUsage:
+    """
+    Description: Prompt and completion tokens used inside a track_usage() block.
+
+    Attributes:
+    ----------
+    prompt : int
+        Prompt tokens.
+    completion : int
+        Completion tokens.
+    """
+
+    def __init__(self):
+        self.prompt = 0
+        self.completion = 0
+
+    @property
+    def total(self):
+        return self.prompt + self.completion
+
+
+@contextlib.contextmanager
+def track_usage():
+    # Counts the tokens of LLM calls made in this context (including tasks it starts) until the block exits
+    usage = TokenUsage()
+    token = _usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage.reset(token)
+
+
+def record_usage(prompt, completion):
+    # Called once per LLM call; a no-op outside track_usage()
+    usage = _usage.get()
+    if usage is not None:
+        usage.prompt += prompt
+        usage.completion += completion
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(model=DEFAULT_MODEL):
+    """
+    Returns the tiktoken encoding for a model, or None if it cannot be loaded.
+    tiktoken downloads its BPE files on first use, so a machine without
+    network access falls back to character-based estimates.
+    """
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning("Could not load a tiktoken encoding for %s, estimating tokens from characters: %s", model, e)
+        return None
+
+
+@functools.lru_cache(maxsize=4096) # The same summary is counted for every question and evaluation call
+def count_tokens(text, model=DEFAULT_MODEL):
+    encoding = get_encoding(model)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def split_by_tokens(text, max_tokens, model=DEFAULT_MODEL):
+    """
+    Splits text into chunks of at most max_tokens tokens.
+
+    Paragraphs are kept whole and packed together while they fit; only a
+    paragraph that is over budget on its own is cut mid-paragraph.
+
+    Parameters:
+    ----------
+    text : str
+        Text to split.
+    max_tokens : int
+        Token budget per chunk.
+    model : str
+        Model whose tokenizer is used for counting.
+
+    Returns:
+    -------
+    list
+        List of str chunks, in order.
+
+    Raises:
+    ------
+    None
+
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for paragraph in text.split("\n\n"):
+        tokens = count_tokens(paragraph, model)
+        if tokens > max_tokens:
+            # Flush what we have, then hard-split the oversized paragraph
+            if current:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            chunks.extend(_hard_split(paragraph, max_tokens, model))
+            continue
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(paragraph)
+        current_tokens += tokens + 1 # +1 for the paragraph break
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def truncate_to_tokens(text, max_tokens, model=DEFAULT_MODEL):
+    return _hard_split(text, max_tokens, model)[0] if text else text
+
+
+def _hard_split(text, max_tokens, model):
+    encoding = get_encoding(model)
+    if encoding is None:
+        size = max_tokens * CHARS_PER_TOKEN
+        return [text[i:i + size] for i in range(0, len(text), size)]
+    ids = encoding.encode(text, disallowed_special=())
+    return [encoding.decode(ids[i:i + max_tokens]) for i in range(0, len(ids), max_tokens)]
+
@@ -1,8 +1,46 @@
-from langchain_openai import OpenAI # Creates an instance of OpenAI's language model ("It's a ChatGPT!")
+from langchain_openai import ChatOpenAI, OpenAI # Creates an instance of OpenAI's language model ("It's a ChatGPT!")
 from langchain_core.runnables.base import RunnableSequence # Used to chain together runnable components such as prompts and models, to let you invoke sequentially
 from langchain.prompts import PromptTemplate  # Allows you to create templates for prompts you send to the model
-import re
+import asyncio
+import contextlib
+import hashlib
+import json
+import time
 from logger import logger
+from metrics import LLM_TOKENS, MODEL_ROUTES, STAGE_SECONDS, timed
+from parsers import parse_multiplechoice_questions, parse_shortanswer_evaluation, parse_shortanswer_evaluation_result, parse_shortanswer_questions
+from scheduler import BATCH, BULK, INTERACTIVE
+from tokens import count_tokens, record_usage, split_by_tokens, truncate_to_tokens
+
+UNCACHED_TEMPLATES = ("answer_question",) # Chains whose answers are never cached; left out of fingerprint()
+CHAIN_MAX_TOKENS = { # Most completion tokens per chain; evaluations and answers are a score and a few sentences
+    "summarization": 1096,
+    "chunk_summarization": 1096,
+    "shortanswer_question": 1096,
+    "multiplechoice_question": 1096,
+    "shortanswer_evaluation": 256,
+    "answer_question": 512,
+}
+FAST_CHAINS = ("shortanswer_evaluation", "answer_question") # Sent to the fast model when there is one
+CONTENT_CHAINS = ("summarization", "chunk_summarization", "shortanswer_question", "multiplechoice_question") # Their output is cached
+
+def letters_to_number(s):
+    """
+    Convert a letter sequence (A = 1, B = 2, ..., Z = 26, AA = 27, etc.) back to its corresponding number.
+
+    Args:
+        s (str): The letter sequence.
+
+    Returns:
+        int: The corresponding number.
+    """
+    s = s.upper()  # Ensure the input is in uppercase
+    n = 0
+
+    for char in s:
+        n = n * 26 + (ord(char) - 65 + 1)
+
+    return n
 
 class TutorAI:
     """
@@ -20,6 +58,30 @@ class TutorAI:
         Required accuracy for answers and responses.
     system_message : str
         Startup message at the beginning of given prompts. 
+    summary_token_budget : int
+        Largest input (in tokens) summarized in one call. Longer text is
+        summarized in parallel chunks first, then the chunk summaries are summarized.
+    max_concurrency : int
+        Upper bound on parallel LLM calls made by a single method call.
+    http_client, http_async_client : httpx.Client, httpx.AsyncClient
+        Optional shared HTTP clients for the OpenAI connection pool.
+    scheduler : LLMScheduler
+        Optional shared scheduler (rate limits, priorities, retries) for the async methods.
+    llm : BaseLLM
+        Optional LangChain LLM used instead of OpenAI (e.g. fakes.FakeLLM for tests and benchmarks).
+    fast_model : str
+        Optional smaller, faster OpenAI model for FAST_CHAINS (e.g. "gpt-4o-mini"). Short-answer
+        evaluations it returns are redone by the main model when they are borderline or unreadable.
+    fast_llm : BaseLLM
+        Optional LangChain LLM used as the fast model instead of fast_model.
+    escalation_margin : float
+        Fast-model scores within this distance below (or less than this above) the pass mark
+        (req_accuracy * 10) are re-evaluated by the main model.
+    chain_params : dict
+        Model, temperature and max_tokens used by each chain.
+    structured_output : bool
+        Ask for JSON (validated by parsers.py) from the multiple-choice and evaluation
+        chains instead of free text. Free-text answers are still parsed either way.
 
     Methods:
     -------
@@ -31,16 +93,41 @@ class TutorAI:
         Creates multiple-choice questions about the text inputted.
     shortanswer_evaluate()
         Evaluates short answer question and answer pairs.
+    astream_summary()
+        Streams the summary chunk by chunk as the LLM produces it.
+    shortanswer_evaluate_batch()
+        Evaluates several question and answer pairs about the same text at once.
+    asummarize_text(), ashortanswer_questions(), amultiplechoice_questions(), ashortanswer_evaluate(), ashortanswer_evaluate_batch()
+        Async versions of the above, for use inside the API's event loop.
+    fingerprint()
+        Hash of the prompts and model settings, for caching generated content.
     """
     
-    def __init__(self, openai_api_key="", temp=0.5, rec_accuracy=0.85, req_accuracy=0.6, system_message="You are a kind and helpful tutor teaching me, a student."):
+    def __init__(self, openai_api_key="", temp=0.5, rec_accuracy=0.85, req_accuracy=0.6, system_message="You are a kind and helpful tutor teaching me, a student.", summary_token_budget=2500, max_concurrency=5, http_client=None, http_async_client=None, scheduler=None, llm=None, structured_output=True, fast_model=None, fast_llm=None, escalation_margin=1):
         # Initialize OpenAI's model with desired temperature, which defines the randomness of the output. Higher = more random!
-        self.__llm = OpenAI(temperature=temp, api_key=openai_api_key, max_tokens=1096)
+        # Shared httpx clients (see clients.py) let every TutorAI reuse one pool of keep-alive connections.
+        # With a scheduler, retries are left to it instead of the OpenAI client.
+        if llm is None:
+            llm = OpenAI(temperature=temp, api_key=openai_api_key, max_tokens=1096, http_client=http_client, http_async_client=http_async_client, max_retries=0 if scheduler else 2)
+            if fast_model and fast_llm is None:
+                # Current small models are chat models; older ones (e.g. *-instruct) use the completions endpoint
+                fast_class = OpenAI if "instruct" in fast_model else ChatOpenAI
+                fast_llm = fast_class(model=fast_model, temperature=temp, api_key=openai_api_key, http_client=http_client, http_async_client=http_async_client, max_retries=0 if scheduler else 2)
+        self.__llm = llm
+        self.__fast_llm = fast_llm
+        self.model_params = {"model": self._model_name(llm), "temperature": temp, "max_tokens": 1096}
+        self.escalation_margin = escalation_margin
+        self.chain_params = {}
+        self._chain_templates = {} # chain name -> name of its template in self.templates
 
         # Initalizes some base variables
         self.rec_accuracy = rec_accuracy
         self.req_accuracy = req_accuracy
         self.system_message = system_message
+        self.summary_token_budget = summary_token_budget
+        self.max_concurrency = max_concurrency
+        self.scheduler = scheduler
+        self.structured_output = structured_output
 
         # Initalize prompts
         self.__prompt_init()
@@ -62,25 +149,90 @@ class TutorAI:
         None
 
         """
+        self.templates = {}
+
+        # Every prompt starts with the same prefix (system message, then the text) and puts its own
+        # instructions after it. Calls about the same text then share a prefix the provider can cache,
+        # e.g. the question and evaluation calls for one summary.
+        prefix = self.system_message + " Use the following text:\n\n{text}\n\n"
+        self.templates["prefix"] = prefix
+
         # Summarization
-        sum_template = self.system_message + " Give a list of learning objectives, then an extensive summary about the following text. Be thorough, and make sure you don't leave out details. Text:\n\n{text}\n\nSummary:"
+        sum_template = prefix + "Give a list of learning objectives, then an extensive summary about the text. Be thorough, and make sure you don't leave out details.\n\nSummary:"
+        self.templates["summarization"] = sum_template
         sum_prompt = PromptTemplate(input_variables=["text"], template=sum_template)
-        self.summarization_chain = RunnableSequence(sum_prompt | self.__llm) # Set up the summarization chain
+        self.summarization_chain = self._build_chain("summarization", sum_prompt) # Set up the summarization chain
+
+        # Chunk Summarization (map step for text over the summary token budget)
+        chunk_sum_template = prefix + "The text is one part of a longer textbook section. Summarize this part thoroughly, keeping every key term, definition, study and example, since the summaries of all parts will be combined later.\n\nSummary of this part:"
+        self.templates["chunk_summarization"] = chunk_sum_template
+        chunk_sum_prompt = PromptTemplate(input_variables=["text"], template=chunk_sum_template)
+        self.chunk_summarization_chain = self._build_chain("chunk_summarization", chunk_sum_prompt)
 
-        # Short-Answer Questions
-        shortanswer_question_template = self.system_message + " You are tasked with asking students {count} questions about the content within the following text. Please make sure you address each learning objective.:\n\n{text}\n\nQuestions should be seperated by a new line. Questions:"
-        shortanswer_question_prompt = PromptTemplate(input_variables=["text"], template=shortanswer_question_template)
-        self.shortanswer_question_chain = RunnableSequence(shortanswer_question_prompt | self.__llm)
+        # Short-Answer Questions. {focus} optionally narrows the questions to one learning objective.
+        shortanswer_question_template = prefix + "You are tasked with asking students {count} questions about the content within the text. Please make sure you address each learning objective.{focus} Questions should be seperated by a new line.\n\nQuestions:"
+        self.templates["shortanswer_question"] = shortanswer_question_template
+        shortanswer_question_prompt = PromptTemplate(input_variables=["text", "count", "focus"], template=shortanswer_question_template)
+        self.shortanswer_question_chain = self._build_chain("shortanswer_question", shortanswer_question_prompt)
 
         # Multiple-Choice Questions
-        multiplechoice_question_template = self.system_message + " Create {count} multiple-choice questions about the text. The format should be as follows: \"Question 1: <Insert Question>\"\"A) <Answer A>\"\"B) <Answer B>\"\"C) <Answer C>\"\"D) <Answer D>\"\"Correct Answer: <Letter of correct answer> Text:\n\n{text}\n\n"
-        multiplechoice_question_prompt = PromptTemplate(input_variables=["text"], template=multiplechoice_question_template)
-        self.multiplechoice_question_chain = RunnableSequence(multiplechoice_question_prompt | self.__llm)
+        if self.structured_output:
+            multiplechoice_question_template = prefix + "Create {count} multiple-choice questions about the text, each with four options and one correct answer.{focus} Respond only with a JSON list in this format: [{{\"question\": \"<Insert Question>\", \"options\": [\"<Answer A>\", \"<Answer B>\", \"<Answer C>\", \"<Answer D>\"], \"answer\": \"<Letter of correct answer>\"}}]\n\nJSON:"
+        else:
+            multiplechoice_question_template = prefix + "Create {count} multiple-choice questions about the text.{focus} The format should be as follows: \"Question 1: <Insert Question>\"\"A) <Answer A>\"\"B) <Answer B>\"\"C) <Answer C>\"\"D) <Answer D>\"\"Correct Answer: <Letter of correct answer>\n\n"
+        self.templates["multiplechoice_question"] = multiplechoice_question_template
+        multiplechoice_question_prompt = PromptTemplate(input_variables=["text", "count", "focus"], template=multiplechoice_question_template)
+        self.multiplechoice_question_chain = self._build_chain("multiplechoice_question", multiplechoice_question_prompt)
 
-        # Short-Answer Evaluation
-        shortanswer_evaluation_template = self.system_message + " Use the following text:\n\n{text}\n\nTo evaluate the following question and answer, directing the evaluation me, your student. Please evaluate the answer based on the text with a score of 1-10 and a short explanation for your score, quoting the text if necessary. Question:\n\n{question}\n\n Student's answer:\n\n{answer}\n\n The template should look like this: Score:\nEvaluation:"
+        # Short-Answer Evaluation. The question and answer change with every call, so they go last.
+        shortanswer_evaluation_template = prefix + "Evaluate the following question and answer, directing the evaluation to me, your student. Please evaluate the answer based on the text with a score of 1-10 and a short explanation for your score, quoting the text if necessary. Question:\n\n{question}\n\n Student's answer:\n\n{answer}\n\n"
+        if self.structured_output:
+            shortanswer_evaluation_template += " Respond only with JSON in this format: {{\"score\": <1-10>, \"evaluation\": \"<Explanation>\"}}\n\nJSON:"
+        else:
+            shortanswer_evaluation_template += " The template should look like this: Score:\nEvaluation:"
+        self.templates["shortanswer_evaluation"] = shortanswer_evaluation_template
         shortanswer_evaluation_prompt = PromptTemplate(input_variables=["text", "question", "answer"], template=shortanswer_evaluation_template)
-        self.shortanswer_evaluation_chain = RunnableSequence(shortanswer_evaluation_prompt | self.__llm)
+        self.shortanswer_evaluation_chain = self._build_chain("shortanswer_evaluation", shortanswer_evaluation_prompt)
+        # With a fast model, evaluations it is unsure about are redone by the main model
+        self.shortanswer_evaluation_escalation_chain = self._build_chain("shortanswer_evaluation", shortanswer_evaluation_prompt, escalation=True) if self.__fast_llm is not None else None
+
+        # Free-form Questions. The text is the few textbook chunks retrieved for the question (see retrieval.py).
+        answer_question_template = prefix + "The text is made up of excerpts from my textbook chosen for my question. Answer my question using only this text, and tell me if the text does not answer it. Question:\n\n{question}\n\nAnswer:"
+        self.templates["answer_question"] = answer_question_template
+        answer_question_prompt = PromptTemplate(input_variables=["text", "question"], template=answer_question_template)
+        self.answer_question_chain = self._build_chain("answer_question", answer_question_prompt)
+
+    def fingerprint(self):
+        """
+        Hashes the prompt templates and model settings. Anything generated
+        with the same fingerprint can be served from a cache.
+
+        Parameters:
+        ----------
+        None
+
+        Returns:
+        -------
+        str
+            Hex digest of the templates and model parameters.
+
+        Raises:
+        ------
+        None
+
+        """
+        # Only templates whose output is cached count, so adding an uncached chain keeps existing caches valid.
+        # Likewise, per-chain settings only count for chains generating cached content, where they differ from the main model's.
+        templates = {name: template for name, template in self.templates.items() if name not in UNCACHED_TEMPLATES}
+        fingerprinted = {"templates": templates, "model": self.model_params, "summary_token_budget": self.summary_token_budget}
+        chains = {
+            chain_name: params for chain_name, params in self.chain_params.items()
+            if self._chain_templates[chain_name] in CONTENT_CHAINS and params != self.model_params
+        }
+        if chains:
+            fingerprinted["chains"] = chains
+        raw = json.dumps(fingerprinted, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
 
     def summarize_text(self, text):
         """
@@ -101,22 +253,82 @@ class TutorAI:
         None:
 
         """
-        if not text: 
-            # Gives error text (Prevents program crash)
-            text = "ERROR" 
-            logger.error("No text provided for shortanswer evaluation.")
+        text = self._require_text(text)
         
-        logger.debug(f"Sending summarization request: {text[:1000]}")
+        logger.debug("Sending summarization request: %.1000s", text)
+
+        # Long sections are condensed chunk by chunk instead of being cut off
+        if count_tokens(text) > self.summary_token_budget:
+            text = self._map_summaries(text)
         
         # Retrieve the summary
-        summary = self.summarization_chain.invoke({"text": text[:3000]})
+        summary = self._invoke("summarization_chain", {"text": text})
         self.summary = summary # Caches the summary
         
-        logger.debug(f"Summary recieved: {summary[:1000]}")
+        logger.debug("Summary recieved: %.1000s", summary)
         
         return summary
+
+    async def asummarize_text(self, text):
+        """
+        Async version of summarize_text(). Awaits the LLM without blocking the event loop.
+        """
+        text = self._require_text(text)
+
+        logger.debug("Sending summarization request: %.1000s", text)
+
+        if count_tokens(text) > self.summary_token_budget:
+            text = await self._amap_summaries(text)
+
+        summary = await self._ainvoke("summarization_chain", {"text": text}, BULK)
+        self.summary = summary # Caches the summary
+
+        logger.debug("Summary recieved: %.1000s", summary)
+
+        return summary
+
+    async def astream_summary(self, text):
+        """
+        Streams a summary of the text as it is generated.
+    
+        Parameters:
+        ----------
+        text : str
+            Text to be summarized. 
+    
+        Returns:
+        -------
+        async generator
+            Yields str chunks of the summary. Joined together they equal summarize_text()'s output.
+    
+        Raises:
+        ------
+        None
+
+        """
+        text = self._require_text(text)
+
+        logger.debug("Sending streaming summarization request: %.1000s", text)
+
+        # Only the final (reduce) step is streamed; chunk summaries have to finish first
+        if count_tokens(text) > self.summary_token_budget:
+            text = await self._amap_summaries(text)
+
+        output = None
+        inputs = {"text": text}
+        slot = self.scheduler.slot(BULK, self._estimate_tokens("summarization_chain", inputs)) if self.scheduler else contextlib.nullcontext()
+        with STAGE_SECONDS.labels(stage="summarization_chain_stream").time():
+            async with slot:
+                started = time.perf_counter()
+                async for chunk in self.summarization_chain.astream(inputs):
+                    if output is None:
+                        STAGE_SECONDS.labels(stage="summarization_chain_first_token").observe(time.perf_counter() - started)
+                    # Chat model chunks add up to one message (with the usage, if reported); text chunks to the text
+                    output = chunk if output is None else output + chunk
+                    yield self._text(chunk)
+        self.summary = self._record_tokens("summarization_chain", inputs, output if output is not None else "") # Caches the summary
     
-    def shortanswer_questions(self, count, text):
+    def shortanswer_questions(self, count, text, objective=""):
         """
         Creates <count> short answer questions about the provided text.
     
@@ -126,6 +338,8 @@ class TutorAI:
             How many questions to generate.
         text : str
             The text to create questions from. 
+        objective : str
+            Optional learning objective the questions should focus on.
     
         Returns:
         -------
@@ -137,65 +351,46 @@ class TutorAI:
         None
             
         """
-        if not text: 
-            # Gives error text (Prevents program crash)
-            text = "ERROR" 
-            logger.error("No text provided for shortanswer evaluation.")
+        text = self._require_text(text)
+
+        logger.debug("Sending shortanswer request for %s questions: %.1000s", count, text)
+        questions = self._invoke("shortanswer_question_chain", {"count": count, "text": text, "focus": self._focus(objective)}) # Get the set of questions
+        logger.debug("Recieved questions: %.1000s", questions)
+
+        return self._parse_shortanswer_questions(questions)
+
+    async def ashortanswer_questions(self, count, text, objective=""):
+        """
+        Async version of shortanswer_questions().
+        """
+        text = self._require_text(text)
 
-        logger.debug(f"Sending shortanswer request for {count} questions: {text[:1000]}")
-        questions = self.shortanswer_question_chain.invoke({"count": count, "text": text}) # Get the set of questions
-        question_set = questions.strip().strip('\n').split('\n') # Split the questions into a list
-        logger.debug(f"Recieved questions: {questions[:1000]}")
-        if '' in question_set:
-            question_set.remove('')
-        for i in range(len(question_set)):
-            question_set[i] = re.sub(r'^\d+\.\s*', '', question_set[i])
+        logger.debug("Sending shortanswer request for %s questions: %.1000s", count, text)
+        questions = await self._ainvoke("shortanswer_question_chain", {"count": count, "text": text, "focus": self._focus(objective)}, BULK)
+        logger.debug("Recieved questions: %.1000s", questions)
 
-        return question_set
+        return self._parse_shortanswer_questions(questions)
     
-    def multiplechoice_questions(self, count, text):
+    def multiplechoice_questions(self, count, text, objective=""):
         # Set up the document text as default
-        if not text: 
-            # Gives error text (Prevents program crash)
-            text = "ERROR" 
-            logger.error("No text provided for shortanswer evaluation.")
+        text = self._require_text(text)
 
         # Invoke the question chain
-        questions = self.multiplechoice_question_chain.invoke({"count": count, "text": text})
+        questions = self._invoke("multiplechoice_question_chain", {"count": count, "text": text, "focus": self._focus(objective)})
         
-        # Split the return value by question
-        question_set = questions.replace('\n', '').split('Question')
-        question_set = [x for x in question_set if x != ''] # Clean the list
+        return self._parse_multiplechoice_questions(questions)
 
-        # Create a regex string
-        pattern = r"A\) |B\) |C\) |D\) |Correct Answer: "
+    async def amultiplechoice_questions(self, count, text, objective=""):
+        """
+        Async version of multiplechoice_questions().
+        """
+        text = self._require_text(text)
 
-        # Split each question into question and answer segments
-        for idx, question in enumerate(question_set):
-            question_set[idx] = re.split(pattern, question.strip())
+        questions = await self._ainvoke("multiplechoice_question_chain", {"count": count, "text": text, "focus": self._focus(objective)}, BULK)
 
-        return question_set
+        return self._parse_multiplechoice_questions(questions)
     
     def multiplechoice_evaluate(self, question, answer):
-
-        def letters_to_number(s):
-            """
-            Convert a letter sequence (A = 1, B = 2, ..., Z = 26, AA = 27, etc.) back to its corresponding number.
-
-            Args:
-                s (str): The letter sequence.
-
-            Returns:
-                int: The corresponding number.
-            """
-            s = s.upper()  # Ensure the input is in uppercase
-            n = 0
-
-            for char in s:
-                n = n * 26 + (ord(char) - 65 + 1)
-
-            return n
-        
         if answer == letters_to_number(question[-1]) or letters_to_number(answer) == letters_to_number(question[-1]):
             return True
         else:
@@ -224,27 +419,286 @@ class TutorAI:
         None
             
         """
+        text = self._require_text(text)
+        inputs = {"text": text, "question": question, "answer": answer}
+
+        # Have the llm evaluate: the fast model first when there is one, the main model if it is unsure
+        if self.shortanswer_evaluation_escalation_chain is not None:
+            try:
+                routed = self._route_evaluation(self._invoke("shortanswer_evaluation_chain", inputs))
+            except Exception as e:
+                routed = self._escalate(e)
+            if routed is not None:
+                return routed
+            return self._parse_shortanswer_evaluation(self._invoke("shortanswer_evaluation_escalation_chain", inputs))
+
+        evaluation = self._invoke("shortanswer_evaluation_chain", inputs)
+
+        return self._parse_shortanswer_evaluation(evaluation)
+
+    async def ashortanswer_evaluate(self, question, answer, text):
+        """
+        Async version of shortanswer_evaluate().
+        """
+        text = self._require_text(text)
+        inputs = {"text": text, "question": question, "answer": answer}
+
+        if self.shortanswer_evaluation_escalation_chain is not None:
+            try:
+                routed = self._route_evaluation(await self._ainvoke("shortanswer_evaluation_chain", inputs, INTERACTIVE))
+            except Exception as e:
+                routed = self._escalate(e)
+            if routed is not None:
+                return routed
+            return self._parse_shortanswer_evaluation(await self._ainvoke("shortanswer_evaluation_escalation_chain", inputs, INTERACTIVE))
+
+        evaluation = await self._ainvoke("shortanswer_evaluation_chain", inputs, INTERACTIVE)
+
+        return self._parse_shortanswer_evaluation(evaluation)
+
+    def shortanswer_evaluate_batch(self, pairs, text, max_concurrency=5):
+        """
+        Evaluates several short-answer question and answer pairs against the same text.
+        The pairs are sent through the evaluation chain's batch(), at most
+        <max_concurrency> at a time.
+    
+        Parameters:
+        ----------
+        pairs : list
+            List of (question, answer) tuples.
+        text : str 
+            The document that is being evaluated against.
+        max_concurrency : int
+            Upper bound on LLM calls in flight at once.
+    
+        Returns:
+        -------
+        list
+            List of (evaluation, score) tuples, in the same order as pairs.
+    
+        Raises:
+        ------
+        None
+            
+        """
+        text = self._require_text(text)
+
+        inputs = [{"text": text, "question": question, "answer": answer} for question, answer in pairs]
+        if self.shortanswer_evaluation_escalation_chain is not None:
+            try:
+                routed = [self._route_evaluation(evaluation) for evaluation in self._batch("shortanswer_evaluation_chain", inputs, max_concurrency)]
+            except Exception as e:
+                routed = [self._escalate(e) for _ in inputs]
+            redo = [i for i, result in enumerate(routed) if result is None]
+            if redo:
+                for i, evaluation in zip(redo, self._batch("shortanswer_evaluation_escalation_chain", [inputs[i] for i in redo], max_concurrency)):
+                    routed[i] = self._parse_shortanswer_evaluation(evaluation)
+            return routed
+
+        evaluations = self._batch("shortanswer_evaluation_chain", inputs, max_concurrency)
+
+        return [self._parse_shortanswer_evaluation(evaluation) for evaluation in evaluations]
+
+    async def ashortanswer_evaluate_batch(self, pairs, text, max_concurrency=5):
+        """
+        Async version of shortanswer_evaluate_batch().
+        """
+        text = self._require_text(text)
+
+        inputs = [{"text": text, "question": question, "answer": answer} for question, answer in pairs]
+        if self.shortanswer_evaluation_escalation_chain is not None:
+            try:
+                routed = [self._route_evaluation(evaluation) for evaluation in await self._abatch("shortanswer_evaluation_chain", inputs, BATCH, max_concurrency)]
+            except Exception as e:
+                routed = [self._escalate(e) for _ in inputs]
+            redo = [i for i, result in enumerate(routed) if result is None]
+            if redo:
+                for i, evaluation in zip(redo, await self._abatch("shortanswer_evaluation_escalation_chain", [inputs[i] for i in redo], BATCH, max_concurrency)):
+                    routed[i] = self._parse_shortanswer_evaluation(evaluation)
+            return routed
+
+        evaluations = await self._abatch("shortanswer_evaluation_chain", inputs, BATCH, max_concurrency)
+
+        return [self._parse_shortanswer_evaluation(evaluation) for evaluation in evaluations]
+
+    def answer_question(self, question, text):
+        """
+        Answers a student's free-form question from retrieved textbook excerpts.
+    
+        Parameters:
+        ----------
+        question : str
+            The student's question.
+        text : str 
+            Excerpts relevant to the question (retrieval.format_context()).
+    
+        Returns:
+        -------
+        str
+            The answer.
+    
+        Raises:
+        ------
+        None
+            
+        """
+        text = self._require_text(text)
+
+        answer = self._invoke("answer_question_chain", {"text": text, "question": question})
+
+        return answer.strip()
+
+    async def aanswer_question(self, question, text):
+        """
+        Async version of answer_question().
+        """
+        text = self._require_text(text)
+
+        answer = await self._ainvoke("answer_question_chain", {"text": text, "question": question}, INTERACTIVE)
+
+        return answer.strip()
+
+    def _build_chain(self, name, prompt, escalation=False):
+        # prompt | model for the chain (fast or main) with the chain's max_tokens.
+        # The model's raw output is kept so _record_tokens() can read the usage a chat model reports.
+        llm = self.__fast_llm if self.__fast_llm is not None and name in FAST_CHAINS and not escalation else self.__llm
+        chain_name = name + ("_escalation_chain" if escalation else "_chain")
+        self.chain_params[chain_name] = {"model": self._model_name(llm), "temperature": self.model_params["temperature"], "max_tokens": CHAIN_MAX_TOKENS[name]}
+        self._chain_templates[chain_name] = name
+        return RunnableSequence(prompt | llm.bind(max_tokens=CHAIN_MAX_TOKENS[name]))
+
+    @staticmethod
+    def _text(output):
+        # Chat models return messages, completion models plain text
+        return output.content if hasattr(output, "content") else output
+
+    @staticmethod
+    def _model_name(llm):
+        return getattr(llm, "model_name", None) or llm._llm_type
+
+    def _route_evaluation(self, evaluation):
+        # The fast model's parsed evaluation, or None if the main model should redo it:
+        # when the answer was unreadable (or not the JSON asked for), or the score is close to the pass mark
+        evaluation, score, result = parse_shortanswer_evaluation_result(evaluation)
+        pass_mark = self.req_accuracy * 10
+        unreadable = result == "failed" or (self.structured_output and result != "json")
+        borderline = pass_mark - self.escalation_margin <= int(score) < pass_mark + self.escalation_margin
+        if unreadable or borderline:
+            MODEL_ROUTES.labels(chain="shortanswer_evaluation", route="unreadable" if unreadable else "borderline").inc()
+            return None
+        MODEL_ROUTES.labels(chain="shortanswer_evaluation", route="fast").inc()
+        return evaluation, score
+
+    def _escalate(self, error):
+        # The fast model failed outright: log it and let the main model answer
+        logger.warning("Fast model evaluation failed, using the main model: %s", error)
+        MODEL_ROUTES.labels(chain="shortanswer_evaluation", route="error").inc()
+        return None
+
+    def _invoke(self, chain_name, inputs):
+        with STAGE_SECONDS.labels(stage=chain_name).time():
+            output = getattr(self, chain_name).invoke(inputs)
+        return self._record_tokens(chain_name, inputs, output)
+
+    def _batch(self, chain_name, inputs, max_concurrency):
+        with STAGE_SECONDS.labels(stage=chain_name + "_batch").time():
+            outputs = getattr(self, chain_name).batch(inputs, config={"max_concurrency": max_concurrency})
+        return [self._record_tokens(chain_name, item, output) for item, output in zip(inputs, outputs)]
+
+    async def _ainvoke(self, chain_name, inputs, priority):
+        # Runs a chain through the shared scheduler when there is one
+        chain = getattr(self, chain_name)
+        with STAGE_SECONDS.labels(stage=chain_name).time():
+            if self.scheduler is None:
+                output = await chain.ainvoke(inputs)
+            else:
+                output = await self.scheduler.run(chain.ainvoke, inputs, priority=priority, tokens=self._estimate_tokens(chain_name, inputs))
+        return self._record_tokens(chain_name, inputs, output)
+
+    async def _abatch(self, chain_name, inputs, priority, max_concurrency):
+        if self.scheduler is not None:
+            # The scheduler bounds concurrency across every request; max_concurrency still caps this one batch
+            semaphore = asyncio.Semaphore(max_concurrency)
+
+            async def run(item):
+                async with semaphore:
+                    return await self._ainvoke(chain_name, item, priority)
+
+            return await asyncio.gather(*(run(item) for item in inputs))
+        with STAGE_SECONDS.labels(stage=chain_name + "_batch").time():
+            outputs = await getattr(self, chain_name).abatch(inputs, config={"max_concurrency": max_concurrency})
+        return [self._record_tokens(chain_name, item, output) for item, output in zip(inputs, outputs)]
+
+    def _record_tokens(self, chain_name, inputs, output):
+        # Records a call's tokens and returns its text. Chat models (e.g. gpt-4o-mini) report their usage,
+        # including prompt tokens served from OpenAI's prompt cache. Completion models report nothing usable
+        # here and the legacy completions endpoint has no prompt caching, so their counts are estimated and none are cached.
+        text = self._text(output)
+        usage = getattr(output, "usage_metadata", None)
+        if usage:
+            prompt = usage.get("input_tokens", 0)
+            completion = usage.get("output_tokens", 0)
+            cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+        else:
+            prompt = self._estimate_tokens(chain_name, inputs) - self.chain_params[chain_name]["max_tokens"]
+            completion = count_tokens(text)
+            cached = 0
+        LLM_TOKENS.labels(chain=chain_name, kind="prompt").inc(prompt)
+        LLM_TOKENS.labels(chain=chain_name, kind="prompt_cached").inc(cached)
+        LLM_TOKENS.labels(chain=chain_name, kind="prompt_uncached").inc(prompt - cached)
+        LLM_TOKENS.labels(chain=chain_name, kind="completion").inc(completion)
+        record_usage(prompt, completion)
+        logger.debug("%s: %d prompt tokens (%d cached, %d uncached), %d completion tokens", chain_name, prompt, cached, prompt - cached, completion)
+        return text
+
+    def _estimate_tokens(self, chain_name, inputs):
+        # Prompt tokens (template + inputs) plus the most the completion can use
+        template = self.templates[self._chain_templates[chain_name]]
+        prompt = sum(count_tokens(str(value)) for value in inputs.values()) + count_tokens(template)
+        return prompt + self.chain_params[chain_name]["max_tokens"]
+
+    @staticmethod
+    def _focus(objective):
+        return f" Focus on this learning objective: {objective}" if objective else ""
+
+    def _require_text(self, text):
         if not text: 
             # Gives error text (Prevents program crash)
             text = "ERROR" 
             logger.error("No text provided for shortanswer evaluation.")
+        return text
 
-        # Have the llm evaluate
-        evaluation = self.shortanswer_evaluation_chain.invoke({"text": text, "question": question, "answer": answer})
-        score = " ".join(evaluation.split("/"))
+    def _map_summaries(self, text, max_rounds=3):
+        # Map step: summarize budget-sized chunks in parallel until the combined result fits the budget
+        for _ in range(max_rounds):
+            chunks = split_by_tokens(text, self.summary_token_budget)
+            logger.debug("Summarizing %d chunks of an over-budget text", len(chunks))
+            partials = self._batch("chunk_summarization_chain", [{"text": chunk} for chunk in chunks], self.max_concurrency)
+            text = "\n\n".join(partials)
+            if count_tokens(text) <= self.summary_token_budget:
+                return text
+        logger.warning("Chunk summaries still over the token budget, truncating")
+        return truncate_to_tokens(text, self.summary_token_budget)
 
-        if not any(char.isdigit() for char in score):
-            score = "0"
+    async def _amap_summaries(self, text, max_rounds=3):
+        for _ in range(max_rounds):
+            chunks = split_by_tokens(text, self.summary_token_budget)
+            logger.debug("Summarizing %d chunks of an over-budget text", len(chunks))
+            partials = await self._abatch("chunk_summarization_chain", [{"text": chunk} for chunk in chunks], BULK, self.max_concurrency)
+            text = "\n\n".join(partials)
+            if count_tokens(text) <= self.summary_token_budget:
+                return text
+        logger.warning("Chunk summaries still over the token budget, truncating")
+        return truncate_to_tokens(text, self.summary_token_budget)
 
-        # If possible, parse the evaluation so it is less ugly.
-        match = re.search(r'(?<=Evaluation: ).*', evaluation)
-        if match:
-            evaluation = match.group(0)  # Return the part after "Evaluation: "
+    @timed("parse")
+    def _parse_shortanswer_questions(self, questions):
+        return parse_shortanswer_questions(questions)
 
-        # Retrieve the score from the evaluation
-        for word in score.split():
-            if word.isdigit():
-                score = word
-                break
-            
-        return evaluation, score
\ No newline at end of file
+    @timed("parse")
+    def _parse_multiplechoice_questions(self, questions):
+        return parse_multiplechoice_questions(questions)
+
+    @timed("parse")
+    def _parse_shortanswer_evaluation(self, evaluation):
+        return parse_shortanswer_evaluation(evaluation)
@@ -86,6 +86,11 @@ const App = () => {
         const saved = localStorage.getItem("questions");
         return saved ? JSON.parse(saved) : [];
     });
+    // For each question: the quiz it came from and its index there, so answers can refer to it by ID
+    const [questionRefs, setQuestionRefs] = useState(() => {
+        const saved = localStorage.getItem("questionRefs");
+        return saved ? JSON.parse(saved) : [];
+    });
     const [currentQuestionIndex, setCurrentQuestionIndex] = useState(() => {
         const saved = localStorage.getItem("currentQuestionIndex");
         return saved ? JSON.parse(saved) : 0;
@@ -120,6 +125,9 @@ const App = () => {
     useEffect(() => {
         localStorage.setItem("questions", JSON.stringify(questions));
     }, [questions]);
+    useEffect(() => {
+        localStorage.setItem("questionRefs", JSON.stringify(questionRefs));
+    }, [questionRefs]);
     useEffect(() => {
         localStorage.setItem("currentQuestionIndex", JSON.stringify(currentQuestionIndex));
     }, [currentQuestionIndex]);
@@ -183,6 +191,7 @@ const App = () => {
             });
             setSummary(res.data.summary);
             setQuestions(res.data.questions);
+            setQuestionRefs(res.data.questions.map((_, index) => ({ quiz_id: res.data.quiz_id, question_index: index })));
             dataFetched.current = true;
         } catch (error) {
             console.error("Error fetching summary and questions:", error);
@@ -193,6 +202,7 @@ const App = () => {
     const handleReset = async () => {
         // Clear localStorage
         localStorage.removeItem("questions");
+        localStorage.removeItem("questionRefs");
         localStorage.removeItem("currentQuestionIndex");
         localStorage.removeItem("answers");
         localStorage.removeItem("summary");
@@ -200,6 +210,7 @@ const App = () => {
 
         // Reset state variables
         setQuestions([]);
+        setQuestionRefs([]);
         setCurrentQuestionIndex(0);
         setAnswers([]);
         setSummary('');
@@ -233,6 +244,7 @@ const App = () => {
 
             // Append new questions to existing questions
             setQuestions((prevQuestions) => [...prevQuestions, ...res.data.questions]);
+            setQuestionRefs((prevRefs) => [...prevRefs, ...res.data.questions.map((_, index) => ({ quiz_id: res.data.quiz_id, question_index: index }))]);
 
             setNextSectionClicked(false);
         } catch (error) {
@@ -264,13 +276,25 @@ const App = () => {
 
         try {
             const userAnswer = answer;
-            const res = await axios.post(`${BASE_URL}/query`, { 
-                question: questions[currentQuestionIndex], 
-                user_answer: userAnswer,
-                summary: summary,
-                user_id: studentId,
-                id: id 
-            });
+            const submission = { user_answer: userAnswer, user_id: studentId, id: id };
+            const withQuestion = { question: questions[currentQuestionIndex], summary: summary, ...submission };
+
+            // The server keeps the summary and questions; only send which question this answers.
+            // Questions saved before quiz IDs existed still send the question and summary.
+            const questionRef = questionRefs[currentQuestionIndex];
+            let res;
+            if (questionRef && questionRef.quiz_id) {
+                try {
+                    res = await axios.post(`${BASE_URL}/query`, { ...questionRef, ...submission });
+                } catch (error) {
+                    // The quiz expired or the server no longer has it (restart, resumed from localStorage):
+                    // fall back to sending the question and summary this page still holds
+                    if (!error.response || error.response.status !== 404) throw error;
+                    res = await axios.post(`${BASE_URL}/query`, withQuestion);
+                }
+            } else {
+                res = await axios.post(`${BASE_URL}/query`, withQuestion);
+            }
 
             setAnswers([
                 ...answers,